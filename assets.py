@@ -0,0 +1,225 @@
+"""
+Origin Game Engine Library.
+This file contains asynchronous asset loading.
+Fonts, images and sounds are loaded on a thread pool and shared by key, so the same font is loaded once.
+Loaders return handles at once: handle value is a placeholder until the asset is ready,
+so objects can be drawn while loading goes on. Finished assets are finalized on the main thread
+in AssetManager.update, images are converted to the display format there.
+Mixer is initialized by the first sound, so apps that play nothing don't pay for audio init.
+
+Manifests list assets of every game mode, so the next mode can be preloaded before switching to it:
+{"game": [["font", "Segoe UI", 60], ["image", "sprites/player.png"], ["sound", "sounds/shot.wav"]]}
+"""
+
+import json
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
+import pygame
+import startup
+
+
+class AssetHandle:
+    """ Asset that may be still loading """
+
+    def __init__(self, key, placeholder=None):
+        self.key = key
+        self.placeholder = placeholder
+        self.asset = None
+        self.error = None
+        self.ready = False
+        self.callbacks = []
+
+    @property
+    def value(self):
+        """ Returns asset if it's loaded, placeholder otherwise """
+
+        return self.asset if self.ready and self.error is None else self.placeholder
+
+    def on_ready(self, callback):
+        """ Calls callback(handle) on the main thread when loading is finished, at once if it already is """
+
+        if self.ready:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def finish(self, asset=None, error=None):
+        """ Sets loaded asset or loading error and calls callbacks """
+
+        self.asset = asset
+        self.error = error
+        self.ready = True
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class AssetManager:
+    """
+    Loads assets on background threads.
+    Methods are called from the main thread, worker threads only run loaders.
+    """
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="assets")
+        self.handles = {}
+        self.pending = []  # [handle, future, finalize]
+        self.manifests = {}
+        self.default_fonts = {}
+
+    def load(self, key, loader, placeholder=None, finalize=None) -> AssetHandle:
+        """
+        Returns handle of the asset with the key, loader() runs on a worker thread if it isn't loaded yet.
+        finalize(asset) runs on the main thread and returns final asset.
+        """
+
+        handle = self.handles.get(key)
+        if handle is not None:
+            return handle
+        handle = self.handles[key] = AssetHandle(key, placeholder)
+        self.pending.append([handle, self.executor.submit(loader), finalize])
+        return handle
+
+    def default_font(self, size):
+        """ Returns pygame default font, it's bundled with pygame and loads fast, so it's the font placeholder """
+
+        font = self.default_fonts.get(size)
+        if font is None:
+            font = self.default_fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def font(self, name, size, bold=False, italic=False) -> AssetHandle:
+        """ Returns handle of a system font """
+
+        return self.load(("font", name, size, bold, italic),
+                         lambda: pygame.font.SysFont(name, size, bold, italic), self.default_font(size))
+
+    def image(self, path, alpha=True, placeholder_size=(1, 1)) -> AssetHandle:
+        """ Returns handle of an image, placeholder is a transparent surface """
+
+        placeholder = pygame.Surface(placeholder_size, pygame.SRCALPHA)
+        return self.load(("image", path, alpha), lambda: pygame.image.load(path), placeholder,
+                         convert_alpha if alpha else convert)
+
+    def sound(self, path) -> AssetHandle:
+        """
+        Returns handle of a sound, placeholder is None, so nothing plays until it's loaded.
+        Apps start without mixer, it's initialized by the first sound. If it fails, the handle gets the error at once
+        and a warning tells why sounds are silent.
+        """
+
+        key = ("sound", path)
+        if key not in self.handles and not pygame.mixer.get_init():
+            error = startup.init_pygame(("mixer",)).get("mixer")
+            if error is not None:
+                warnings.warn(f"sound {path} is not loaded, mixer failed: {error}", RuntimeWarning, stacklevel=2)
+                handle = self.handles[key] = AssetHandle(key)
+                handle.finish(error=pygame.error(f"mixer failed: {error}"))
+                return handle
+        return self.load(key, lambda: pygame.mixer.Sound(path))
+
+    def update(self) -> int:
+        """ Finalizes finished assets and calls their callbacks, returns how many assets are still loading """
+
+        # futures finish on other threads, so every item is checked once
+        finished = []
+        pending = []
+        for item in self.pending:
+            (finished if item[1].done() else pending).append(item)
+        if finished:
+            self.pending = pending
+            for handle, future, finalize in finished:
+                error = future.exception()
+                if error is not None:
+                    handle.finish(error=error)
+                    continue
+                asset = future.result()
+                try:
+                    handle.finish(finalize(asset) if finalize is not None else asset)
+                except pygame.error as finalize_error:
+                    handle.finish(error=finalize_error)
+        return len(self.pending)
+
+    def wait(self, handles=None, timeout=None):
+        """ Blocks until given handles or all pending assets are loaded, for loading screens and tools """
+
+        keys = None if handles is None else {handle.key for handle in handles}
+        futures = [future for handle, future, _ in self.pending if keys is None or handle.key in keys]
+        wait(futures, timeout)
+        self.update()
+
+    @staticmethod
+    def progress(handles) -> float:
+        """ Returns part of handles that are loaded """
+
+        handles = list(handles)
+        return sum(handle.ready for handle in handles) / len(handles) if handles else 1.0
+
+    def add_manifest(self, mode, entries):
+        """ Sets assets of the mode: ["font", name, size, bold, italic], ["image", path] and ["sound", path] """
+
+        self.manifests[mode] = [list(entry) for entry in entries]
+
+    def load_manifest(self, path):
+        """ Adds manifests of all modes from a JSON file """
+
+        with open(path) as file:
+            for mode, entries in json.load(file).items():
+                self.add_manifest(mode, entries)
+
+    def preload(self, mode) -> list:
+        """ Starts loading assets of the mode, returns their handles """
+
+        loaders = {"font": self.font, "image": self.image, "sound": self.sound}
+        return [loaders[kind](*arguments) for kind, *arguments in self.manifests.get(mode, [])]
+
+    def release(self, mode, keep=None):
+        """ Forgets loaded assets of the mode that are not used by the keep mode """
+
+        kept = {self.preload_key(entry) for entry in self.manifests.get(keep, [])}
+        for entry in self.manifests.get(mode, []):
+            key = self.preload_key(entry)
+            handle = self.handles.get(key)
+            if key not in kept and handle is not None and handle.ready:
+                del self.handles[key]
+
+    @staticmethod
+    def preload_key(entry):
+        """ Returns handle key of the manifest entry """
+
+        kind, *arguments = entry
+        if kind == "font":
+            name, size, bold, italic = (arguments + [False, False])[:4]
+            return "font", name, size, bold, italic
+        if kind == "image":
+            path, alpha = (arguments + [True])[:2]
+            return "image", path, alpha
+        return kind, arguments[0]
+
+    def shutdown(self):
+        """ Stops worker threads, loading assets are abandoned """
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def convert(surface):
+    """ Converts image to the display format if display exists """
+
+    return surface.convert() if pygame.display.get_surface() is not None else surface
+
+
+def convert_alpha(surface):
+    """ Converts image with alpha to the display format if display exists """
+
+    return surface.convert_alpha() if pygame.display.get_surface() is not None else surface
+
+
+def load_font(game, name, size, bold=False, italic=False) -> AssetHandle:
+    """ Returns font handle from asset manager of the app, apps without it load the font at once """
+
+    assets = getattr(game.app, "ASSETS", None)
+    if assets is not None:
+        return assets.font(name, size, bold, italic)
+    handle = AssetHandle(("font", name, size, bold, italic))
+    handle.finish(pygame.font.SysFont(name, size, bold, italic))
+    return handle
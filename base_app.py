@@ -2,7 +2,13 @@
 Base app class written on module Pygame.
 """
 
+import startup
+# pygame is imported through startup before anything else imports it
+startup.import_pygame()
 from update import *
+from input_manager import InputManager, InputReplay
+from assets import AssetManager
+from collections import defaultdict
 import pygame
 import time
 
@@ -10,13 +16,16 @@ import time
 class App:
     """ Base app for pygame projects """
 
-    def __init__(self, app_name=None, width=0, height=0, display_mode=pygame.FULLSCREEN):
+    def __init__(self, app_name=None, width=0, height=0, display_mode=pygame.FULLSCREEN,
+                 subsystems=startup.DEFAULT_SUBSYSTEMS):
         """
         Main initialization
 
         display_mode:
         FULLSCREEN = -2147483648
         RESIZABLE = 16
+
+        subsystems: pygame subsystems to initialize, add "mixer" for sounds and "joystick" for gamepads
         """
 
         def init_display(display_width, display_height, display_mode):
@@ -32,7 +41,8 @@ class App:
             self.H_WIDTH = self.WIDTH / 2
             self.H_HEIGHT = self.HEIGHT / 2
 
-        pygame.init()
+        self.STARTUP = startup.app_times()
+        self.INIT_ERRORS = startup.init_pygame(subsystems, self.STARTUP)
 
         if app_name is None:
             self.NAME = "Base App"
@@ -47,28 +57,88 @@ class App:
         self.MAX_FPS = 60
         self.delta_time = 0.01
         self.RUN = True
+        self.RENDER = True
         self.last_time = time.time()
 
-        self.game = Game(self)
+        self.INPUT = InputManager()
+        self.INPUT.subscribe(pygame.QUIT, self.quit)
+        self.ASSETS = AssetManager()
+
+        with startup.measure("create game", self.STARTUP):
+            self.game = Game(self)
 
     def run(self):
         """ Main script loop """
 
         while self.RUN:
             events = pygame.event.get()
-            keys = pygame.key.get_pressed()
-
-            for event in events:
-                if event.type == pygame.QUIT:
-                    self.RUN = False
+            self.INPUT.update(events)
 
-            mouse_buttons = pygame.mouse.get_pressed()
-            mouse_position = list(pygame.mouse.get_pos())
             now_time = time.time()
             self.delta_time = now_time - self.last_time
             self.last_time = now_time
 
-            self.game.update(mouse_buttons, mouse_position, events, keys)
+            self.ASSETS.update()
+            self.game.update(self.INPUT.mouse_buttons, list(self.INPUT.mouse_position), events, self.INPUT.keys)
 
             pygame.display.update()
             self.CLOCK.tick(self.MAX_FPS)
+
+        self.ASSETS.shutdown()
+
+    def quit(self, event=None):
+        """ Stops main script loop """
+
+        self.RUN = False
+
+
+class HeadlessApp:
+    """
+    App without window for simulations, tools and benchmarks.
+    Rendering is disabled by default, so game objects never touch the display.
+    """
+
+    def __init__(self, game_class=None, width=1280, height=720, render=False, seed=None, subsystems=("font",)):
+        # display isn't needed, fonts are for labels and texts
+        self.STARTUP = startup.app_times()
+        self.INIT_ERRORS = startup.init_pygame(subsystems, self.STARTUP)
+        self.NAME = "Headless App"
+        self.WIDTH = width
+        self.HEIGHT = height
+        self.H_WIDTH = self.WIDTH / 2
+        self.H_HEIGHT = self.HEIGHT / 2
+        self.DISPLAY = pygame.Surface((self.WIDTH, self.HEIGHT))
+        self.MAX_FPS = 60
+        self.delta_time = 1 / self.MAX_FPS
+        self.RUN = True
+        self.RENDER = render
+        self.INPUT = InputManager()
+        self.ASSETS = AssetManager()
+
+        if game_class is None:
+            game_class = Game
+        with startup.measure("create game", self.STARTUP):
+            if seed is None:
+                self.game = game_class(self)
+            else:
+                self.game = game_class(self, seed=seed)
+
+    def run(self, frames=1, mouse_buttons=(0, 0, 0), mouse_position=None, keys=None):
+        """ Runs given number of frames with constant input """
+
+        if mouse_position is None:
+            mouse_position = [self.H_WIDTH, self.H_HEIGHT]
+        if keys is None:
+            keys = defaultdict(bool)
+        for _ in range(frames):
+            self.ASSETS.update()
+            self.game.update(mouse_buttons, list(mouse_position), [], keys)
+
+    def replay(self, recording):
+        """ Runs the game through recorded input stream, one game frame per recorded frame """
+
+        replay = InputReplay(recording)
+        while not replay.finished():
+            events = replay.step(self.INPUT)
+            self.ASSETS.update()
+            self.game.update(self.INPUT.mouse_buttons, list(self.INPUT.mouse_position), events, self.INPUT.keys)
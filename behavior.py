@@ -0,0 +1,178 @@
+"""
+Origin Game Engine Library.
+This file contains data-driven state machine runtime for AI agents.
+States and transitions are declared once and compiled to a flat dispatch table,
+predicates are cached per tick by Perception and can be evaluated for arrays of agents at once.
+"""
+
+import numpy as np
+
+
+class Predicate:
+    """
+    Named condition of an agent.
+
+    function: function(agent) -> bool.
+    batch_function: function(agents) -> array of bool, used by batch evaluation if given.
+    """
+
+    def __init__(self, name, function, batch_function=None):
+        self.name = name
+        self.function = function
+        self.batch_function = batch_function
+
+    def __invert__(self):
+        batch_function = None
+        if self.batch_function is not None:
+            batch_function = lambda agents: ~np.asarray(self.batch_function(agents), dtype=bool)
+        return Predicate("not " + self.name, lambda agent: not self.function(agent), batch_function)
+
+
+class Perception:
+    """ Cache of predicate results that lives for one tick and is shared by all agents """
+
+    def __init__(self):
+        self.tick = 0
+        # {predicate name: {id(agent): result}} and {(predicate name, ids of agents): (agents, array of results)}
+        self.cache = {}
+        # agents whose transitions were already made this tick by batch evaluation
+        self.transitioned = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    def begin(self):
+        """ Starts new tick and drops cached results """
+
+        self.tick += 1
+        self.cache.clear()
+        self.transitioned.clear()
+
+    def get(self, predicate, agent) -> bool:
+        """ Returns cached predicate result for the agent or evaluates it """
+
+        results = self.cache.setdefault(predicate.name, {})
+        result = results.get(id(agent))
+        if result is None:
+            self.misses += 1
+            result = bool(predicate.function(agent))
+            results[id(agent)] = result
+        else:
+            self.hits += 1
+        return result
+
+    def batch(self, predicate, agents):
+        """ Evaluates predicate for all agents at once, result is cached for the tick and the same agents """
+
+        # lists of agents are built every tick, so id of a list can be reused by another one,
+        # agents are kept with their results, so their ids can't be reused until the next tick
+        key = (predicate.name, tuple(map(id, agents)))
+        cached = self.cache.get(key)
+        if cached is None:
+            self.misses += 1
+            if predicate.batch_function is not None:
+                values = np.asarray(predicate.batch_function(agents), dtype=bool)
+            else:
+                values = np.fromiter((predicate.function(agent) for agent in agents), dtype=bool, count=len(agents))
+            self.cache[key] = (tuple(agents), values)
+        else:
+            self.hits += 1
+            values = cached[1]
+        return values
+
+
+class StateMachine:
+    """
+    State machine compiled to a dispatch table.
+
+    states: dict {state name: action} or {state name: (action, on_enter)}, action and on_enter are function(agent).
+    transitions: list of (from state or "*", Predicate, to state) in priority order,
+    the first true predicate wins, transition to the same state keeps it.
+    Agent state is stored in agent.state as state index.
+    """
+
+    def __init__(self, states, transitions, initial):
+        self.names = list(states)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.actions = []
+        self.enter_actions = []
+        for name in self.names:
+            action = states[name]
+            if isinstance(action, tuple):
+                action, on_enter = action
+            else:
+                on_enter = None
+            self.actions.append(action)
+            self.enter_actions.append(on_enter)
+        self.initial = self.index[initial]
+
+        # table[state] is tuple of (predicate, next state) checked in order
+        table = [[] for _ in self.names]
+        for source, predicate, target in transitions:
+            sources = range(len(self.names)) if source == "*" else [self.index[source]]
+            for s in sources:
+                table[s].append((predicate, self.index[target]))
+        self.table = [tuple(row) for row in table]
+        self.predicates = list({predicate.name: predicate for row in self.table for predicate, _ in row}.values())
+
+    def state_name(self, agent) -> str:
+        """ Returns name of the agent state """
+
+        return self.names[getattr(agent, "state", self.initial)]
+
+    def transition(self, agent, perception=None) -> int:
+        """ Returns next state of the agent """
+
+        state = getattr(agent, "state", self.initial)
+        for predicate, target in self.table[state]:
+            if perception.get(predicate, agent) if perception is not None else predicate.function(agent):
+                return target
+        return state
+
+    def enter(self, agent, state):
+        """ Switches agent to the state and calls its enter action """
+
+        agent.state = state
+        on_enter = self.enter_actions[state]
+        if on_enter is not None:
+            on_enter(agent)
+
+    def step(self, agent, perception=None):
+        """ Makes transition, unless batch evaluation already made it this tick, and runs action of the agent """
+
+        if perception is not None and id(agent) in perception.transitioned:
+            state = getattr(agent, "state", self.initial)
+        else:
+            state = self.transition(agent, perception)
+            if state != getattr(agent, "state", None):
+                self.enter(agent, state)
+        self.actions[state](agent)
+
+    def transition_batch(self, agents, perception=None):
+        """
+        Evaluates transitions for all agents at once and switches their states.
+        Every predicate is evaluated once for all agents and cached for the following step calls.
+        """
+
+        if not agents:
+            return np.zeros(0, dtype=np.int64)
+        if perception is None:
+            perception = Perception()
+        states = np.fromiter((getattr(agent, "state", self.initial) for agent in agents), dtype=np.int64,
+                             count=len(agents))
+
+        new_states = states.copy()
+        for state, row in enumerate(self.table):
+            remaining = states == state
+            for predicate, target in row:
+                if not remaining.any():
+                    break
+                # predicates are evaluated only when some agent needs them
+                hit = remaining & perception.batch(predicate, agents)
+                new_states[hit] = target
+                remaining &= ~hit
+
+        for index in np.flatnonzero(new_states != states).tolist():
+            self.enter(agents[index], int(new_states[index]))
+        perception.transitioned.update(map(id, agents))
+        return new_states
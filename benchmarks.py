@@ -0,0 +1,372 @@
+"""
+Origin Game Engine Library.
+This file contains benchmarks of functions.py geometry primitives.
+Every primitive is timed with its functions.py version as the baseline and with variants:
+faster scalar versions and NumPy versions that take whole batches. Variants are checked against
+the baseline on the same inputs before they are timed, so a faster variant is also a correct one.
+Results are appended to a JSON history (ignored by git), every run is compared with the previous run
+and with the stored baseline run on the same machine, and cases that got slower than the threshold are
+reported as regressions. The baseline run is the one saved with --set-baseline or the first recorded run,
+so slow drift over many runs is reported too, not only sudden slowdowns.
+
+python benchmarks.py [--filter distance] [--threshold 1.25] [--check] [--set-baseline] runs the suite.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from itertools import starmap
+import numpy as np
+from functions import (distance, rotate_to_cord, line_circle_intersection, line_line_intersection, collision, touched,
+                       add_brightness)
+
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_history.json")
+
+
+def make_inputs(size, seed=1) -> dict:
+    """ Returns random arrays that primitives take, about half of segments and rects intersect """
+
+    rng = np.random.default_rng(seed)
+    return {
+        "a": rng.uniform(0, 1000, (size, 2)),
+        "b": rng.uniform(0, 1000, (size, 2)),
+        "c": rng.uniform(0, 1000, (size, 2)),
+        "d": rng.uniform(0, 1000, (size, 2)),
+        "radius": rng.uniform(10, 300, size),
+        "size1": rng.uniform(10, 300, (size, 2)),
+        "size2": rng.uniform(10, 300, (size, 2)),
+        "color": rng.integers(0, 256, (size, 3)),
+        "value": rng.integers(0, 120, size),
+    }
+
+
+def rows(*columns):
+    """ Returns argument tuples of scalar calls, values are Python numbers and lists like in the game """
+
+    return list(zip(*(column.tolist() for column in columns)))
+
+
+def distance_hypot(pos1, pos2):
+    """ distance with math.hypot """
+
+    return math.hypot(pos1[0] - pos2[0], pos1[1] - pos2[1])
+
+
+def rotate_to_cord_inline(pos1, pos2):
+    """ rotate_to_cord without default arguments and exception handling """
+
+    y_distance = pos1[1] - pos2[1]
+    if y_distance == 0:
+        return 0
+    angle = math.degrees(math.atan((pos1[0] - pos2[0]) / y_distance))
+    return angle + 180 if y_distance > 0 else angle
+
+
+def batch_distance(a, b):
+    """ Distances between rows of two position arrays """
+
+    return np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+
+
+def batch_rotate_to_cord(a, b):
+    """ rotate_to_cord of rows of two position arrays """
+
+    dx = a[:, 0] - b[:, 0]
+    dy = a[:, 1] - b[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        angle = np.degrees(np.arctan(dx / dy))
+    angle[dy > 0] += 180
+    angle[dy == 0] = 0
+    return angle
+
+
+def batch_line_circle_intersection(start, end, center, radius):
+    """ line_circle_intersection of rows of segment and circle arrays """
+
+    d = end - start
+    f = start - center
+    a = np.einsum("ij,ij->i", d, d)
+    b = 2 * np.einsum("ij,ij->i", f, d)
+    c = np.einsum("ij,ij->i", f, f) - radius * radius
+    discriminant = b * b - 4 * a * c
+    root = np.sqrt(np.maximum(discriminant, 0))
+    t1 = (-b - root) / (2 * a)
+    t2 = (-b + root) / (2 * a)
+    return (discriminant >= 0) & (((0 <= t1) & (t1 <= 1)) | ((0 <= t2) & (t2 <= 1)))
+
+
+def batch_line_line_intersection(p1, p2, p3, p4):
+    """ line_line_intersection of rows of four point arrays """
+
+    x1, y1 = p1.T
+    x2, y2 = p2.T
+    x3, y3 = p3.T
+    x4, y4 = p4.T
+    denominator = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denominator
+        u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denominator
+    return (denominator != 0) & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)
+
+
+def batch_collision(pos1, size1, pos2, size2):
+    """ collision of rows of rect arrays """
+
+    return ((pos1[:, 0] < pos2[:, 0] + size2[:, 0]) & (pos1[:, 0] + size1[:, 0] > pos2[:, 0]) &
+            (pos1[:, 1] < pos2[:, 1] + size2[:, 1]) & (pos1[:, 1] + size1[:, 1] > pos2[:, 1]))
+
+
+def batch_touched(x1, w1, x2, w2, y1, h1, y2, h2):
+    """ touched of rows of coordinate arrays """
+
+    return (((x1 <= x2) & (x2 <= x1 + w1) & (y1 <= y2) & (y2 <= y1 + h1)) |
+            ((x1 <= x2 + w2) & (x1 + w1 >= x2) & (y1 <= y2 + h2) & (y1 + h1 >= y2)))
+
+
+def batch_add_brightness(color, value):
+    """ add_brightness of rows of color array """
+
+    r, g, b = (color + value[:, None]).T.copy()
+    # overflow of a channel goes to the other two, in the same order as in add_brightness
+    err = np.maximum(r - 255, 0) // 2
+    g += err
+    b += err
+    err = np.maximum(g - 255, 0) // 2
+    r += err
+    b += err
+    err = np.maximum(b - 255, 0) // 2
+    g += err
+    r += err
+    return np.minimum(np.stack([r, g, b], axis=1), 255)
+
+
+class Primitive:
+    """
+    Benchmarked function with its variants.
+
+    scalar_args(inputs): list of argument tuples of scalar calls.
+    batch_args(inputs): arguments of batch variants.
+    variants: {name: scalar function}, batched: {name: batch function}.
+    """
+
+    def __init__(self, name, function, scalar_args, batch_args, variants=None, batched=None):
+        self.name = name
+        self.function = function
+        self.scalar_args = scalar_args
+        self.batch_args = batch_args
+        self.variants = {"baseline": function, **(variants or {})}
+        self.batched = batched or {}
+
+
+SUITE = [
+    Primitive("distance", distance, lambda d: rows(d["a"], d["b"]), lambda d: (d["a"], d["b"]),
+              {"hypot": distance_hypot}, {"numpy": batch_distance}),
+    Primitive("rotate_to_cord", rotate_to_cord, lambda d: rows(d["a"], d["b"]), lambda d: (d["a"], d["b"]),
+              {"inline": rotate_to_cord_inline}, {"numpy": batch_rotate_to_cord}),
+    Primitive("line_circle_intersection", line_circle_intersection,
+              lambda d: rows(d["a"], d["b"], d["c"], d["radius"]), lambda d: (d["a"], d["b"], d["c"], d["radius"]),
+              batched={"numpy": batch_line_circle_intersection}),
+    Primitive("line_line_intersection", line_line_intersection,
+              lambda d: rows(d["a"], d["b"], d["c"], d["d"]), lambda d: (d["a"], d["b"], d["c"], d["d"]),
+              batched={"numpy": batch_line_line_intersection}),
+    Primitive("collision", collision,
+              lambda d: rows(d["a"], d["size1"], d["b"] / 4, d["size2"]),
+              lambda d: (d["a"], d["size1"], d["b"] / 4, d["size2"]),
+              batched={"numpy": batch_collision}),
+    Primitive("touched", touched,
+              lambda d: rows(d["a"][:, 0], d["size1"][:, 0], d["b"][:, 0] / 4, d["size2"][:, 0],
+                             d["a"][:, 1], d["size1"][:, 1], d["b"][:, 1] / 4, d["size2"][:, 1]),
+              lambda d: (d["a"][:, 0], d["size1"][:, 0], d["b"][:, 0] / 4, d["size2"][:, 0],
+                         d["a"][:, 1], d["size1"][:, 1], d["b"][:, 1] / 4, d["size2"][:, 1]),
+              batched={"numpy": batch_touched}),
+    Primitive("add_brightness", add_brightness, lambda d: rows(d["color"], d["value"]),
+              lambda d: (d["color"], d["value"]), batched={"numpy": batch_add_brightness}),
+]
+
+
+def same(expected, result) -> bool:
+    """ Checks if results of a variant match results of the baseline """
+
+    expected = np.asarray(expected, dtype=np.float64)
+    result = np.asarray(result, dtype=np.float64)
+    return expected.shape == result.shape and np.allclose(expected, result, rtol=1e-9, atol=1e-9)
+
+
+def measure(function, repeat=3, min_time=0.1) -> float:
+    """ Returns the best seconds of one call of function """
+
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2 if number < 8 else 4
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(suite=SUITE, scalar_size=1000, batch_sizes=(1000, 100000), name_filter=None, repeat=3) -> dict:
+    """
+    Returns {"primitive/variant/size": nanoseconds per item} and list of variants that don't match the baseline.
+    Scalar variants are timed on scalar_size calls, batch variants on each of batch_sizes rows.
+    """
+
+    results = {}
+    mismatches = []
+    for primitive in suite:
+        if name_filter and name_filter not in primitive.name:
+            continue
+        inputs = make_inputs(max(scalar_size, *batch_sizes))
+        small = {key: value[:scalar_size] for key, value in inputs.items()}
+        arguments = primitive.scalar_args(small)
+        expected = list(starmap(primitive.function, arguments))
+        for name, function in primitive.variants.items():
+            if not same(expected, list(starmap(function, arguments))):
+                mismatches.append(f"{primitive.name}/{name}")
+                continue
+            seconds = measure(lambda: list(starmap(function, arguments)), repeat)
+            results[f"{primitive.name}/{name}/{scalar_size}"] = seconds / scalar_size * 1e9
+
+        for name, function in primitive.batched.items():
+            if not same(expected, function(*primitive.batch_args(small))):
+                mismatches.append(f"{primitive.name}/{name}")
+                continue
+            for size in batch_sizes:
+                arguments = primitive.batch_args({key: value[:size] for key, value in inputs.items()})
+                seconds = measure(lambda: function(*arguments), repeat)
+                results[f"{primitive.name}/{name}/{size}"] = seconds / size * 1e9
+    return {"results": results, "mismatches": mismatches}
+
+
+def machine() -> str:
+    """ Returns description of the machine, runs are compared only with runs of the same machine """
+
+    return f"{platform.node()} {platform.machine()} {platform.processor() or platform.system()}"
+
+
+def commit():
+    """ Returns short hash of the checked out commit or None """
+
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def load_history(path=HISTORY) -> list:
+    """ Returns recorded runs, oldest first """
+
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)["runs"]
+
+
+def save_history(runs, path=HISTORY):
+    """ Writes recorded runs """
+
+    with open(path, "w") as file:
+        json.dump({"runs": runs}, file, indent=1)
+
+
+def same_setup(candidate, run) -> bool:
+    """ Checks if runs were measured on the same machine and Python """
+
+    return candidate["machine"] == run["machine"] and candidate["python"] == run["python"]
+
+
+def previous_run(runs, run):
+    """ Returns the latest recorded run of the same machine and Python or None """
+
+    for candidate in reversed(runs):
+        if same_setup(candidate, run):
+            return candidate
+    return None
+
+
+def baseline_run(runs, run):
+    """ Returns the latest run of the same machine and Python saved as baseline, the first one of them or None """
+
+    matching = [candidate for candidate in runs if same_setup(candidate, run)]
+    marked = [candidate for candidate in matching if candidate.get("baseline")]
+    if marked:
+        return marked[-1]
+    return matching[0] if matching else None
+
+
+def regressions(results, previous, threshold=1.25) -> dict:
+    """ Returns {case: slowdown} of cases that are more than threshold times slower than in the given run """
+
+    if previous is None:
+        return {}
+    old = previous["results"]
+    return {key: value / old[key] for key, value in results.items()
+            if key in old and old[key] > 0 and value / old[key] > threshold}
+
+
+def report(results, previous=None, stored=None) -> str:
+    """ Returns table of results with speedup over the baseline and changes since the previous and stored runs """
+
+    old = previous["results"] if previous is not None else {}
+    first = stored["results"] if stored is not None else {}
+    lines = [f"{'case':<44}{'ns/item':>10}{'vs baseline':>13}{'vs previous':>13}{'vs stored':>11}"]
+    for key, value in results.items():
+        primitive, _, _ = key.split("/")
+        baseline = next((ns for case, ns in results.items() if case.startswith(f"{primitive}/baseline/")), None)
+        speedup = f"{baseline / value:.1f}x" if baseline else ""
+        change = f"{value / old[key]:.2f}" if key in old and old[key] > 0 else ""
+        drift = f"{value / first[key]:.2f}" if key in first and first[key] > 0 else ""
+        lines.append(f"{key:<44}{value:>10.1f}{speedup:>13}{change:>13}{drift:>11}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of functions.py primitives")
+    parser.add_argument("--filter", help="run only primitives with this text in the name")
+    parser.add_argument("--scalar-size", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown reported as regression")
+    parser.add_argument("--history", default=HISTORY)
+    parser.add_argument("--no-save", action="store_true", help="don't add this run to the history")
+    parser.add_argument("--set-baseline", action="store_true", help="save this run as the baseline of later runs")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regressions or mismatches")
+    args = parser.parse_args()
+
+    measured = run(SUITE, args.scalar_size, args.batch_sizes, args.filter, args.repeat)
+    runs = load_history(args.history)
+    current = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit(),
+        "machine": machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": measured["results"],
+    }
+    previous = previous_run(runs, current)
+    stored = baseline_run(runs, current)
+    print(report(current["results"], previous, stored))
+    for name in measured["mismatches"]:
+        print(f"{name}: results don't match the baseline, not timed")
+    slower = {}
+    for label, reference in (("previous", previous), ("stored baseline", stored)):
+        for key, slowdown in regressions(current["results"], reference, args.threshold).items():
+            slower[key] = max(slower.get(key, 0), slowdown)
+            print(f"regression: {key} is {slowdown:.2f}x slower than in {label} run "
+                  f"{reference['commit'] or reference['date']}")
+
+    if args.set_baseline:
+        current["baseline"] = True
+    if not args.no_save:
+        save_history(runs + [current], args.history)
+    if args.check and (slower or measured["mismatches"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
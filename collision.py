@@ -0,0 +1,195 @@
+"""
+Origin Game Engine Library.
+This file contains continuous collision detection and response against static obstacles.
+Movement of every object during a frame is swept as a circle, so fast objects can't tunnel through obstacles.
+Candidate pairs are found with spatial.grid_pairs, cost stays linear in the number of moving objects.
+"""
+
+import math
+import numpy as np
+from spatial import grid_pairs
+from steering import normalize, scatter_add
+
+# distance kept between touching circles, so the next sweep doesn't start in overlap
+SKIN = 0.01
+
+
+def sweep_circles(starts, ends, radii, centers, obstacle_radii):
+    """
+    Batch version of functions.swept_circle_intersection.
+
+    starts, ends: arrays (N, 2) of movements, radii: array (N,).
+    centers: array (M, 2) of static circles, obstacle_radii: array (M,).
+    Returns fractions of the movements at the first contact, 1 where nothing is hit,
+    and indices of the hit obstacles, -1 where nothing is hit.
+    """
+
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), len(starts))
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    obstacle_radii = np.broadcast_to(np.asarray(obstacle_radii, dtype=np.float64), len(centers))
+    fractions = np.ones(len(starts))
+    hits = np.full(len(starts), -1, dtype=np.int64)
+    if len(starts) == 0 or len(centers) == 0:
+        return fractions, hits
+
+    # broad-phase: bounding circle of every movement around its middle point
+    moves = ends - starts
+    _, lengths = normalize(moves)
+    reach = (lengths / 2 + radii).max() + obstacle_radii.max()
+    i, j = grid_pairs((starts + ends) / 2, reach, centers)
+
+    # narrow-phase: first root of |start + move * t - center| = r
+    f = starts[i] - centers[j]
+    d = moves[i]
+    r = radii[i] + obstacle_radii[j]
+    a = np.einsum("ij,ij->i", d, d)
+    b = np.einsum("ij,ij->i", f, d)
+    c = np.einsum("ij,ij->i", f, f) - r * r
+    discriminant = b * b - a * c
+    approaching = (a > 0) & (b < 0) & (discriminant >= 0) & (c > 0)
+    t = np.full(len(i), np.inf)
+    t[approaching] = (-b[approaching] - np.sqrt(discriminant[approaching])) / a[approaching]
+    # overlapping circles that move deeper are hit at once, moving out of overlap is free
+    t[(c <= 0) & (a > 0) & (b < 0)] = 0
+    valid = t <= 1
+    i, j, t = i[valid], j[valid], t[valid]
+
+    # keep the earliest contact of every movement
+    order = np.lexsort((t, i))
+    i, j, t = i[order], j[order], t[order]
+    first = np.ones(len(i), dtype=bool)
+    first[1:] = i[1:] != i[:-1]
+    fractions[i[first]] = t[first]
+    hits[i[first]] = j[first]
+    return fractions, hits
+
+
+def push_out(positions, radii, centers, obstacle_radii):
+    """ Returns positions moved out of overlapping static circles """
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), len(positions))
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    obstacle_radii = np.broadcast_to(np.asarray(obstacle_radii, dtype=np.float64), len(centers))
+    if len(positions) == 0 or len(centers) == 0:
+        return positions.copy()
+
+    # touching circles are pushed apart too, so the search reaches SKIN further
+    i, j = grid_pairs(positions, radii.max() + obstacle_radii.max() + SKIN, centers)
+    direction, lengths = normalize(positions[i] - centers[j])
+    # circles exactly in the center of an obstacle are pushed along x
+    direction[lengths == 0] = (1, 0)
+    depth = radii[i] + obstacle_radii[j] + SKIN - lengths
+    inside = depth > 0
+    return positions + scatter_add(i[inside], direction[inside] * depth[inside, None], len(positions))
+
+
+class CollisionResolver:
+    """
+    Collision response of game objects against static obstacles.
+    Movement of every mover since the previous frame is swept against rocks,
+    movers that hit a rock are stopped at the contact point and pushed out of overlaps.
+    Bullets are swept over their next step and stop at the first rock.
+    """
+
+    def __init__(self, game, movers=("Enemy", "Explosive"), obstacles=("Rock",)):
+        self.game = game
+        self.mover_types = movers
+        self.obstacle_types = obstacles
+
+        # positions of movers after the previous resolve, {id(mover): (mover, [x, y])}
+        # mover is kept to check identity, ids of removed objects are reused by new ones
+        self.previous = {}
+        self.hits = 0
+
+    def obstacle_arrays(self, obstacles, attribute="pos"):
+        """ Returns positions and sizes of obstacles """
+
+        centers = np.array([getattr(obj, attribute) for obj in obstacles], dtype=np.float64).reshape(-1, 2)
+        sizes = np.array([obj.size for obj in obstacles], dtype=np.float64)
+        return centers, sizes
+
+    def start(self, mover):
+        """ Returns position of the mover after the previous resolve or its current position """
+
+        previous = self.previous.get(id(mover))
+        if previous is None or previous[0] is not mover:
+            return mover.pos
+        return previous[1]
+
+    def update(self, movers=None, obstacles=None):
+        """ Stops movers at obstacles and pushes them out of overlaps """
+
+        objects = self.game.objects
+        if movers is None:
+            movers = [obj for obj in objects if type(obj).__name__ in self.mover_types]
+        if obstacles is None:
+            obstacles = [obj for obj in objects if type(obj).__name__ in self.obstacle_types]
+        if not movers:
+            self.previous.clear()
+            return
+        if not obstacles:
+            self.previous = {id(mover): (mover, list(mover.pos)) for mover in movers}
+            return
+
+        ends = np.array([mover.pos for mover in movers], dtype=np.float64)
+        starts = np.array([self.start(mover) for mover in movers], dtype=np.float64)
+        radii = np.array([mover.size for mover in movers], dtype=np.float64)
+        centers, sizes = self.obstacle_arrays(obstacles)
+
+        fractions, hits = sweep_circles(starts, ends, radii, centers, sizes)
+        hit = hits >= 0
+        self.hits = int(hit.sum())
+        positions = ends.copy()
+        positions[hit] = starts[hit] + (ends[hit] - starts[hit]) * fractions[hit, None]
+        positions = push_out(positions, radii, centers, sizes)
+
+        # targets inside obstacles would drag movers back into them
+        targets = np.array([mover.new_pos for mover in movers], dtype=np.float64)
+        target_centers, _ = self.obstacle_arrays(obstacles, "new_pos")
+        targets = push_out(targets, radii, target_centers, sizes)
+
+        self.previous = {}
+        tweens = getattr(self.game, "tweens", None)
+        physics = getattr(self.game, "physics", None)
+        moved = []
+        for mover, (x, y), (tx, ty) in zip(movers, positions.tolist(), targets.tolist()):
+            if mover.pos[0] != x or mover.pos[1] != y:
+                moved.append(mover)
+            if tweens is not None and (mover.pos[0] != x or mover.pos[1] != y or
+                                       mover.new_pos[0] != tx or mover.new_pos[1] != ty):
+                tweens.wake(mover)
+            mover.pos[0] = x
+            mover.pos[1] = y
+            mover.new_pos[0] = tx
+            mover.new_pos[1] = ty
+            self.previous[id(mover)] = (mover, [x, y])
+        if physics is not None and moved:
+            physics.moved(moved)
+
+    def update_bullets(self, bullets=None, obstacles=None):
+        """ Shortens paths of bullets that hit an obstacle during their next step """
+
+        if bullets is None:
+            bullets = self.game.bullets
+        if obstacles is None:
+            obstacles = [obj for obj in self.game.objects if type(obj).__name__ in self.obstacle_types]
+        if not bullets or not obstacles:
+            return
+
+        starts = np.array([bullet.pos for bullet in bullets], dtype=np.float64)
+        angles = np.radians([bullet.angle for bullet in bullets])
+        speeds = np.array([bullet.speed for bullet in bullets], dtype=np.float64)
+        ends = starts + np.stack([np.cos(angles), np.sin(angles)], axis=1) * speeds[:, None]
+        radii = np.array([bullet.size for bullet in bullets], dtype=np.float64)
+        centers, sizes = self.obstacle_arrays(obstacles)
+
+        fractions, hits = sweep_circles(starts, ends, radii, centers, sizes)
+        for index in np.flatnonzero(hits >= 0).tolist():
+            bullet = bullets[index]
+            point = (starts[index] + (ends[index] - starts[index]) * fractions[index]).tolist()
+            # bullet path may already end before the obstacle
+            if math.dist(bullet.pos, point) < math.dist(bullet.pos, bullet.end_pos):
+                bullet.end_pos = point
@@ -251,6 +251,107 @@ def line_line_intersection(p1, p2, p3, p4):
     return 0 <= t <= 1 and 0 <= u <= 1
 
 
+def ray_segment_intersection(origin, direction, p1, p2):
+    """ Returns distance along the ray to the segment or None if the ray misses it """
+
+    rx, ry = direction
+    sx = p2[0] - p1[0]
+    sy = p2[1] - p1[1]
+
+    denominator = rx * sy - ry * sx
+    if denominator == 0:
+        return None  # Ray and segment are parallel
+
+    qx = p1[0] - origin[0]
+    qy = p1[1] - origin[1]
+    t = (qx * sy - qy * sx) / denominator
+    u = (qx * ry - qy * rx) / denominator
+
+    if t >= 0 and 0 <= u <= 1:
+        return t
+    return None
+
+
+def ray_circle_intersection(origin, direction, center, radius):
+    """
+    Returns distance along the ray to the circle or None if the ray misses it.
+    Direction must be normalized. If the origin is inside the circle the exit distance is returned.
+    """
+
+    fx = origin[0] - center[0]
+    fy = origin[1] - center[1]
+    b = fx * direction[0] + fy * direction[1]
+    c = fx * fx + fy * fy - radius * radius
+
+    discriminant = b * b - c
+    if discriminant < 0:
+        return None
+
+    discriminant = math.sqrt(discriminant)
+    t = -b - discriminant
+    if t >= 0:
+        return t
+    t = -b + discriminant
+    if t >= 0:
+        return t
+    return None
+
+
+def swept_circle_intersection(start, end, radius, center, obstacle_radius):
+    """
+    Continuous collision of a circle moving from start to end with a static circle.
+    Returns fraction of the movement in [0, 1] at the first contact or None if circles don't touch.
+    Returns 0 if circles already overlap at start and the circle moves deeper.
+    """
+
+    fx = start[0] - center[0]
+    fy = start[1] - center[1]
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    a = dx * dx + dy * dy
+    b = fx * dx + fy * dy
+    # not moving or moving away
+    if a == 0 or b >= 0:
+        return None
+
+    r = radius + obstacle_radius
+    c = fx * fx + fy * fy - r * r
+    if c <= 0:
+        return 0.0
+
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / a
+    if t > 1:
+        return None
+    return t
+
+
+def segment_circle_hit(line_start, line_end, circle_center, circle_radius):
+    """ Returns the first point where segment enters the circle or None """
+
+    t = swept_circle_intersection(line_start, line_end, 0, circle_center, circle_radius)
+    if t is None:
+        return None
+    return [line_start[0] + (line_end[0] - line_start[0]) * t, line_start[1] + (line_end[1] - line_start[1]) * t]
+
+
+def push_out_of_circle(pos, radius, center, obstacle_radius):
+    """ Returns position of the circle moved out of the obstacle circle by the shortest way """
+
+    dx = pos[0] - center[0]
+    dy = pos[1] - center[1]
+    r = radius + obstacle_radius
+    d = math.sqrt(dx * dx + dy * dy)
+    if d >= r:
+        return [pos[0], pos[1]]
+    if d == 0:
+        # exactly in the center, any direction is fine
+        return [center[0] + r, center[1]]
+    return [center[0] + dx / d * r, center[1] + dy / d * r]
+
+
 def line_rect_intersection(line_start, line_end, rect_pos, rect_size):
     """ Detects collision between line and rectangle """
 
@@ -322,6 +423,27 @@ def distance(pos1: list, pos2: list) -> float:
     return distance
 
 
+def rotated_origin(size, pos, origin_pos, angle) -> list:
+    """
+    Returns upper left corner of an image rotated around origin_pos so that origin_pos stays at pos.
+    Bounding box of the rotated image is computed analytically, without rotating its corners.
+    """
+
+    w, h = size
+    c = math.cos(deg_to_rad(angle))
+    s = math.sin(deg_to_rad(angle))
+
+    # corners are u * (w, 0) + v * (0, -h), so extremes are sums of independent terms
+    min_x = min(0, w * c) + min(0, h * s)
+    max_y = max(0, w * s) + max(0, -h * c)
+
+    # translation of the pivot
+    move_x = origin_pos[0] * c + origin_pos[1] * s - origin_pos[0]
+    move_y = origin_pos[0] * s - origin_pos[1] * c + origin_pos[1]
+
+    return [pos[0] - origin_pos[0] + min_x - move_x, pos[1] - origin_pos[1] - max_y + move_y]
+
+
 def rotate_to_cord(pos1=None, pos2=None) -> float:
     """
     :param pos1: pos of the object that must be turned
@@ -0,0 +1,213 @@
+"""
+Origin Game Engine Library.
+This file contains event-driven input manager.
+Subscribers are called on key and mouse events, pressed and released states are edge-triggered,
+debounce is measured in seconds, and input streams can be recorded and replayed frame by frame.
+"""
+
+import json
+import time
+import pygame
+
+# event attributes that are recorded for every event type
+RECORDED_ATTRIBUTES = ("key", "mod", "unicode", "scancode", "pos", "rel", "buttons", "button", "x", "y")
+
+
+class KeyState:
+    """ Read-only keys state that can be indexed like pygame.key.get_pressed() """
+
+    def __init__(self, held):
+        self.held = held
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class InputManager:
+    """ Event-driven input manager """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.time = self.clock()
+
+        self.held_keys = set()
+        self.pressed_keys = set()
+        self.released_keys = set()
+        self.keys = KeyState(self.held_keys)
+
+        self.mouse_buttons = [False, False, False]
+        self.pressed_buttons = set()
+        self.released_buttons = set()
+        self.mouse_position = [0, 0]
+
+        # subscribers are {(event type, key or button or None): [[callback, debounce, last call time]]}
+        self.subscribers = {}
+
+        self.recording = None
+        self.frame = 0
+
+    def subscribe(self, event_type, callback, code=None, debounce=0):
+        """
+        Subscribes callback to the event type.
+
+        code: key for key events or button for mouse button events, None to receive all events of the type.
+        debounce: minimal time in seconds between two callback calls.
+        """
+
+        self.subscribers.setdefault((event_type, code), []).append([callback, debounce, float("-inf")])
+
+    def unsubscribe(self, event_type, callback, code=None):
+        """ Removes callback from the event type subscribers """
+
+        subscribers = self.subscribers.get((event_type, code), [])
+        self.subscribers[(event_type, code)] = [s for s in subscribers if s[0] != callback]
+
+    def on_key_down(self, key, callback, debounce=0):
+        """ Subscribes callback to the key press """
+
+        self.subscribe(pygame.KEYDOWN, callback, key, debounce)
+
+    def on_key_up(self, key, callback, debounce=0):
+        """ Subscribes callback to the key release """
+
+        self.subscribe(pygame.KEYUP, callback, key, debounce)
+
+    def on_mouse_down(self, button, callback, debounce=0):
+        """ Subscribes callback to the mouse button press, buttons are numbered from 1 like in pygame events """
+
+        self.subscribe(pygame.MOUSEBUTTONDOWN, callback, button, debounce)
+
+    def on_mouse_up(self, button, callback, debounce=0):
+        """ Subscribes callback to the mouse button release """
+
+        self.subscribe(pygame.MOUSEBUTTONUP, callback, button, debounce)
+
+    def key_pressed(self, key) -> bool:
+        """ Returns True only on the frame the key was pressed """
+
+        return key in self.pressed_keys
+
+    def key_released(self, key) -> bool:
+        """ Returns True only on the frame the key was released """
+
+        return key in self.released_keys
+
+    def mouse_pressed(self, button) -> bool:
+        """ Returns True only on the frame the mouse button was pressed """
+
+        return button in self.pressed_buttons
+
+    def mouse_released(self, button) -> bool:
+        """ Returns True only on the frame the mouse button was released """
+
+        return button in self.released_buttons
+
+    def dispatch(self, event, code):
+        """ Calls subscribers of the event """
+
+        for key in ((event.type, code), (event.type, None)) if code is not None else ((event.type, None),):
+            for subscriber in self.subscribers.get(key, ()):
+                callback, debounce, last_time = subscriber
+                if self.time - last_time >= debounce:
+                    subscriber[2] = self.time
+                    callback(event)
+
+    def update(self, events, now=None):
+        """ Processes events of one frame """
+
+        self.time = self.clock() if now is None else now
+        self.pressed_keys.clear()
+        self.released_keys.clear()
+        self.pressed_buttons.clear()
+        self.released_buttons.clear()
+
+        if self.recording is not None:
+            self.recording.append([self.time, [self.serialize(event) for event in events]])
+        self.frame += 1
+
+        for event in events:
+            code = None
+            if event.type == pygame.KEYDOWN:
+                code = event.key
+                self.held_keys.add(code)
+                self.pressed_keys.add(code)
+            elif event.type == pygame.KEYUP:
+                code = event.key
+                self.held_keys.discard(code)
+                self.released_keys.add(code)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                code = event.button
+                self.mouse_position = list(event.pos)
+                if 1 <= code <= 3:
+                    self.mouse_buttons[code - 1] = True
+                self.pressed_buttons.add(code)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                code = event.button
+                self.mouse_position = list(event.pos)
+                if 1 <= code <= 3:
+                    self.mouse_buttons[code - 1] = False
+                self.released_buttons.add(code)
+            elif event.type == pygame.MOUSEMOTION:
+                self.mouse_position = list(event.pos)
+            self.dispatch(event, code)
+
+    @staticmethod
+    def serialize(event):
+        """ Converts pygame event to JSON compatible list """
+
+        return [event.type, {k: v for k, v in event.dict.items() if k in RECORDED_ATTRIBUTES}]
+
+    @staticmethod
+    def deserialize(data):
+        """ Converts recorded event back to pygame event """
+
+        event_type, attributes = data[0], dict(data[1])
+        for name in ("pos", "rel", "buttons"):
+            if name in attributes:
+                attributes[name] = tuple(attributes[name])
+        return pygame.event.Event(event_type, attributes)
+
+    def start_recording(self):
+        """ Starts recording input stream """
+
+        self.recording = []
+
+    def stop_recording(self):
+        """ Stops recording and returns recorded frames """
+
+        recording, self.recording = self.recording, None
+        return recording
+
+    def save_recording(self, path):
+        """ Stops recording and saves recorded frames to JSON file """
+
+        with open(path, "w") as file:
+            json.dump(self.stop_recording(), file)
+
+
+class InputReplay:
+    """ Replays recorded input stream through an input manager frame by frame """
+
+    def __init__(self, recording):
+        if isinstance(recording, str):
+            with open(recording) as file:
+                recording = json.load(file)
+        self.recording = recording
+        self.frame = 0
+
+    def __len__(self):
+        return len(self.recording)
+
+    def finished(self) -> bool:
+        """ Returns True if all frames were replayed """
+
+        return self.frame >= len(self.recording)
+
+    def step(self, input_manager):
+        """ Feeds next recorded frame to the input manager and returns its events """
+
+        frame_time, events = self.recording[self.frame]
+        self.frame += 1
+        events = [InputManager.deserialize(event) for event in events]
+        input_manager.update(events, frame_time)
+        return events
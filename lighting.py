@@ -0,0 +1,217 @@
+"""
+Origin Game Engine Library.
+This file contains 2D lighting with shadow casting.
+Lit area is a visibility polygon computed by angular sweep over occluder endpoints,
+so cost depends on the number of occluders and not on the number and length of rays.
+"""
+
+import pygame
+from functools import lru_cache
+from functions import *
+
+ANGLE_EPSILON = 0.0001
+
+
+FALLOFF_CURVES = {
+    "linear": lambda k: k,
+    "quadratic": lambda k: k * k,
+    "smooth": lambda k: k * k * (3 - 2 * k),
+}
+
+
+@lru_cache(maxsize=64)
+def radial_texture(radius: int, color=(255, 255, 255), falloff="linear"):
+    """
+    Returns cached surface with radial light falloff from color in the center to black on the edge.
+    Textures are baked once per (radius, color, falloff) and least recently used ones are evicted.
+    """
+
+    curve = FALLOFF_CURVES[falloff]
+    surface = pygame.Surface((radius * 2, radius * 2))
+    surface.fill((0, 0, 0))
+    for r in range(radius, 0, -1):
+        k = curve(1 - r / radius)
+        pygame.draw.circle(surface, (int(color[0] * k), int(color[1] * k), int(color[2] * k)), (radius, radius), r)
+    return surface
+
+
+def rect_segments(pos, size):
+    """ Returns four edges of a rectangle as segments """
+
+    x, y = pos
+    w, h = size
+    return [((x, y), (x + w, y)), ((x + w, y), (x + w, y + h)),
+            ((x + w, y + h), (x, y + h)), ((x, y + h), (x, y))]
+
+
+def visibility_polygon(origin, radius, segments=(), circles=(), rects=(), boundary_steps=64, circle_steps=6):
+    """
+    Computes visibility polygon from origin limited by radius.
+
+    segments: list of ((x1, y1), (x2, y2)).
+    circles: list of ((x, y), radius).
+    rects: list of ((x, y), (width, height)).
+    boundary_steps: how many points approximate the light radius circle.
+    circle_steps: how many points approximate the visible arc of each circle.
+    """
+
+    ox, oy = origin
+    segments = list(segments)
+    for pos, size in rects:
+        segments.extend(rect_segments(pos, size))
+
+    # zero length segments (and edges of zero size rects) cast no shadow and can't be intersected
+    segments = [s for s in segments if s[0][0] != s[1][0] or s[0][1] != s[1][1]]
+    # occluders outside of the light radius can't cast shadows inside it
+    segments = [s for s in segments if line_circle_intersection(s[0], s[1], origin, radius)
+                or point_in_circle(s[0], origin, radius)]
+    circles = [c for c in circles if distance(c[0], origin) < radius + c[1]]
+
+    angles = [i * 2 * math.pi / boundary_steps for i in range(boundary_steps)]
+    for p1, p2 in segments:
+        for x, y in (p1, p2):
+            angle = math.atan2(y - oy, x - ox)
+            angles.extend((angle - ANGLE_EPSILON, angle, angle + ANGLE_EPSILON))
+    for center, r in circles:
+        d = distance(origin, center)
+        if d <= r:
+            continue  # origin is inside the circle, boundary steps are enough
+        base = math.atan2(center[1] - oy, center[0] - ox)
+        half = math.asin(r / d)
+        for i in range(circle_steps + 1):
+            angles.append(base - half + 2 * half * i / circle_steps)
+        angles.extend((base - half - ANGLE_EPSILON, base + half + ANGLE_EPSILON))
+    angles = sorted(angle % (2 * math.pi) for angle in angles)
+
+    polygon = []
+    for angle in angles:
+        direction = (math.cos(angle), math.sin(angle))
+        closest = radius
+        for p1, p2 in segments:
+            t = ray_segment_intersection(origin, direction, p1, p2)
+            if t is not None and t < closest:
+                closest = t
+        for center, r in circles:
+            t = ray_circle_intersection(origin, direction, center, r)
+            if t is not None and t < closest:
+                closest = t
+        polygon.append((ox + direction[0] * closest, oy + direction[1] * closest))
+    return polygon
+
+
+class Light(Pos):
+    """ Point light that casts shadows from segments, circles and rectangles """
+
+    def __init__(self, game, pos=None, radius=200, color=(255, 255, 255), falloff="linear"):
+        self.game = game
+
+        super().__init__(pos)
+        self.radius = radius
+        self.color = color
+        self.falloff = falloff
+        self.polygon = []
+
+        self.mask = pygame.Surface((self.radius * 2, self.radius * 2))
+
+    def cast(self, segments=(), circles=(), rects=()):
+        """ Recomputes visibility polygon of the light """
+
+        self.polygon = visibility_polygon(self.pos, self.radius, segments, circles, rects)
+        return self.polygon
+
+    def draw(self, surface=None):
+        """
+        Adds lit area to the surface using one polygon draw and cached falloff texture.
+        Pass LightMap buffer as surface to composite shadowed light with other lights.
+        """
+
+        if surface is None:
+            surface = self.game.app.DISPLAY
+        if len(self.polygon) < 3:
+            return
+        r = self.radius
+        self.mask.fill((0, 0, 0))
+        pygame.draw.polygon(self.mask, (255, 255, 255),
+                            [(x - self.pos[0] + r, y - self.pos[1] + r) for x, y in self.polygon])
+        self.mask.blit(radial_texture(r, tuple(self.color), self.falloff), (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+        surface.blit(self.mask, (self.pos[0] - r, self.pos[1] - r), special_flags=pygame.BLEND_RGB_ADD)
+
+    def update(self, segments=(), circles=(), rects=()):
+        """ Casts and draws the light """
+
+        self.cast(segments, circles, rects)
+        self.draw()
+
+
+class LightMap:
+    """
+    Off-screen light buffer.
+    Lights are added to the buffer with BLEND_ADD and the buffer is multiplied onto display once per frame,
+    so every light costs one blit of a cached texture.
+    """
+
+    def __init__(self, game, ambient=(255, 255, 255), enabled=True):
+        self.game = game
+        self.ambient = ambient
+        self.enabled = enabled
+        self.buffer = pygame.Surface((self.game.app.WIDTH, self.game.app.HEIGHT))
+
+        # flashes are [pos, radius, color, falloff, counter, lifetime]
+        self.flashes = []
+
+        self.clear()
+
+    def clear(self):
+        """ Fills light buffer with ambient light """
+
+        if self.buffer.get_size() != (self.game.app.WIDTH, self.game.app.HEIGHT):
+            self.buffer = pygame.Surface((self.game.app.WIDTH, self.game.app.HEIGHT))
+        self.buffer.fill(self.ambient)
+
+    def add(self, pos, radius, color=(255, 255, 255), falloff="linear"):
+        """ Adds unshadowed light to the light buffer """
+
+        radius = int(radius)
+        if not self.enabled or radius < 1:
+            return
+        self.buffer.blit(radial_texture(radius, tuple(color), falloff), (pos[0] - radius, pos[1] - radius),
+                         special_flags=pygame.BLEND_RGB_ADD)
+
+    def flash(self, pos, radius, color=(255, 255, 255), lifetime=5, falloff="quadratic"):
+        """ Adds light that fades out in given number of frames, e.g. muzzle flash or explosion """
+
+        if not self.enabled:
+            return
+        self.flashes.append([list(pos), radius, color, falloff, 0, lifetime])
+
+    def shift(self, dx, dy):
+        """ Moves flashes with the scrolling world """
+
+        for flash in self.flashes:
+            flash[0][0] += dx
+            flash[0][1] += dy
+
+    def apply(self, surface=None):
+        """ Multiplies light buffer onto the surface """
+
+        if surface is None:
+            surface = self.game.app.DISPLAY
+        surface.blit(self.buffer, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+
+    def update(self):
+        """ Adds fading flashes to the buffer, applies it to display and prepares buffer for the next frame """
+
+        if not self.enabled:
+            return
+        for flash in self.flashes:
+            pos, radius, color, falloff, counter, lifetime = flash
+            k = 1 - counter / lifetime
+            # quantize fading so cached textures are reused by every flash
+            k = round(k * 8) / 8
+            if k > 0:
+                self.add(pos, radius, (int(color[0] * k), int(color[1] * k), int(color[2] * k)), falloff)
+            flash[4] += 1
+        self.flashes = [flash for flash in self.flashes if flash[4] < flash[5]]
+
+        self.apply()
+        self.clear()
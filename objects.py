@@ -4,32 +4,34 @@ This file contains all game objects classes .
 """
 
 import random
+import numpy as np
 import pygame.draw
+from collections import OrderedDict
+from itertools import chain
 from functions import *
+from render import *
+from stamps import explosion_frames
+from behavior import Predicate, StateMachine
+from assets import load_font
+from tween import follow_targets, shortest_arc
 
 
-def rotate(image, pos, origin_pos, angle):
-    """ Rotate pygame surface to given angle with stable origin position """
-
-    # calculate the axis aligned bounding box of the rotated image
-    w, h = image.get_size()
-    box = [pygame.math.Vector2(p) for p in [(0, 0), (w, 0), (w, -h), (0, -h)]]
-    box_rotate = [p.rotate(angle) for p in box]
-    min_box = (min(box_rotate, key=lambda p: p[0])[0], min(box_rotate, key=lambda p: p[1])[1])
-    max_box = (max(box_rotate, key=lambda p: p[0])[0], max(box_rotate, key=lambda p: p[1])[1])
+def rotate(image, pos, origin_pos, angle, offset=(25, 25), cache=None):
+    """
+    Rotate pygame surface to given angle with stable origin position.
+    Pass RotationCache as cache to reuse rotated surfaces between frames.
+    """
 
-    # calculate the translation of the pivot
-    pivot = pygame.math.Vector2(origin_pos[0], -origin_pos[1])
-    pivot_rotate = pivot.rotate(angle)
-    pivot_move = pivot_rotate - pivot
+    if cache is not None:
+        return cache.rotate(image, pos, origin_pos, angle, offset)
 
     # calculate the upper left origin of the rotated image
-    origin = (pos[0] - origin_pos[0] + min_box[0] - pivot_move[0], pos[1] - origin_pos[1] - max_box[1] + pivot_move[1])
+    origin = rotated_origin(image.get_size(), pos, origin_pos, angle)
 
     # get a rotated image
     rotated_image = pygame.transform.rotate(image, angle)
 
-    return rotated_image, [origin[0] + 25, origin[1] + 25]
+    return rotated_image, [origin[0] + offset[0], origin[1] + offset[1]]
 
 
 
@@ -58,10 +60,15 @@ class Surface(Pos):
         self.surface.set_alpha(self.alpha)
         self.surface.set_colorkey(self.colorkey)
 
+    def blits(self):
+        """ Returns list of (surface, pos) drawn by update """
+
+        return [(self.surface, self.pos)]
+
     def update(self):
         """ Shows the surface on a game app display """
 
-        self.game.app.DISPLAY.blit(self.surface, self.pos)
+        draw_blit(self.game, self.surface, self.pos, LAYER_UI)
 
 
 class Label(Pos):
@@ -81,13 +88,32 @@ class Label(Pos):
         self.foreground = foreground
         self.background = background
 
-        self.font = pygame.font.SysFont(font_name, font_size, bold, italic)
+        # placeholder font is used until the font is loaded, then the label is rendered again
+        self.font_handle = load_font(game, font_name, font_size, bold, italic)
+        if not self.font_handle.ready:
+            self.font_handle.on_ready(self.font_loaded)
         self.update_text(self.text, self.smooth, self.foreground, self.background)
 
+    @property
+    def font(self):
+        """ Returns loaded font or its placeholder """
+
+        return self.font_handle.value
+
+    def font_loaded(self, handle):
+        """ Renders label again with the loaded font """
+
+        self.update_text(self.text)
+
+    def blits(self):
+        """ Returns list of (surface, pos) drawn by update """
+
+        return [(self.surface, self.pos)]
+
     def update(self):
         """ Shows the surface of label on a game app display """
 
-        self.game.app.DISPLAY.blit(self.surface, self.pos)
+        draw_blit(self.game, self.surface, self.pos, LAYER_UI)
 
     def update_text(self, text, smooth=None, foreground=None, background=None):
         """ Updates text, smooth, foreground and background values of label and recreates surface of label """
@@ -157,11 +183,25 @@ class Button(Label):
                  smooth=True, foreground=(200, 200, 200), background=None):
         super().__init__(game, text, pos, font_name, font_size, bold, italic, smooth, foreground, background)
 
-        self.counter = 0
-        self.counter_max = 50
+        self.debounce = 0.8  # in seconds of input manager time
+        self.last_click = float("-inf")
+        self.held = False
 
-    def clicked(self, mouse_buttons, mouse_position):
-        """ Checks if button is clicked or not """
+    def press(self, mouse_buttons, mouse_position) -> bool:
+        """
+        Checks if left mouse button went down over the button.
+        Press edge and time come from the app input manager, so replays click the same way,
+        without input manager the edge is found from mouse_buttons of previous call.
+        """
+
+        input_manager = getattr(self.game.app, "INPUT", None)
+        if input_manager is not None:
+            pressed = input_manager.mouse_pressed(1)
+            now = input_manager.time
+        else:
+            pressed = mouse_buttons[0] and not self.held
+            now = None
+        self.held = bool(mouse_buttons[0])
 
         x1 = mouse_position[0]
         x2 = self.pos[0]
@@ -169,13 +209,18 @@ class Button(Label):
         y1 = mouse_position[1]
         y2 = self.pos[1]
         h2 = self.size[1]
-        if self.counter > 0:
-            self.counter -= 1
-        if mouse_buttons[0] and touched(x1, 1, x2, w2, y1, 1, y2, h2) and self.counter <= 0:
-            self.counter = self.counter_max
-            return True
-        else:
+        if not pressed or not touched(x1, 1, x2, w2, y1, 1, y2, h2):
             return False
+        if now is not None:
+            if now - self.last_click < self.debounce:
+                return False
+            self.last_click = now
+        return True
+
+    def clicked(self, mouse_buttons, mouse_position):
+        """ Checks if button is clicked or not """
+
+        return self.press(mouse_buttons, mouse_position)
 
 
 class OptionButton(Button):
@@ -195,21 +240,12 @@ class OptionButton(Button):
         self.static_text = text
         self.text = self.static_text + str(self.options[self.current_option])
         super().__init__(game, self.text, pos, font_name, font_size, bold, italic, smooth, foreground, background)
-        self.counter_max = 20
+        self.debounce = 0.3
 
     def clicked(self, mouse_buttons, mouse_position):
         """ Checks if option button is clicked or not """
 
-        x1 = mouse_position[0]
-        x2 = self.pos[0]
-        w2 = self.size[0]
-        y1 = mouse_position[1]
-        y2 = self.pos[1]
-        h2 = self.size[1]
-        if self.counter > 0:
-            self.counter -= 1
-        if mouse_buttons[0] and touched(x1, 1, x2, w2, y1, 1, y2, h2) and self.counter <= 0:
-            self.counter = self.counter_max
+        if self.press(mouse_buttons, mouse_position):
             self.next_option()
 
     def next_option(self):
@@ -250,15 +286,28 @@ class ColorOptionButton(OptionButton):
             self.color_rect_size = [self.font_size * 2, self.font_size + 10]
         else:
             self.color_rect_size = color_rect_size
+        self.color_surface = None
+        self.color_surface_key = None
+
+    def blits(self):
+        """ Returns list of (surface, pos) drawn by update, color rectangle is rendered into surface once per option """
+
+        key = (self.options[self.current_option], tuple(self.color_rect_size), self.foreground, self.outline)
+        if key != self.color_surface_key:
+            self.color_surface = pygame.Surface(self.color_rect_size, pygame.SRCALPHA)
+            self.color_surface.fill(self.options[self.current_option])
+            pygame.draw.rect(self.color_surface, self.foreground, self.color_surface.get_rect(), self.outline)
+            self.color_surface_key = key
+        return [(self.color_surface, [self.pos[0] + self.size[0], self.pos[1]]), (self.surface, self.pos)]
 
     def update(self):
         """ Shows the surface of label on a game app display and the rectangle with picked color option """
 
-        pygame.draw.rect(self.game.app.DISPLAY, self.options[self.current_option],
-                         pygame.Rect([self.pos[0] + self.size[0], self.pos[1]], self.color_rect_size))
-        pygame.draw.rect(self.game.app.DISPLAY, self.foreground,
-                         pygame.Rect([self.pos[0] + self.size[0], self.pos[1]], self.color_rect_size), self.outline)
-        self.game.app.DISPLAY.blit(self.surface, self.pos)
+        draw_rect(self.game, self.options[self.current_option],
+                  pygame.Rect([self.pos[0] + self.size[0], self.pos[1]], self.color_rect_size), 0, LAYER_UI)
+        draw_rect(self.game, self.foreground,
+                  pygame.Rect([self.pos[0] + self.size[0], self.pos[1]], self.color_rect_size), self.outline, LAYER_UI, 1)
+        draw_blit(self.game, self.surface, self.pos, LAYER_UI)
 
     def next_option(self):
         """ Selects next option to display on color option button """
@@ -287,13 +336,23 @@ class Text(Label):
 
         self.text_list = self.text.split("\n")
         self.lines = len(self.text_list)
-        self.surface_list = [self.font.render(i, self.smooth, self.foreground, self.background) for i in self.text_list]
+        self.render_lines()
         self.pos_list = [[self.pos[0], self.pos[1] + i * self.line_height] for i in range(len(self.text_list))]
+
+    def render_lines(self):
+        """ Renders surfaces of all lines """
+
+        self.surface_list = [self.font.render(i, self.smooth, self.foreground, self.background) for i in self.text_list]
         self.size_list = [self.surface_list[i].get_size() for i in range(self.lines)]
 
         self.size = [max([self.surface_list[i].get_size()[0] for i in range(self.lines)]),
                      self.lines * self.line_height]
 
+    def font_loaded(self, handle):
+        """ Renders lines again with the loaded font """
+
+        self.render_lines()
+
     def percent_y(self, percent=0, x=None):
         """ Places Text at given percent on the game app screen height """
 
@@ -316,10 +375,131 @@ class Text(Label):
         else:
             self.pos_list = [[x, y + i * self.line_height] for i in range(self.lines)]
 
+    def blits(self):
+        """ Returns list of (surface, pos) drawn by update """
+
+        return list(zip(self.surface_list, self.pos_list))
+
     def update(self):
         """ Shows the surface of Text on a game app display """
 
-        [self.game.app.DISPLAY.blit(self.surface_list[i], self.pos_list[i]) for i in range(self.lines)]
+        for i in range(self.lines):
+            draw_blit(self.game, self.surface_list[i], self.pos_list[i], LAYER_UI)
+
+
+class ScrollText(Label):
+    """
+    ScrollText UI object for pygame games.
+    Multiple lines text that supports appends and edits, e.g. chat log or console.
+    Only changed lines are rendered, only visible lines are blitted
+    and number of cached line surfaces is limited by max_cached_lines.
+    """
+
+    def __init__(self, game, text="", pos=None, font_name="Segoe UI", font_size=30, bold=False, italic=False,
+                 smooth=True, foreground=(200, 200, 200), background=None, line_height=None, visible_lines=10,
+                 max_cached_lines=None, follow=True):
+        # line surfaces are cached by line text, so edited lines are rendered again and equal lines share surface
+        self.line_cache = OrderedDict()
+        if max_cached_lines is None:
+            self.max_cached_lines = visible_lines * 3
+        else:
+            self.max_cached_lines = max_cached_lines
+        self.text_list = []
+        self.scroll = 0
+        self.visible_lines = visible_lines
+        self.follow = follow
+
+        super().__init__(game, text, pos, font_name, font_size, bold, italic, smooth, foreground, background)
+
+        if line_height is None:
+            self.line_height = font_size
+        else:
+            self.line_height = line_height
+        self.size = [0, self.visible_lines * self.line_height]
+
+    def font_loaded(self, handle):
+        """ Drops lines rendered with the placeholder font """
+
+        self.line_cache.clear()
+
+    def update_text(self, text, smooth=None, foreground=None, background=None):
+        """ Replaces all lines of ScrollText """
+
+        self.text = str(text)
+        if smooth:
+            self.smooth = smooth
+        if foreground:
+            self.foreground = foreground
+        if background:
+            self.background = background
+        self.line_cache.clear()
+        self.text_list = self.text.split("\n") if self.text else []
+        self.surface = self.font.render("", self.smooth, self.foreground, self.background)
+        if self.follow:
+            self.scroll_to_end()
+
+    def line_surface(self, text):
+        """ Returns rendered line surface from cache or renders it """
+
+        surface = self.line_cache.get(text)
+        if surface is None:
+            surface = self.font.render(text, self.smooth, self.foreground, self.background)
+            self.line_cache[text] = surface
+            if len(self.line_cache) > self.max_cached_lines:
+                self.line_cache.popitem(last=False)
+        else:
+            self.line_cache.move_to_end(text)
+        return surface
+
+    def at_end(self) -> bool:
+        """ Checks if the last line is visible """
+
+        return self.scroll >= len(self.text_list) - self.visible_lines
+
+    def append(self, text):
+        """ Appends one or more lines to the end """
+
+        following = self.follow and self.at_end()
+        self.text_list.extend(str(text).split("\n"))
+        if following:
+            self.scroll_to_end()
+
+    def set_line(self, index, text):
+        """ Replaces text of one line """
+
+        self.text_list[index] = str(text)
+
+    def remove_line(self, index):
+        """ Removes one line """
+
+        del self.text_list[index]
+        self.scroll_by(0)
+
+    def scroll_by(self, lines):
+        """ Scrolls text by given number of lines """
+
+        self.scroll = max(0, min(self.scroll + lines, len(self.text_list) - self.visible_lines))
+
+    def scroll_to_end(self):
+        """ Scrolls text to the last line """
+
+        self.scroll = max(0, len(self.text_list) - self.visible_lines)
+
+    def blits(self):
+        """ Returns list of (surface, pos) of visible lines """
+
+        return [(self.line_surface(line), [self.pos[0], self.pos[1] + i * self.line_height])
+                for i, line in enumerate(self.text_list[self.scroll:self.scroll + self.visible_lines])]
+
+    def update(self):
+        """ Shows visible lines of ScrollText on a game app display """
+
+        width = 0
+        for i, line in enumerate(self.text_list[self.scroll:self.scroll + self.visible_lines]):
+            surface = self.line_surface(line)
+            width = max(width, surface.get_width())
+            draw_blit(self.game, surface, [self.pos[0], self.pos[1] + i * self.line_height], LAYER_UI)
+        self.size[0] = width
 
 
 class Hexagon(Label):
@@ -355,6 +535,11 @@ class Hexagon(Label):
 
         self.draw_hexagon()
 
+    def font_loaded(self, handle):
+        """ Draws hexagon again with the loaded font """
+
+        self.draw_hexagon()
+
     def draw_hexagon(self):
         """ Draw hexagon on its surface """
 
@@ -398,15 +583,26 @@ class Hexagon(Label):
 
         self.text_surface = self.font.render(str(self.energy), self.smooth, self.foreground, self.background)
 
+    def blits(self):
+        """ Returns list of (surface, pos) drawn by update, positions include game cords """
+
+        blits = [(self.surface, [self.pos[0] + self.game.cords[0], self.pos[1] + self.game.cords[1]])]
+        if self.energy > 0:
+            blits.append((self.text_surface, [
+                self.pos[0] + self.game.cords[0] + self.surface_size[0] - 50 - self.energy * self.height_scale -
+                self.text_surface.get_size()[0] / 2,
+                self.pos[1] + self.game.cords[1] + self.surface_size[0] - 90 - self.energy * self.height_scale]))
+        return blits
+
     def update(self):
         """ Shows the surface of Hexagon on a game app display """
 
-        self.game.app.DISPLAY.blit(self.surface, [self.pos[0] + self.game.cords[0], self.pos[1] + self.game.cords[1]])
+        draw_blit(self.game, self.surface, [self.pos[0] + self.game.cords[0], self.pos[1] + self.game.cords[1]])
         if self.energy > 0:
-            self.game.app.DISPLAY.blit(self.text_surface, [
+            draw_blit(self.game, self.text_surface, [
                 self.pos[0] + self.game.cords[0] + self.surface_size[0] - 50 - self.energy * self.height_scale -
                 self.text_surface.get_size()[0] / 2,
-                self.pos[1] + self.game.cords[1] + self.surface_size[0] - 90 - self.energy * self.height_scale])
+                self.pos[1] + self.game.cords[1] + self.surface_size[0] - 90 - self.energy * self.height_scale], z=1)
 
     def zoom(self, size, pos):
         """ Zooms Hexagon size and position """
@@ -447,10 +643,10 @@ class Line(Vector):
     def update(self):
         """ Draws the Line on game app display """
 
-        pygame.draw.line(self.game.app.DISPLAY, self.color,
-                         [self.pos1[0] + self.game.cords[0], self.pos1[1] + self.game.cords[1]],
-                         [self.pos2[0] + self.game.cords[0], self.pos2[1] + self.game.cords[1]],
-                         self.width)
+        draw_line(self.game, self.color,
+                  [self.pos1[0] + self.game.cords[0], self.pos1[1] + self.game.cords[1]],
+                  [self.pos2[0] + self.game.cords[0], self.pos2[1] + self.game.cords[1]],
+                  self.width)
 
 
 class Abstract3dLine:
@@ -473,10 +669,10 @@ class Abstract3dLine:
     def update(self):
         """ Draws the Line on game app display """
 
-        pygame.draw.line(self.game.app.DISPLAY, self.color,
-                         [self.pos1[0] + self.game.cords[0], self.pos1[1] + self.game.cords[1]],
-                         [self.pos2[0] + self.game.cords[0], self.pos2[1] + self.game.cords[1]],
-                         self.width)
+        draw_line(self.game, self.color,
+                  [self.pos1[0] + self.game.cords[0], self.pos1[1] + self.game.cords[1]],
+                  [self.pos2[0] + self.game.cords[0], self.pos2[1] + self.game.cords[1]],
+                  self.width)
 
 class Circle:
     def __init__(self, game, center: list, radius: int, color=(255, 255, 255), width=5):
@@ -489,7 +685,7 @@ class Circle:
     def update(self):
         """ Draw circle """
 
-        pygame.draw.circle(self.game.app.DISPLAY, self.color, Pos.add_pos(self.center, self.game.cords), self.radius, self.width)
+        draw_circle(self.game, self.color, Pos.add_pos(self.center, self.game.cords), self.radius, self.width)
 
 
 class Bullet:
@@ -512,14 +708,17 @@ class Bullet:
     def update(self):
         """ Update method """
 
-        pygame.draw.line(self.game.app.DISPLAY, self.color, self.pos, self.end_pos, width=self.size)
+        draw_line(self.game, self.color, self.pos, self.end_pos, self.size, LAYER_EFFECTS)
 
+        start = list(self.pos)
         self.pos[0] += math.cos(deg_to_rad(self.angle)) * self.speed
         self.pos[1] += math.sin(deg_to_rad(self.angle)) * self.speed
 
         # pygame.draw.circle(self.game.app.DISPLAY, (255, 0, 0), self.end_pos, 10)
 
-        if distance(self.pos, self.end_pos) < 10 or self.counter > self.lifetime:
+        # the whole step is checked, so fast bullets can't fly over the end point
+        reached = swept_circle_intersection(start, self.pos, 0, self.end_pos, 10) is not None
+        if reached or distance(self.pos, self.end_pos) < 10 or self.counter > self.lifetime:
             self.game.bullets.remove(self)
 
         self.counter += 1
@@ -528,6 +727,10 @@ class Bullet:
 class Enemy:
     """ Interesting enemy class """
 
+    mass = 1
+    # (attribute, target attribute, smoothing, angle) followed by the tween manager
+    followed = (("pos", "new_pos", 0.2, False), ("angle", "new_angle", 0.05, True))
+
     def __init__(self, game, pos=None, size=None, color=(255, 0, 0), angle=0, speed=5, health=1, anchor_point=None, debug=True,
                  vision_angle=180, detect_range=300, stop_range=100, damaged=False):
         self.game = game
@@ -552,71 +755,106 @@ class Enemy:
         if anchor_point is None:
             self.anchor_point = list(self.pos)
         else:
-            self.anchor_point = anchor_point
+            # copy, anchor point passed as the same list as pos would move with the enemy
+            self.anchor_point = list(anchor_point)
         self.walk_point = None
         self.damaged = damaged
         self.speed = speed
         self.health = health
 
-    def new_walk_point(self, min_distance=70):
+        self.frames = 1  # frames passed since last update, more than 1 when updates are skipped by LOD scheduler
+        self.state = ENEMY_BEHAVIOR.initial
+
+    def new_walk_point(self, min_distance=70, attempts=8):
         """ Generates realistic positions for random walks """
 
         pos = [round(self.pos[0]), round(self.pos[1])]
-        while True:
-            t = [self.anchor_point[0] + random.randint(-self.walk_range // 2, self.walk_range // 2),
-                 self.anchor_point[1] + random.randint(-self.walk_range // 2, self.walk_range // 2)]
-            if distance(pos, t) > min_distance:
+        pathfinder = getattr(self.game, "pathfinder", None)
+        rng = game_random(self.game, "ai")
+        for _ in range(attempts):
+            t = [self.anchor_point[0] + rng.randint(-self.walk_range // 2, self.walk_range // 2),
+                 self.anchor_point[1] + rng.randint(-self.walk_range // 2, self.walk_range // 2)]
+            if distance(pos, t) > min_distance and (pathfinder is None or not pathfinder.blocked_at(t)):
                 return t
 
-    def update(self):
-        """ Update method """
+        # no luck, walk towards the anchor point instead of sampling forever
+        angle = -rotate_to_cord(pos, self.anchor_point) + 90
+        return [pos[0] + math.cos(deg_to_rad(angle)) * (min_distance + 1),
+                pos[1] + math.sin(deg_to_rad(angle)) * (min_distance + 1)]
+
+    def draw(self):
+        """ Draw method """
 
         # pygame.draw.line(self.game.app.DISPLAY, (255, 255, 255), self.pos,
         #                  [self.pos[0] + math.cos(deg_to_rad(self.angle)) * self.detect_range,
         #                   self.pos[1] + math.sin(deg_to_rad(self.angle)) * self.detect_range], 2)
-        pygame.draw.circle(self.game.app.DISPLAY, self.color, self.pos, self.size)
+        draw_circle(self.game, self.color, self.pos, self.size)
         if self.debug:
-            pygame.draw.polygon(self.game.app.DISPLAY, self.color,
-                                [self.pos,
-                                 [self.pos[0] + math.cos(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range,
-                                  self.pos[1] + math.sin(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range],
-                                 [self.pos[0] + math.cos(deg_to_rad(self.angle)) * self.detect_range,
-                                  self.pos[1] + math.sin(deg_to_rad(self.angle)) * self.detect_range],
-                                 [self.pos[0] + math.cos(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range,
-                                  self.pos[1] + math.sin(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range]
-                                 ], 2)
-            pygame.draw.circle(self.game.app.DISPLAY, self.color, self.anchor_point, self.walk_range, 2)
-            pygame.draw.circle(self.game.app.DISPLAY, self.color, self.anchor_point, 10, 2)
-
-        if self.is_player_in_vision() or self.damaged:
-            self.new_angle = -rotate_to_cord(self.pos, self.game.player.pos) + 90
-            if distance(self.game.player.pos, self.pos) > self.stop_range:
-                self.new_pos[0] += math.cos(deg_to_rad(self.new_angle)) * self.speed
-                self.new_pos[1] += math.sin(deg_to_rad(self.new_angle)) * self.speed
-            else:
-                self.damaged = False
-        elif self.walk_point:
-            self.new_angle = -rotate_to_cord(self.pos, self.walk_point) + 90
-            if abs(self.new_angle - self.angle) < 2:
-                self.new_pos[0] += math.cos(deg_to_rad(self.new_angle)) * self.speed // 2
-                self.new_pos[1] += math.sin(deg_to_rad(self.new_angle)) * self.speed // 2
-                if distance(self.pos, self.walk_point) < 2:
-                    self.walk_point = None
-        elif distance(self.pos, self.anchor_point) > self.walk_range:
-            self.new_angle = -rotate_to_cord(self.pos, self.walk_point) + 90
-            self.walk_point = list(self.anchor_point)
-        elif self.game.counter % 600 == 0:  # change every second
-            if random.randint(0, 1) == 1:
+            draw_polygon(self.game, self.color,
+                         [self.pos,
+                          [self.pos[0] + math.cos(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range,
+                           self.pos[1] + math.sin(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range],
+                          [self.pos[0] + math.cos(deg_to_rad(self.angle)) * self.detect_range,
+                           self.pos[1] + math.sin(deg_to_rad(self.angle)) * self.detect_range],
+                          [self.pos[0] + math.cos(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range,
+                           self.pos[1] + math.sin(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range]
+                          ], 2, LAYER_DEBUG)
+            draw_circle(self.game, self.color, self.anchor_point, self.walk_range, 2, LAYER_DEBUG)
+            draw_circle(self.game, self.color, self.anchor_point, 10, 2, LAYER_DEBUG)
+
+    def chase(self):
+        """ Chase state, moves towards the player """
+
+        self.new_angle = -rotate_to_cord(self.pos, self.game.player.pos) + 90
+        pathfinder = getattr(self.game, "pathfinder", None)
+        if pathfinder is not None:
+            # flow field leads around rocks, falls back to straight line when there is no path
+            angle = pathfinder.direction(self.pos)
+            if angle is not None:
+                self.new_angle = angle
+        if distance(self.game.player.pos, self.pos) > self.stop_range:
+            self.new_pos[0] += math.cos(deg_to_rad(self.new_angle)) * self.speed * self.frames
+            self.new_pos[1] += math.sin(deg_to_rad(self.new_angle)) * self.speed * self.frames
+        else:
+            self.damaged = False
+
+    def walk(self):
+        """ Walk state, moves to the walk point """
+
+        self.new_angle = -rotate_to_cord(self.pos, self.walk_point) + 90
+        if abs(shortest_arc(self.angle, self.new_angle)) < 2:
+            self.new_pos[0] += math.cos(deg_to_rad(self.new_angle)) * self.speed // 2 * self.frames
+            self.new_pos[1] += math.sin(deg_to_rad(self.new_angle)) * self.speed // 2 * self.frames
+            if distance(self.pos, self.walk_point) < 2:
+                self.walk_point = None
+
+    def return_to_anchor(self):
+        """ Return state, sends enemy back to the anchor point """
+
+        self.walk_point = list(self.anchor_point)
+        self.new_angle = -rotate_to_cord(self.pos, self.walk_point) + 90
+
+    def idle(self):
+        """ Idle state, sometimes looks around or picks new walk point """
+
+        if self.game.counter % 600 < self.frames:  # change every second
+            rng = game_random(self.game, "ai")
+            if rng.randint(0, 1) == 1:
                 self.walk_point = self.new_walk_point()
             else:
-                self.new_angle = round(self.angle) + random.randint(-90, 90)
+                self.new_angle = round(self.angle) + rng.randint(-90, 90)
 
-        self.angle = lerp(self.angle, self.new_angle, 0.05)
-        if self.angle > 359:
-            self.angle = self.angle % 360
+    def update(self):
+        """ Update method """
 
-        self.pos[0] = lerp(self.pos[0], self.new_pos[0], 0.2)
-        self.pos[1] = lerp(self.pos[1], self.new_pos[1], 0.2)
+        self.draw()
+
+        ENEMY_BEHAVIOR.step(self, getattr(self.game, "perception", None))
+
+        tweens = getattr(self.game, "tweens", None)
+        if tweens is not None and (self.new_pos != self.pos or self.new_angle % 360 != self.angle):
+            tweens.wake(self)
+        follow_targets(self)
 
     def is_player_in_vision(self):
         """
@@ -653,6 +891,32 @@ class Enemy:
         # Check if the player is within the vision cone
         return angle_to_player <= self.vision_angle / 2
 
+    @staticmethod
+    def batch_player_in_vision(enemies):
+        """ is_player_in_vision for list of enemies of one game at once, returns array of bool """
+
+        player = enemies[0].game.player.pos
+        data = np.fromiter(chain.from_iterable((enemy.pos[0], enemy.pos[1], enemy.angle, enemy.detect_range,
+                                                 enemy.vision_angle) for enemy in enemies),
+                           dtype=np.float64, count=len(enemies) * 5).reshape(-1, 5)
+        dx = player[0] - data[:, 0]
+        dy = player[1] - data[:, 1]
+        distance_to_player = np.hypot(dx, dy)
+        safe = np.where(distance_to_player > 0, distance_to_player, 1)
+        angle = np.radians(data[:, 2])
+        dot = np.clip((np.cos(angle) * dx + np.sin(angle) * dy) / safe, -1, 1)
+        return ((distance_to_player > 0) & (distance_to_player <= data[:, 3]) &
+                (np.degrees(np.arccos(dot)) <= data[:, 4] / 2))
+
+    @staticmethod
+    def batch_far_from_anchor(enemies):
+        """ Checks if enemies are farther from their anchor points than walk range, returns array of bool """
+
+        data = np.fromiter(chain.from_iterable((enemy.pos[0] - enemy.anchor_point[0], enemy.pos[1] - enemy.anchor_point[1],
+                                                 enemy.walk_range) for enemy in enemies),
+                           dtype=np.float64, count=len(enemies) * 3).reshape(-1, 3)
+        return np.hypot(data[:, 0], data[:, 1]) > data[:, 2]
+
     def damage(self, damage: int):
         """ Damage self """
 
@@ -661,6 +925,39 @@ class Enemy:
         if self.health < 1:
             self.game.enemies_count -= 1
             self.game.objects.remove(self)
+            if hasattr(self.game, "physics"):
+                self.game.physics.remove(self)
+            if hasattr(self.game, "tweens"):
+                self.game.tweens.remove(self)
+
+
+ALWAYS = Predicate("always", lambda agent: True, lambda agents: np.ones(len(agents), dtype=bool))
+ENEMY_ENGAGED = Predicate(
+    "engaged",
+    lambda enemy: enemy.damaged or enemy.is_player_in_vision(),
+    lambda enemies: Enemy.batch_player_in_vision(enemies) | np.fromiter((enemy.damaged for enemy in enemies), dtype=bool,
+                                                                        count=len(enemies)))
+ENEMY_HAS_WALK_POINT = Predicate("has walk point", lambda enemy: enemy.walk_point is not None)
+ENEMY_FAR_FROM_ANCHOR = Predicate(
+    "far from anchor",
+    lambda enemy: distance(enemy.pos, enemy.anchor_point) > enemy.walk_range,
+    Enemy.batch_far_from_anchor)
+
+# priority selector, every state checks the same transitions in order
+ENEMY_BEHAVIOR = StateMachine(
+    states={
+        "idle": Enemy.idle,
+        "chase": Enemy.chase,
+        "walk": Enemy.walk,
+        "return": Enemy.return_to_anchor,
+    },
+    transitions=[
+        ("*", ENEMY_ENGAGED, "chase"),
+        ("*", ENEMY_HAS_WALK_POINT, "walk"),
+        ("*", ENEMY_FAR_FROM_ANCHOR, "return"),
+        ("*", ALWAYS, "idle"),
+    ],
+    initial="idle")
 
 
 class Camera:
@@ -686,6 +983,8 @@ class Camera:
 class Player:
     """ Player class """
 
+    followed = (("pos", "new_pos", 0.2, False),)
+
     def __init__(self, game, pos=None, size=None, color=(255, 0, 0), angle=0, speed=5):
         self.game = game
         if pos is None:
@@ -713,9 +1012,12 @@ class Player:
             for i in range(10):
                 self.recharge_counter = 0
                 temp = int(self.angle)
-                self.angle += random.randint(-180, 180)
+                self.angle += game_random(self.game, "weapons").randint(-180, 180)
                 shoot(self)
                 self.angle = int(temp)
+            # one muzzle flash for all bullets of the shot
+            if hasattr(self.game, "light_map"):
+                self.game.light_map.flash(self.pos, 80, (120, 100, 60), 3)
         if mouse_buttons[2]:
             for obj in self.game.objects:
                 if obj == self:
@@ -723,8 +1025,7 @@ class Player:
                 if not isinstance(obj, Explosive):
                     continue
                 angle = -rotate_to_cord(obj.pos, self.pos) + 90
-                obj.new_pos[0] += math.cos(deg_to_rad(angle)) * 10
-                obj.new_pos[1] += math.sin(deg_to_rad(angle)) * 10
+                push(self.game, obj, [math.cos(deg_to_rad(angle)) * 10, math.sin(deg_to_rad(angle)) * 10])
                 break
 
         dx = dy = 0
@@ -746,24 +1047,34 @@ class Player:
                 continue
             obj.new_pos[0] -= dx
             obj.new_pos[1] -= dy
-
-        def smooth():
-            self.pos[0] = lerp(self.pos[0], self.new_pos[0], 0.2)
-            self.pos[1] = lerp(self.pos[1], self.new_pos[1], 0.2)
+            # anchor points are in the world too
+            anchor_point = getattr(obj, "anchor_point", None)
+            if anchor_point is not None:
+                anchor_point[0] -= dx
+                anchor_point[1] -= dy
+        if hasattr(self.game, "particles"):
+            self.game.particles.shift(-dx, -dy)
+        if hasattr(self.game, "light_map"):
+            self.game.light_map.shift(-dx, -dy)
+        if hasattr(self.game, "pathfinder"):
+            self.game.pathfinder.shift(-dx, -dy)
+        if (dx or dy) and hasattr(self.game, "tweens"):
+            # every target moved, so parked objects follow them again
+            self.game.tweens.wake_all()
 
         self.angle = -rotate_to_cord(self.pos, mouse_position) + 90
-        pygame.draw.circle(self.game.app.DISPLAY, self.color, self.pos, self.size)
-        pygame.draw.polygon(self.game.app.DISPLAY, self.color,
-                            [self.pos,
-                             [self.pos[0] + math.cos(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range,
-                              self.pos[1] + math.sin(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range],
-                             [self.pos[0] + math.cos(deg_to_rad(self.angle)) * self.detect_range,
-                              self.pos[1] + math.sin(deg_to_rad(self.angle)) * self.detect_range],
-                             [self.pos[0] + math.cos(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range,
-                              self.pos[1] + math.sin(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range]
-                             ], 2)
-
-        smooth()
+        draw_circle(self.game, self.color, self.pos, self.size)
+        draw_polygon(self.game, self.color,
+                     [self.pos,
+                      [self.pos[0] + math.cos(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range,
+                       self.pos[1] + math.sin(deg_to_rad(self.angle - self.vision_angle // 2)) * self.detect_range],
+                      [self.pos[0] + math.cos(deg_to_rad(self.angle)) * self.detect_range,
+                       self.pos[1] + math.sin(deg_to_rad(self.angle)) * self.detect_range],
+                      [self.pos[0] + math.cos(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range,
+                       self.pos[1] + math.sin(deg_to_rad(self.angle + self.vision_angle // 2)) * self.detect_range]
+                      ], 2, LAYER_DEBUG)
+
+        follow_targets(self)
         if self.recharge_counter > 0:
             self.recharge_counter -= 1
 
@@ -776,6 +1087,9 @@ class Player:
 class Rock:
     """ Rock class to make game levels more interesting """
 
+    mass = 5
+    followed = (("pos", "new_pos", 0.02, False),)
+
     def __init__(self, game, pos=None, size=None, color=(50, 50, 50), angle=0):
         self.game = game
         if pos is None:
@@ -791,15 +1105,19 @@ class Rock:
         self.new_angle = int(angle)
         self.new_pos = list(self.pos)
 
-    def update(self):
-        """ Update method """
+    def draw(self):
+        """ Draw method """
 
         # camera_pos = self.game.camera.apply(self.pos)
 
-        pygame.draw.circle(self.game.app.DISPLAY, self.color, self.pos, self.size)
+        draw_circle(self.game, self.color, self.pos, self.size)
+
+    def update(self):
+        """ Update method """
+
+        self.draw()
 
-        self.pos[0] = lerp(self.pos[0], self.new_pos[0], 0.02)
-        self.pos[1] = lerp(self.pos[1], self.new_pos[1], 0.02)
+        follow_targets(self)
 
     def damage(self, damage: int):
         """ Damage self """
@@ -810,6 +1128,9 @@ class Rock:
 class Explosive:
     """ Explosive class to make game levels more interesting """
 
+    mass = 2
+    followed = (("pos", "new_pos", 0.02, False),)
+
     def __init__(self, game, pos=None, size=None, color=(255, 0, 0), angle=0, health=10, explosion_power=100):
         self.game = game
         if pos is None:
@@ -829,57 +1150,98 @@ class Explosive:
         self.explosion_time = 30  # in frames
 
         self.is_exploding = False
+        self.ignited = False  # reached by another explosion, blasts on the next update
         self.counter = 0
 
+    def draw(self):
+        """ Draw method """
+
+        if self.is_exploding:
+            frames = explosion_frames(self.size, self.explosion_power, tuple(self.color), self.explosion_time)
+            stamp, current_size = frames[max(1, min(self.counter, self.explosion_time)) - 1]
+            draw_blit(self.game, stamp, [self.pos[0] - current_size, self.pos[1] - current_size], LAYER_EFFECTS)
+            return
+
+        draw_circle(self.game, self.color, self.pos, self.size)
+
     def update(self):
         """ Update method """
 
-        self.pos[0] = lerp(self.pos[0], self.new_pos[0], 0.02)
-        self.pos[1] = lerp(self.pos[1], self.new_pos[1], 0.02)
+        follow_targets(self)
+
+        if self.ignited:
+            self.ignited = False
+            if not self.is_exploding:
+                self.explode()
 
         if self.is_exploding:
             self.counter += 1
-            progress = self.counter / self.explosion_time
-            current_size = int(lerp(self.size, self.explosion_power, progress))
-            fade_color = (
-                int(self.color[0] * (1 - progress)),
-                int(self.color[1] * (1 - progress)),
-                int(self.color[2] * (1 - progress)),
-            )
-            pygame.draw.circle(self.game.app.DISPLAY, fade_color, self.pos, current_size, 2)
+            self.draw()
 
             if self.counter >= self.explosion_time:
                 self.is_exploding = False  # End the explosion animation
                 self.game.objects.remove(self)
+                if hasattr(self.game, "physics"):
+                    self.game.physics.remove(self)
+                if hasattr(self.game, "tweens"):
+                    self.game.tweens.remove(self)
             return
 
-        pygame.draw.circle(self.game.app.DISPLAY, self.color, self.pos, self.size)
+        self.draw()
 
     def damage(self, damage: int):
         """ Damage self """
 
         self.health -= damage
-        if self.health < 1:
+        if self.health < 1 and not self.is_exploding:
             self.explode()
 
     def explode(self):
-        """ Explosion method """
+        """ Explosion method, pushes everything around, damages it and ignites explosives that blast the next tick """
 
         self.is_exploding = True
-        for obj in self.game.objects:
+        if hasattr(self.game, "light_map"):
+            self.game.light_map.flash(self.pos, self.explosion_power * 2, (255, 160, 60), self.explosion_time)
+        if hasattr(self.game, "particles"):
+            self.game.particles.explosion(self.pos, self.explosion_power, self.color)
+        # damaged enemies remove themselves from objects
+        for obj in list(self.game.objects):
             if obj == self:
-                return
+                continue
             d = distance(self.pos, obj.pos)
             angle = -rotate_to_cord(self.pos, obj.pos) + 90
             if d < 200:
-                obj.new_pos[0] += math.cos(deg_to_rad(angle)) * self.explosion_power
-                obj.new_pos[1] += math.sin(deg_to_rad(angle)) * self.explosion_power
+                push(self.game, obj, [math.cos(deg_to_rad(angle)) * self.explosion_power,
+                                      math.sin(deg_to_rad(angle)) * self.explosion_power])
                 if isinstance(obj, Explosive):
-                    obj.is_exploding = True
+                    if not obj.is_exploding:
+                        obj.ignited = True
                 else:
                     obj.damage(self.explosion_power // 10)
 
 
+def game_random(game, stream):
+    """ Returns random stream of the game world, games without streams use global random module """
+
+    streams = getattr(game, "random", None)
+    if streams is None:
+        return random
+    return streams[stream]
+
+
+def push(game, obj, displacement):
+    """ Pushes physics body by impulse, objects without body just move their target position """
+
+    physics = getattr(game, "physics", None)
+    if physics is not None and physics.has(obj):
+        physics.push(obj, displacement)
+    else:
+        obj.new_pos[0] += displacement[0]
+        obj.new_pos[1] += displacement[1]
+        if hasattr(game, "tweens"):
+            game.tweens.wake(obj)
+
+
 def shoot(self):
     """ Shoot method """
 
@@ -896,9 +1258,9 @@ def shoot(self):
         if obj == self:
             continue
 
-        hit_point = line_circle_intersection(self.pos, bullet_end, obj.pos, obj.size)
+        hit_point = segment_circle_hit(self.pos, bullet_end, obj.pos, obj.size)
 
-        if hit_point:
+        if hit_point is not None:
             distance = math.sqrt((hit_point[0] - self.pos[0]) ** 2 + (hit_point[1] - self.pos[1]) ** 2)
             if distance < closest_distance:
                 closest_distance = distance
@@ -908,8 +1270,9 @@ def shoot(self):
         hit_point, hit_object = closest_hit
         bullet_end = hit_point
 
-        hit_object.new_pos[0] += math.cos(deg_to_rad(self.angle)) * 1
-        hit_object.new_pos[1] += math.sin(deg_to_rad(self.angle)) * 1
+        push(self.game, hit_object, [math.cos(deg_to_rad(self.angle)) * 1, math.sin(deg_to_rad(self.angle)) * 1])
+        if hasattr(self.game, "particles"):
+            self.game.particles.impact(hit_point, self.angle, hit_object.color)
 
         hit_object.damage(5)
 
@@ -0,0 +1,237 @@
+"""
+Origin Game Engine Library.
+This file contains particle effects: explosions, impact sparks and other short living points.
+Particles live in fixed capacity NumPy pools, live ones are packed at the start of the arrays,
+integration and drawing are vectorized, so there is no Python object per particle.
+Particles are drawn as additive point splats straight into display pixels through surfarray.
+They are effects only, so they have their own random generator and never change the simulation.
+
+python particles.py benchmarks 100k live particles.
+"""
+
+import time
+import numpy as np
+import pygame
+
+
+class ParticlePool:
+    """
+    Fixed capacity arrays of particles.
+
+    drag: part of velocity kept every frame.
+    gravity: velocity added every frame.
+    size: side of the square splat in pixels.
+    """
+
+    def __init__(self, capacity=100000, drag=0.92, gravity=(0, 0), size=1):
+        self.capacity = capacity
+        self.drag = drag
+        self.gravity = np.array(gravity, dtype=np.float32)
+        self.size = size
+
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)  # frames left
+        self.lifetime = np.ones(capacity, dtype=np.float32)
+        self.colors = np.zeros((capacity, 3), dtype=np.uint8)
+
+        self.count = 0
+        self.dropped = 0  # particles that didn't fit into the pool
+
+    def emit(self, positions, velocities, life, colors):
+        """ Adds particles, particles that don't fit are dropped """
+
+        count = min(len(velocities), self.capacity - self.count)
+        self.dropped += len(velocities) - count
+        if count <= 0:
+            return
+        part = slice(self.count, self.count + count)
+        self.positions[part] = np.broadcast_to(positions, (len(velocities), 2))[:count]
+        self.velocities[part] = velocities[:count]
+        self.life[part] = np.broadcast_to(life, len(velocities))[:count]
+        self.lifetime[part] = self.life[part]
+        self.colors[part] = np.broadcast_to(colors, (len(velocities), 3))[:count]
+        self.count += count
+
+    def update(self):
+        """ Moves particles and removes dead ones """
+
+        count = self.count
+        if count == 0:
+            return
+        velocities = self.velocities[:count]
+        self.positions[:count] += velocities
+        velocities *= self.drag
+        if self.gravity.any():
+            velocities += self.gravity
+        life = self.life[:count]
+        life -= 1
+
+        alive = life > 0
+        if not alive.all():
+            # live particles are packed to the start, so every array is used up to count only
+            keep = np.flatnonzero(alive)
+            for array in (self.positions, self.velocities, self.life, self.lifetime, self.colors):
+                array[:len(keep)] = array[keep]
+            self.count = len(keep)
+
+    def shift(self, dx, dy):
+        """ Moves all particles, e.g. when the world scrolls """
+
+        self.positions[:self.count] += (dx, dy)
+
+    def clear(self):
+        """ Removes all particles """
+
+        self.count = 0
+
+    def draw(self, surface):
+        """ Adds colors of particles to surface pixels, particles fade out with their life """
+
+        count = self.count
+        if count == 0:
+            return
+        width, height = surface.get_size()
+        # whole contiguous array is converted at once, particles just left of the edge are clipped to it
+        xy = self.positions[:count].astype(np.int32)
+        x, y = xy[:, 0], xy[:, 1]
+        inside = (x >= 0) & (x <= width - self.size) & (y >= 0) & (y <= height - self.size)
+        # pixel index in rows of the surface, splat offsets are added to it
+        index = y * width + x
+        fade = self.life[:count] / self.lifetime[:count]
+        colors = self.colors[:count]
+        if not inside.all():
+            keep = np.flatnonzero(inside)
+            index, fade, colors = index.take(keep), fade.take(keep), colors.take(keep, axis=0)
+        if len(index) == 0:
+            return
+
+        if surface.get_bytesize() == 4:
+            pixels = pygame.surfarray.pixels2d(surface)
+            source = np.zeros((len(index), 4), dtype=np.uint8)
+            for channel, shift in enumerate(surface.get_shifts()[:3]):
+                source[:, shift // 8] = colors[:, channel] * fade
+            add = add_packed
+        else:
+            pixels = pygame.surfarray.pixels3d(surface)
+            source = (colors * fade[:, None]).astype(np.uint8)
+            add = add_channels
+        # rows of the surface are one flat array if there is no padding, flat indices are much faster
+        flat = pixels.transpose(1, 0, *range(2, pixels.ndim)).reshape(-1, *pixels.shape[2:])
+        if not np.shares_memory(flat, pixels):
+            flat = None
+            x, y = index % width, index // width
+        try:
+            for dx in range(self.size):
+                for dy in range(self.size):
+                    # overlapping particles write the same pixel, the last one wins
+                    if flat is not None:
+                        splat = index + (dy * width + dx)
+                        flat[splat] = add(flat[splat], source)
+                    else:
+                        pixels[x + dx, y + dy] = add(pixels[x + dx, y + dy], source)
+        finally:
+            # surface stays locked while the pixel arrays exist
+            del pixels, flat
+
+
+def add_packed(pixels, colors):
+    """ Returns packed 32 bit pixels with byte colors added, channels saturate at 255 """
+
+    target = pixels.view(np.uint8).reshape(-1, 4)
+    result = target + colors
+    result[result < target] = 255
+    return result.view(pixels.dtype).reshape(pixels.shape)
+
+
+def add_channels(pixels, colors):
+    """ Returns pixels (N, 3) with colors added, channels saturate at 255 """
+
+    result = pixels + colors
+    result[result < pixels] = 255
+    return result
+
+
+class ParticleSystem:
+    """ Particle effects of a game """
+
+    def __init__(self, game, capacity=100000, enabled=True, seed=None):
+        self.game = game
+        self.enabled = enabled
+        self.pool = ParticlePool(capacity)
+        self.rng = np.random.default_rng(seed)
+
+    def burst(self, pos, count, speed, color, life=30, angle=0, spread=360, speed_jitter=0.7, color_jitter=40):
+        """
+        Emits particles from one point.
+
+        angle, spread: direction and width of the cone in degrees.
+        speed_jitter: particles get from speed * (1 - speed_jitter) to speed.
+        """
+
+        if not self.enabled or count <= 0:
+            return
+        rng = self.rng
+        angles = np.radians(angle + rng.uniform(-spread / 2, spread / 2, count))
+        speeds = speed * (1 - speed_jitter * rng.random(count))
+        velocities = np.stack([np.cos(angles), np.sin(angles)], axis=1) * speeds[:, None]
+        lives = life * rng.uniform(0.5, 1, count)
+        colors = np.clip(np.array(color[:3]) + rng.integers(-color_jitter, color_jitter + 1, (count, 3)), 0, 255)
+        self.pool.emit(np.array(pos[:2], dtype=np.float32), velocities, lives, colors)
+
+    def explosion(self, pos, power, color=(255, 160, 60)):
+        """ Emits fire and debris of an explosion, power is the explosion radius """
+
+        self.burst(pos, int(power * 3), power / 8, (255, 170, 60), life=40)
+        self.burst(pos, int(power), power / 5, color, life=25)
+
+    def impact(self, pos, angle, color=(255, 220, 150)):
+        """ Emits sparks of a bullet hit flying back to the shooter, angle is the bullet direction """
+
+        self.burst(pos, 12, 6, color, life=12, angle=angle + 180, spread=100)
+
+    def shift(self, dx, dy):
+        """ Moves all particles with the scrolling world """
+
+        self.pool.shift(dx, dy)
+
+    def update(self):
+        """ Moves particles """
+
+        self.pool.update()
+
+    def draw(self, surface=None):
+        """ Draws particles onto the surface, display by default """
+
+        if not self.enabled:
+            return
+        if surface is None:
+            surface = self.game.app.DISPLAY
+        self.pool.draw(surface)
+
+
+def benchmark(count=100000, frames=60, size=(1280, 720)):
+    """ Returns average milliseconds of update and draw of count live particles """
+
+    surface = pygame.Surface(size)
+    pool = ParticlePool(count)
+    rng = np.random.default_rng(1)
+    life = frames * 2
+    pool.emit(rng.uniform((0, 0), size, (count, 2)), rng.normal(0, 1, (count, 2)), np.full(count, life),
+              rng.integers(0, 256, (count, 3)))
+    update = draw = 0
+    for _ in range(frames):
+        surface.fill((0, 0, 0))
+        start = time.perf_counter()
+        pool.update()
+        middle = time.perf_counter()
+        pool.draw(surface)
+        end = time.perf_counter()
+        update += middle - start
+        draw += end - middle
+    return {"particles": pool.count, "update_ms": update / frames * 1000, "draw_ms": draw / frames * 1000}
+
+
+if __name__ == "__main__":
+    for name, value in benchmark().items():
+        print(f"{name}: {value:.2f}")
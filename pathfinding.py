@@ -0,0 +1,258 @@
+"""
+Origin Game Engine Library.
+This file contains pathfinding over occupancy grid built from obstacles.
+Flow field rebuilds are time-sliced: every tick they get a budget of node expansions,
+so rebuilds never spike frame time. Flow field towards the player is shared by all chasing enemies.
+Grid is kept in world coordinates, the screen scrolls over it, so moving player doesn't move the obstacles in it.
+"""
+
+import heapq
+import numpy as np
+from functions import *
+
+NEIGHBORS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+             (1, 1, 2 ** 0.5), (1, -1, 2 ** 0.5), (-1, 1, 2 ** 0.5), (-1, -1, 2 ** 0.5)]
+
+
+class OccupancyGrid:
+    """ Grid of blocked cells built from circle obstacles """
+
+    def __init__(self, width, height, cell_size=20):
+        self.cell_size = cell_size
+        self.columns = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+
+        # how many obstacles cover every cell
+        self.counts = np.zeros((self.columns, self.rows), dtype=np.int32)
+        # cells covered by every obstacle, {id(obstacle): (cx1, cx2, cy1, cy2)}
+        self.covered = {}
+        self.version = 0
+
+    def cell(self, pos):
+        """ Returns grid cell of the position """
+
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def center(self, cell):
+        """ Returns position of the cell center """
+
+        return [(cell[0] + 0.5) * self.cell_size, (cell[1] + 0.5) * self.cell_size]
+
+    def inside(self, cell) -> bool:
+        """ Checks if cell is inside the grid """
+
+        return 0 <= cell[0] < self.columns and 0 <= cell[1] < self.rows
+
+    def blocked(self, cell) -> bool:
+        """ Checks if cell is blocked, cells outside of the grid are blocked """
+
+        return not self.inside(cell) or self.counts[cell[0], cell[1]] > 0
+
+    def blocked_at(self, pos) -> bool:
+        """ Checks if position is inside blocked cell """
+
+        return self.blocked(self.cell(pos))
+
+    def cover(self, pos, radius):
+        """ Returns range of cells covered by a circle, clipped to the grid """
+
+        cx1, cy1 = self.cell((pos[0] - radius, pos[1] - radius))
+        cx2, cy2 = self.cell((pos[0] + radius, pos[1] + radius))
+        return max(cx1, 0), min(cx2 + 1, self.columns), max(cy1, 0), min(cy2 + 1, self.rows)
+
+    def update(self, obstacles, margin=0, offset=(0, 0), attribute="pos"):
+        """
+        Incrementally updates grid from obstacles with size, position is read from attribute and offset is subtracted.
+        Only obstacles whose covered cells changed touch the grid. Returns True if grid changed.
+        """
+
+        changed = False
+        alive = set()
+        for obstacle in obstacles:
+            key = id(obstacle)
+            alive.add(key)
+            pos = getattr(obstacle, attribute)
+            cells = self.cover((pos[0] - offset[0], pos[1] - offset[1]), obstacle.size + margin)
+            old = self.covered.get(key)
+            if old == cells:
+                continue
+            if old is not None:
+                self.counts[old[0]:old[1], old[2]:old[3]] -= 1
+            self.counts[cells[0]:cells[1], cells[2]:cells[3]] += 1
+            self.covered[key] = cells
+            changed = True
+        for key in list(self.covered):
+            if key not in alive:
+                old = self.covered.pop(key)
+                self.counts[old[0]:old[1], old[2]:old[3]] -= 1
+                changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def clear(self):
+        """ Removes all obstacles from the grid """
+
+        self.counts[...] = 0
+        self.covered.clear()
+        self.version += 1
+
+    def neighbors(self, cell):
+        """ Yields free neighbor cells and step costs, diagonal steps can't cut corners """
+
+        x, y = cell
+        for dx, dy, cost in NEIGHBORS:
+            n = (x + dx, y + dy)
+            if self.blocked(n):
+                continue
+            if dx and dy and (self.blocked((x + dx, y)) or self.blocked((x, y + dy))):
+                continue
+            yield n, cost
+
+
+class FlowField:
+    """ Distances to the goal from every free cell, built by Dijkstra over limited budget per call """
+
+    def __init__(self, grid, goal, origin=(0, 0)):
+        self.grid = grid
+        self.goal = grid.cell(goal)
+        self.version = grid.version
+        # world position of the grid corner when the field was built
+        self.origin = tuple(origin)
+        self.cost = np.full((grid.columns, grid.rows), np.inf)
+        self.open = []
+        if not grid.blocked(self.goal):
+            self.cost[self.goal] = 0
+            self.open.append((0.0, self.goal))
+        self.done = not self.open
+
+    def step(self, budget) -> int:
+        """ Expands up to budget cells, returns number of used expansions """
+
+        used = 0
+        while self.open and used < budget:
+            cost, cell = heapq.heappop(self.open)
+            used += 1
+            if cost > self.cost[cell]:
+                continue
+            for neighbor, step_cost in self.grid.neighbors(cell):
+                new_cost = cost + step_cost
+                if new_cost < self.cost[neighbor]:
+                    self.cost[neighbor] = new_cost
+                    heapq.heappush(self.open, (new_cost, neighbor))
+        if not self.open:
+            self.done = True
+        return used
+
+    def reached(self, cell) -> bool:
+        """ Checks if cell is inside the field and has a path to the goal """
+
+        return self.grid.inside(cell) and self.cost[cell] < np.inf
+
+    def direction(self, pos):
+        """
+        Returns angle in degrees towards the cheapest neighbor cell or None.
+        Only own costs are read, so the field stays usable after the grid moved or changed.
+        """
+
+        cell = self.grid.cell(pos)
+        if not self.grid.inside(cell):
+            return None
+        x, y = cell
+        best = None
+        best_cost = self.cost[cell]
+        for dx, dy, _ in NEIGHBORS:
+            neighbor = (x + dx, y + dy)
+            if not self.reached(neighbor) or self.cost[neighbor] >= best_cost:
+                continue
+            if dx and dy and not (self.reached((x + dx, y)) and self.reached((x, y + dy))):
+                continue
+            best_cost = self.cost[neighbor]
+            best = neighbor
+        if best is None:
+            return None
+        return rad_to_deg(math.atan2(best[1] - cell[1], best[0] - cell[0]))
+
+
+class PathService:
+    """
+    Pathfinding service of the game.
+    Keeps occupancy grid updated from obstacles and keeps flow field towards the player.
+    Flow field is rebuilt in the background over several ticks, old field is used until the new one is ready.
+
+    Screen scrolls over the world, scroll is the screen position of the world origin.
+    Grid covers one and a half screens around the player in the world and is moved only when the screen leaves it.
+    Obstacles are put in the grid at their target positions, which move only with the scroll,
+    so grid version changes only when obstacles really move.
+    """
+
+    def __init__(self, game, cell_size=20, budget=400, margin=10):
+        self.game = game
+        self.budget = budget
+        self.margin = margin
+        self.width = self.game.app.WIDTH * 3 // 2
+        self.height = self.game.app.HEIGHT * 3 // 2
+        self.grid = OccupancyGrid(self.width, self.height, cell_size)
+        self.scroll = [0.0, 0.0]
+        # world position of the grid corner, multiple of the cell size
+        self.origin = (0, 0)
+        # player stays in the middle of the screen
+        self.recenter((self.game.app.H_WIDTH, self.game.app.H_HEIGHT))
+
+        self.flow_field = None
+        self.next_flow_field = None
+
+    def shift(self, dx, dy):
+        """ Moves the screen over the world, called when everything on the screen is moved by dx, dy """
+
+        self.scroll[0] += dx
+        self.scroll[1] += dy
+
+    def local(self, pos, origin=None):
+        """ Returns position on the grid of screen position """
+
+        if origin is None:
+            origin = self.origin
+        return pos[0] - self.scroll[0] - origin[0], pos[1] - self.scroll[1] - origin[1]
+
+    def recenter(self, pos):
+        """ Moves grid so that screen position is in its middle, grid has to be filled again """
+
+        size = self.grid.cell_size
+        x = pos[0] - self.scroll[0] - self.width / 2
+        y = pos[1] - self.scroll[1] - self.height / 2
+        self.origin = (int(x // size) * size, int(y // size) * size)
+        self.grid.clear()
+
+    def blocked_at(self, pos) -> bool:
+        """ Checks if screen position is inside blocked cell """
+
+        return self.grid.blocked_at(self.local(pos))
+
+    def direction(self, pos):
+        """ Returns angle in degrees to move from screen position towards the player or None """
+
+        if self.flow_field is None:
+            return None
+        return self.flow_field.direction(self.local(pos, self.flow_field.origin))
+
+    def update(self, obstacles):
+        """ Updates grid from obstacles selected by the game and spends expansion budget on flow field """
+
+        # screen stays covered while the player is within a quarter of the screen from the grid center
+        x, y = self.local(self.game.player.pos)
+        if abs(x - self.width / 2) > self.game.app.WIDTH / 4 or abs(y - self.height / 2) > self.game.app.HEIGHT / 4:
+            self.recenter(self.game.player.pos)
+        offset = (self.scroll[0] + self.origin[0], self.scroll[1] + self.origin[1])
+        self.grid.update(obstacles, self.margin, offset, "new_pos")
+
+        goal = self.local(self.game.player.pos)
+        # rebuild in progress is always finished, otherwise constant changes would starve it
+        if self.next_flow_field is None and (self.flow_field is None or self.flow_field.origin != self.origin
+                                             or self.flow_field.goal != self.grid.cell(goal)
+                                             or self.flow_field.version != self.grid.version):
+            self.next_flow_field = FlowField(self.grid, goal, self.origin)
+        if self.next_flow_field is not None:
+            self.next_flow_field.step(self.budget)
+            if self.next_flow_field.done:
+                self.flow_field, self.next_flow_field = self.next_flow_field, None
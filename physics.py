@@ -0,0 +1,346 @@
+"""
+Origin Game Engine Library.
+This file contains simple 2D rigid-body physics of circle bodies.
+Body state is kept in arrays, integration and contact solving run vectorized over awake bodies only.
+Bodies that stay still fall asleep together with their island and cost nothing until something touches them.
+Game objects opt in by having a mass attribute, physics moves their pos and new_pos by the same displacement.
+Positions of bodies are kept in an array too, only awake bodies and bodies reported by moved are read from objects,
+and a step only looks at awake bodies and bodies in grid cells around them.
+"""
+
+import numpy as np
+from spatial import grid_pairs
+from steering import normalize, scatter_add
+
+
+def circle_contacts(positions, radii, awake, static):
+    """
+    Returns contacts between circles as index arrays i, j, normals from i to j and penetration depths.
+    Only pairs with at least one awake body are checked, pairs of sleeping bodies are never looked at.
+    """
+
+    active = np.flatnonzero(awake)
+    empty = np.zeros(0, dtype=np.int64)
+    if len(active) == 0 or len(positions) < 2:
+        return empty, empty, np.zeros((0, 2)), np.zeros(0)
+
+    a, j = grid_pairs(positions[active], radii.max() * 2, positions)
+    i = active[a]
+    # every pair once: pairs of two awake bodies are found twice, static bodies never collide with each other
+    keep = (i != j) & ((i < j) | ~awake[j]) & ~(static[i] & static[j])
+    i, j = i[keep], j[keep]
+    normals, lengths = normalize(positions[j] - positions[i])
+    depth = radii[i] + radii[j] - lengths
+    touching = depth > 0
+    normals = normals[touching]
+    # bodies exactly on top of each other are pushed apart along x
+    normals[lengths[touching] == 0] = (1, 0)
+    return i[touching], j[touching], normals, depth[touching]
+
+
+def circle_rect_contacts(positions, radii, rect_min, rect_max):
+    """
+    Returns contacts between circles and static rectangles as index arrays i, k,
+    normals from circle to rectangle and penetration depths.
+    """
+
+    empty = np.zeros(0, dtype=np.int64)
+    if len(positions) == 0 or len(rect_min) == 0:
+        return empty, empty, np.zeros((0, 2)), np.zeros(0)
+
+    closest = np.clip(positions[:, None, :], rect_min[None], rect_max[None])
+    delta = closest - positions[:, None, :]
+    squared = np.einsum("ijk,ijk->ij", delta, delta)
+    i, k = np.nonzero(squared < radii[:, None] ** 2)
+    normals, lengths = normalize(delta[i, k])
+
+    # center inside the rectangle, push out through the nearest side
+    inside = lengths == 0
+    if inside.any():
+        p = positions[i[inside]]
+        distances = np.stack([p[:, 0] - rect_min[k[inside], 0], rect_max[k[inside], 0] - p[:, 0],
+                              p[:, 1] - rect_min[k[inside], 1], rect_max[k[inside], 1] - p[:, 1]], axis=1)
+        side = distances.argmin(axis=1)
+        sides = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.float64)
+        normals[inside] = sides[side]
+        lengths[inside] = -distances[np.arange(len(side)), side]
+    return i, k, normals, radii[i] - lengths
+
+
+def cell_keys(positions, size):
+    """ Returns keys of grid cells of positions, cells are squares of size """
+
+    cells = np.floor(positions / size).astype(np.int64)
+    return cells[:, 0] * 2 ** 32 + cells[:, 1]
+
+
+def nearby(positions, centers, size):
+    """ Checks which positions are in grid cells of size around centers, so they may be closer than size to them """
+
+    offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.float64) * size
+    around = cell_keys((centers[:, None, :] + offsets[None]).reshape(-1, 2), size)
+    return np.isin(cell_keys(positions, size), around)
+
+
+def islands(count, i, j):
+    """ Returns island label of every body, bodies connected by contacts i, j get the same label """
+
+    labels = np.arange(count)
+    if len(i) == 0:
+        return labels
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        new = labels.copy()
+        np.minimum.at(new, i, low)
+        np.minimum.at(new, j, low)
+        new = new[new]
+        if (new == labels).all():
+            return labels
+        labels = new
+
+
+class PhysicsWorld:
+    """
+    World of circle bodies and static rectangles.
+
+    damping: part of velocity kept every frame.
+    restitution: bounciness of contacts.
+    sleep_speed, sleep_frames: bodies slower than sleep_speed for sleep_frames frames fall asleep with their island.
+    """
+
+    def __init__(self, game, damping=0.9, restitution=0.3, iterations=4, correction=0.8, slop=0.5,
+                 sleep_speed=0.05, sleep_frames=30, capacity=64):
+        self.game = game
+        self.damping = damping
+        self.restitution = restitution
+        self.iterations = iterations
+        self.correction = correction
+        self.slop = slop
+        self.sleep_speed = sleep_speed
+        self.sleep_frames = sleep_frames
+
+        self.bodies = [None] * capacity
+        self.index = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.velocities = np.zeros((capacity, 2))
+        self.positions = np.zeros((capacity, 2))
+        self.stale = np.zeros(capacity, dtype=bool)  # positions changed by other code, read again next step
+        self.inverse_masses = np.zeros(capacity)
+        self.radii = np.zeros(capacity)
+        self.used = np.zeros(capacity, dtype=bool)
+        self.awake = np.zeros(capacity, dtype=bool)
+        self.still_frames = np.zeros(capacity, dtype=np.int64)
+
+        self.rect_min = np.zeros((0, 2))
+        self.rect_max = np.zeros((0, 2))
+
+        self.contacts = 0
+        self.islands = 0
+
+    def grow(self):
+        """ Doubles capacity of body arrays """
+
+        capacity = len(self.bodies)
+        self.bodies.extend([None] * capacity)
+        self.free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+        self.velocities = np.concatenate([self.velocities, np.zeros((capacity, 2))])
+        self.positions = np.concatenate([self.positions, np.zeros((capacity, 2))])
+        for name in ("stale", "inverse_masses", "radii", "used", "awake", "still_frames"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(capacity, dtype=array.dtype)]))
+
+    def add(self, obj, mass=None):
+        """ Adds object with pos, new_pos and size as a body, mass 0 makes it static """
+
+        if id(obj) in self.index:
+            return self.index[id(obj)]
+        if not self.free:
+            self.grow()
+        if mass is None:
+            mass = obj.mass
+        index = self.free.pop()
+        self.bodies[index] = obj
+        self.index[id(obj)] = index
+        self.velocities[index] = 0
+        self.positions[index] = obj.pos
+        self.stale[index] = False
+        self.inverse_masses[index] = 1 / mass if mass > 0 else 0
+        self.radii[index] = obj.size
+        self.used[index] = True
+        self.awake[index] = True
+        self.still_frames[index] = 0
+        return index
+
+    def remove(self, obj):
+        """ Removes body of the object """
+
+        index = self.index.pop(id(obj), None)
+        if index is None:
+            return
+        self.bodies[index] = None
+        self.used[index] = False
+        self.awake[index] = False
+        self.free.append(index)
+
+    def has(self, obj) -> bool:
+        """ Checks if object is a body of the world """
+
+        return id(obj) in self.index
+
+    def clear(self):
+        """ Removes all bodies and rectangles """
+
+        for obj in [obj for obj in self.bodies if obj is not None]:
+            self.remove(obj)
+        self.rect_min = np.zeros((0, 2))
+        self.rect_max = np.zeros((0, 2))
+
+    def add_rect(self, pos, size):
+        """ Adds static rectangle """
+
+        self.rect_min = np.vstack([self.rect_min, [pos[0], pos[1]]])
+        self.rect_max = np.vstack([self.rect_max, [pos[0] + size[0], pos[1] + size[1]]])
+
+    def moved(self, objects):
+        """ Marks positions of bodies of the objects as changed outside of physics, for example by smoothing """
+
+        index = self.index
+        stale = [index[id(obj)] for obj in objects if id(obj) in index]
+        self.stale[stale] = True
+
+    def wake(self, obj):
+        """ Wakes body of the object """
+
+        index = self.index[id(obj)]
+        self.awake[index] = True
+        self.still_frames[index] = 0
+
+    def apply_impulse(self, obj, impulse):
+        """ Changes velocity of the body by impulse divided by its mass and wakes it """
+
+        index = self.index[id(obj)]
+        self.velocities[index, 0] += impulse[0] * self.inverse_masses[index]
+        self.velocities[index, 1] += impulse[1] * self.inverse_masses[index]
+        self.awake[index] = True
+        self.still_frames[index] = 0
+
+    def push(self, obj, displacement):
+        """ Applies impulse that moves a body of mass 1 by displacement until it stops """
+
+        self.apply_impulse(obj, (displacement[0] * (1 - self.damping), displacement[1] * (1 - self.damping)))
+
+    def solve(self, positions, velocities, inverse, i, j, normals, depth, rect_i, rect_normals, rect_depth):
+        """
+        Applies contact impulses and position corrections.
+        Jacobi iterations over all contacts at once, change of every body is averaged over its contacts.
+        """
+
+        size = len(positions)
+        total = inverse[i] + inverse[j]
+        dynamic = total > 0
+        i, j, normals, depth, total = i[dynamic], j[dynamic], normals[dynamic], depth[dynamic], total[dynamic]
+        counts = np.maximum(np.bincount(i, minlength=size) + np.bincount(j, minlength=size) +
+                            np.bincount(rect_i, minlength=size), 1)[:, None]
+
+        for _ in range(self.iterations):
+            # only approaching bodies exchange impulse
+            relative = np.einsum("ij,ij->i", velocities[j] - velocities[i], normals)
+            magnitude = np.where(relative < 0, -(1 + self.restitution) * relative / total, 0)
+            impulse = normals * magnitude[:, None]
+            change = (scatter_add(j, impulse, size) - scatter_add(i, impulse, size)) * inverse[:, None]
+
+            # rectangles are static, so velocity changes regardless of mass
+            relative = np.einsum("ij,ij->i", velocities[rect_i], rect_normals)
+            magnitude = np.where(relative > 0, (1 + self.restitution) * relative, 0)
+            change -= scatter_add(rect_i, rect_normals * magnitude[:, None], size)
+
+            velocities += change / counts
+
+        # positions are corrected once, split by inverse masses
+        correction = np.maximum(depth - self.slop, 0) * self.correction / total
+        shift = normals * correction[:, None]
+        positions += (scatter_add(j, shift, size) - scatter_add(i, shift, size)) * inverse[:, None]
+        correction = np.maximum(rect_depth - self.slop, 0) * self.correction
+        positions -= scatter_add(rect_i, rect_normals * correction[:, None], size)
+
+    def step(self):
+        """ Integrates awake bodies, solves contacts and puts bodies to sleep """
+
+        if not (self.awake & self.used).any():
+            self.contacts = 0
+            self.islands = 0
+            return
+
+        # only awake bodies and bodies moved by other code are read from objects, the rest keeps stored positions
+        sync = np.flatnonzero((self.awake | self.stale) & self.used)
+        self.positions[sync] = [self.bodies[index].pos for index in sync.tolist()]
+        self.stale[sync] = False
+
+        # bodies far from awake ones can't touch them this step, so they are left out of the step
+        used = np.flatnonzero(self.used)
+        reach = self.radii[used].max() * 2
+        awake_indices = np.flatnonzero(self.awake & self.used)
+        moved = self.positions[awake_indices] + self.velocities[awake_indices]
+        near = used[nearby(self.positions[used], np.concatenate([self.positions[awake_indices], moved]), reach)]
+        indices = np.union1d(near, awake_indices)
+
+        positions = self.positions[indices]
+        start = positions.copy()
+        velocities = self.velocities[indices]
+        inverse = self.inverse_masses[indices]
+        radii = self.radii[indices]
+        awake = self.awake[indices]
+        still_frames = self.still_frames[indices]
+        static = inverse == 0
+
+        moving = awake & ~static
+        positions[moving] += velocities[moving]
+        velocities[moving] *= self.damping
+
+        i, j, normals, depth = circle_contacts(positions, radii, awake, static)
+        # touched sleeping bodies wake up
+        touched = np.concatenate([i, j])
+        touched = touched[~static[touched] & ~awake[touched]]
+        awake[touched] = True
+        still_frames[touched] = 0
+        moving = awake & ~static
+
+        active = np.flatnonzero(moving)
+        rect_a, _, rect_normals, rect_depth = circle_rect_contacts(positions[active], radii[active],
+                                                                   self.rect_min, self.rect_max)
+        rect_i = active[rect_a]
+        self.contacts = len(i) + len(rect_i)
+
+        self.solve(positions, velocities, inverse, i, j, normals, depth, rect_i, rect_normals, rect_depth)
+
+        # moved bodies get the same displacement of pos and new_pos, so lerp doesn't pull them back
+        changed = np.flatnonzero(moving)
+        displacement = positions[changed] - start[changed]
+        bodies = self.bodies
+        for index, (dx, dy) in zip(indices[changed].tolist(), displacement.tolist()):
+            if dx or dy:
+                obj = bodies[index]
+                obj.pos[0] += dx
+                obj.pos[1] += dy
+                obj.new_pos[0] += dx
+                obj.new_pos[1] += dy
+
+        # island sleeps when all of its bodies are still
+        still = np.einsum("ij,ij->i", velocities, velocities) < self.sleep_speed ** 2
+        still_frames = np.where(still & awake, still_frames + 1, 0)
+        links = ~static[i] & ~static[j]
+        labels = islands(len(indices), i[links], j[links])
+        island_frames = np.full(len(indices), np.iinfo(np.int64).max)
+        np.minimum.at(island_frames, labels[moving], still_frames[moving])
+        asleep = moving & (island_frames[labels] >= self.sleep_frames)
+        awake[asleep] = False
+        velocities[asleep] = 0
+        still_frames[asleep] = 0
+        # static bodies never need to be awake
+        awake[static] = False
+        self.islands = len(np.unique(labels[awake]))
+
+        self.positions[indices] = positions
+        self.velocities[indices] = velocities
+        self.awake[indices] = awake
+        self.still_frames[indices] = still_frames
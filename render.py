@@ -0,0 +1,161 @@
+"""
+Origin Game Engine Library.
+This file contains render queue that separates drawing from game logic.
+Objects submit draw commands with layer and z-order, queue sorts them and draws them once per frame.
+"""
+
+import pygame
+from stamps import circle_stamp
+
+LAYER_BACKGROUND = 0
+LAYER_WORLD = 10
+LAYER_EFFECTS = 20
+LAYER_DEBUG = 30
+LAYER_UI = 40
+
+POLYGON = 0
+LINE = 1
+RECT = 2
+BLIT = 3
+
+
+class RenderQueue:
+    """
+    Render queue for game objects.
+    When disabled every command is dropped, so the game can be simulated without rendering.
+    """
+
+    def __init__(self, game, enabled=True):
+        self.game = game
+        self.enabled = enabled
+
+        # commands are (layer, z, order, kind, args)
+        self.commands = []
+
+    def submit(self, kind, args, layer=LAYER_WORLD, z=0):
+        """ Adds draw command to the queue """
+
+        if self.enabled:
+            self.commands.append((layer, z, len(self.commands), kind, args))
+
+    def circle(self, color, center, radius, width=0, layer=LAYER_WORLD, z=0):
+        """ Submits circle. Circles are drawn as cached stamps, so they are batched with other blits """
+
+        if not self.enabled:
+            return
+        radius = int(radius)
+        if radius < 1:
+            return
+        self.submit(BLIT, (circle_stamp(radius, tuple(color), width), (center[0] - radius, center[1] - radius), 0),
+                    layer, z)
+
+    def polygon(self, color, points, width=0, layer=LAYER_WORLD, z=0):
+        """ Submits polygon """
+
+        self.submit(POLYGON, (color, [tuple(p) for p in points], width), layer, z)
+
+    def line(self, color, start, end, width=1, layer=LAYER_WORLD, z=0):
+        """ Submits line """
+
+        self.submit(LINE, (color, tuple(start), tuple(end), width), layer, z)
+
+    def rect(self, color, rect, width=0, layer=LAYER_WORLD, z=0):
+        """ Submits rectangle """
+
+        self.submit(RECT, (color, rect, width), layer, z)
+
+    def blit(self, surface, pos, layer=LAYER_WORLD, z=0, special_flags=0):
+        """ Submits surface blit """
+
+        self.submit(BLIT, (surface, tuple(pos), special_flags), layer, z)
+
+    def clear(self):
+        """ Drops all submitted commands """
+
+        self.commands.clear()
+
+    def flush(self, surface=None):
+        """ Draws all submitted commands sorted by layer and z-order and clears the queue """
+
+        if not self.enabled:
+            self.commands.clear()
+            return
+        if surface is None:
+            surface = self.game.app.DISPLAY
+
+        self.commands.sort()
+        batch = []
+        for layer, z, order, kind, args in self.commands:
+            if kind == BLIT and args[2] == 0:
+                batch.append((args[0], args[1]))
+                continue
+            if batch:
+                surface.blits(batch, False)
+                batch = []
+            if kind == BLIT:
+                surface.blit(args[0], args[1], special_flags=args[2])
+            elif kind == POLYGON:
+                pygame.draw.polygon(surface, *args)
+            elif kind == LINE:
+                pygame.draw.line(surface, *args)
+            elif kind == RECT:
+                pygame.draw.rect(surface, *args)
+        if batch:
+            surface.blits(batch, False)
+        self.commands.clear()
+
+
+def get_queue(game):
+    """ Returns render queue of the game or None if game draws immediately """
+
+    return getattr(game, "render_queue", None)
+
+
+def draw_circle(game, color, center, radius, width=0, layer=LAYER_WORLD, z=0):
+    """ Draws circle through game render queue or immediately if game has no queue """
+
+    queue = get_queue(game)
+    if queue is None:
+        pygame.draw.circle(game.app.DISPLAY, color, center, radius, width)
+    else:
+        queue.circle(color, center, radius, width, layer, z)
+
+
+def draw_polygon(game, color, points, width=0, layer=LAYER_WORLD, z=0):
+    """ Draws polygon through game render queue or immediately if game has no queue """
+
+    queue = get_queue(game)
+    if queue is None:
+        pygame.draw.polygon(game.app.DISPLAY, color, points, width)
+    else:
+        queue.polygon(color, points, width, layer, z)
+
+
+def draw_line(game, color, start, end, width=1, layer=LAYER_WORLD, z=0):
+    """ Draws line through game render queue or immediately if game has no queue """
+
+    queue = get_queue(game)
+    if queue is None:
+        pygame.draw.line(game.app.DISPLAY, color, start, end, width)
+    else:
+        queue.line(color, start, end, width, layer, z)
+
+
+def draw_rect(game, color, rect, width=0, layer=LAYER_WORLD, z=0):
+    """ Draws rectangle through game render queue or immediately if game has no queue """
+
+    queue = get_queue(game)
+    if queue is None:
+        pygame.draw.rect(game.app.DISPLAY, color, rect, width)
+    else:
+        queue.rect(color, rect, width, layer, z)
+
+
+def draw_blit(game, surface, pos, layer=LAYER_WORLD, z=0, special_flags=0):
+    """ Blits surface through game render queue or immediately if game has no queue """
+
+    queue = get_queue(game)
+    if queue is None:
+        game.app.DISPLAY.blit(surface, pos, special_flags=special_flags)
+    else:
+        queue.blit(surface, pos, layer, z, special_flags)
@@ -0,0 +1,76 @@
+"""
+Origin Game Engine Library.
+This file contains rotation cache for sprites.
+Angles are quantized, rotated surfaces are cached per (image, angle) and least recently used ones are evicted.
+Rotation sheets can be pre-baked at load time, baked frames are never evicted.
+"""
+
+import pygame
+from collections import OrderedDict
+from functions import *
+
+
+class RotationCache:
+    """ Caches rotated surfaces per image and quantized angle """
+
+    def __init__(self, step=1, max_size=1024):
+        self.step = step
+        self.max_size = max_size
+
+        # keys are (id(image), quantized angle), values are (image, rotated image)
+        self.cache = OrderedDict()
+        self.sheets = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, angle, step=None) -> float:
+        """ Rounds angle to the nearest cached angle in range [0, 360) """
+
+        if step is None:
+            step = self.step
+        return (round(angle / step) * step) % 360
+
+    def get(self, image, angle):
+        """ Returns image rotated to the quantized angle and the quantized angle """
+
+        sheet = self.sheets.get(id(image))
+        if sheet is not None and sheet[0] is image:
+            frames = sheet[1]
+            index = round(angle / 360 * len(frames)) % len(frames)
+            self.hits += 1
+            return frames[index], index * 360 / len(frames)
+
+        angle = self.quantize(angle)
+        key = (id(image), angle)
+        entry = self.cache.get(key)
+        # keeping image reference in the entry makes sure its id is not reused by another image
+        if entry is not None and entry[0] is image:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry[1], angle
+
+        self.misses += 1
+        rotated_image = pygame.transform.rotate(image, angle)
+        self.cache[key] = (image, rotated_image)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return rotated_image, angle
+
+    def bake(self, image, frames=72):
+        """ Pre-bakes rotation sheet of given number of frames evenly covering 360 degrees """
+
+        self.sheets[id(image)] = (image, [pygame.transform.rotate(image, i * 360 / frames) for i in range(frames)])
+
+    def rotate(self, image, pos, origin_pos, angle, offset=(25, 25)):
+        """ Same as objects.rotate, but uses cached surfaces """
+
+        rotated_image, angle = self.get(image, angle)
+        origin = rotated_origin(image.get_size(), pos, origin_pos, angle)
+        return rotated_image, [origin[0] + offset[0], origin[1] + offset[1]]
+
+    def clear(self):
+        """ Drops all cached rotations and rotation sheets """
+
+        self.cache.clear()
+        self.sheets.clear()
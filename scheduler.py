@@ -0,0 +1,147 @@
+"""
+Origin Game Engine Library.
+This file contains level-of-detail update scheduler.
+Objects far from the player or off screen are updated every Nth frame with limited budget per frame,
+between updates they are only interpolated towards their target position and drawn if visible.
+"""
+
+from functions import *
+from tween import follow_targets
+
+
+class LODScheduler:
+    """
+    Assigns update period to every object by LOD tier.
+
+    tiers: list of (max distance to the player, update period in frames) sorted by distance.
+    Objects farther than the last tier use the last period. Visible objects use at most visible_period.
+    budget: maximal number of objects of lower tiers updated per frame, the rest waits in round-robin order.
+    """
+
+    def __init__(self, game, tiers=None, visible_period=1, budget=200, margin=100):
+        self.game = game
+        if tiers is None:
+            self.tiers = [(400, 1), (1200, 4), (float("inf"), 8)]
+        else:
+            self.tiers = tiers
+        self.visible_period = visible_period
+        self.budget = budget
+        self.margin = margin
+
+        self.frame = 0
+        # frame of the last update of every object, {id(object): frame}
+        self.last_update = {}
+        # references keep tracked objects alive, so their ids can't be reused by new objects
+        self.tracked = {}
+        # count of objects seen, spreads first updates over the period in order objects appear
+        self.sequence = 0
+
+        self.updated = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.total_updated = 0
+        self.total_skipped = 0
+
+    def visible(self, obj) -> bool:
+        """ Checks if object is on screen """
+
+        x, y = obj.pos
+        return (-self.margin < x < self.game.app.WIDTH + self.margin and
+                -self.margin < y < self.game.app.HEIGHT + self.margin)
+
+    def period(self, obj, visible) -> int:
+        """ Returns update period of the object """
+
+        # objects without draw method draw in update, exploding explosives animate every frame,
+        # ignited ones blast on the next one
+        if not hasattr(obj, "draw") or getattr(obj, "is_exploding", False) or getattr(obj, "ignited", False) or \
+                obj is getattr(self.game, "player", None):
+            return 1
+        d = distance(obj.pos, self.game.player.pos)
+        period = self.tiers[-1][1]
+        for max_distance, tier_period in self.tiers:
+            if d < max_distance:
+                period = tier_period
+                break
+        if visible:
+            period = min(period, self.visible_period)
+        return period
+
+    @staticmethod
+    def interpolate(obj):
+        """ Moves skipped object towards its target position, objects followed by the tween manager already move """
+
+        follow_targets(obj)
+
+    def tick(self, obj):
+        """ Runs full update of the object """
+
+        frames = self.frame - self.last_update.get(id(obj), self.frame - 1)
+        if hasattr(obj, "frames"):
+            obj.frames = frames
+        self.last_update[id(obj)] = self.frame
+        self.tracked[id(obj)] = obj
+        obj.update()
+
+    def update(self, objects=None):
+        """ Updates objects of one frame """
+
+        if objects is None:
+            objects = self.game.objects
+        self.frame += 1
+        self.updated = 0
+        self.skipped = 0
+
+        due = []
+        for obj in list(objects):
+            visible = self.visible(obj)
+            period = self.period(obj, visible)
+            if period == 1:
+                self.tick(obj)
+                self.updated += 1
+                continue
+            last = self.last_update.get(id(obj))
+            if last is None:
+                last = self.last_update[id(obj)] = self.frame - self.sequence % period
+                self.tracked[id(obj)] = obj
+                self.sequence += 1
+            if self.frame - last >= period:
+                due.append((last, obj))
+            else:
+                self.interpolate(obj)
+                if visible:
+                    obj.draw()
+                self.skipped += 1
+
+        # the longest waiting objects go first, so every object is updated eventually
+        due.sort(key=lambda item: item[0])
+        for _, obj in due[:self.budget]:
+            self.tick(obj)
+            self.updated += 1
+        self.deferred = max(0, len(due) - self.budget)
+        for _, obj in due[self.budget:]:
+            self.interpolate(obj)
+            if self.visible(obj):
+                obj.draw()
+            self.skipped += 1
+
+        if self.frame % 600 == 0:
+            alive = {id(obj) for obj in objects}
+            self.last_update = {key: value for key, value in self.last_update.items() if key in alive}
+            self.tracked = {key: value for key, value in self.tracked.items() if key in alive}
+
+        self.total_updated += self.updated
+        self.total_skipped += self.skipped
+
+    def stats(self) -> dict:
+        """ Returns metrics of the last frame and totals """
+
+        return {
+            "frame": self.frame,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "deferred": self.deferred,
+            "total_updated": self.total_updated,
+            "total_skipped": self.total_skipped,
+            "saved": self.total_skipped / max(1, self.total_updated + self.total_skipped),
+        }
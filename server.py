@@ -0,0 +1,432 @@
+"""
+Origin Game Engine Library.
+This file contains authoritative headless game server and bot clients for load testing.
+Server runs the game at fixed tick rate over asyncio TCP on localhost, clients send input frames
+and receive delta-compressed quantized entity state: only spawned, removed and changed fields are sent.
+Delta of every tick is encoded once and shared by all clients that received the previous tick.
+Bullets are streamed like other entities, with their angle and zero health.
+Malformed input frames drop the client that sent them.
+
+python server.py --bots 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import struct
+import time
+from collections import defaultdict
+import numpy as np
+import pygame
+from base_app import HeadlessApp
+from untitled_game_update import Game
+
+MESSAGE_INPUT = 1
+MESSAGE_STATE = 2
+
+LENGTH = struct.Struct("<I")
+# kind, tick, mouse x, mouse y, mouse buttons bits, keys bits
+INPUT = struct.Struct("<BIiiBB")
+# kind, tick, baseline tick (0 for full state)
+STATE = struct.Struct("<BII")
+COUNT = struct.Struct("<I")
+MAX_MESSAGE = 1024  # bytes, clients only send input frames
+
+POSITION_SCALE = 8  # 1/8 pixel
+ANGLE_SCALE = 65536 / 360
+
+KEYS = [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]
+ENTITY_TAGS = {"Player": 1, "Enemy": 2, "Rock": 3, "Explosive": 4, "Bullet": 5}
+
+STATE_DTYPE = np.dtype([("id", "<u4"), ("type", "u1"), ("x", "<i4"), ("y", "<i4"), ("angle", "<u2"),
+                        ("health", "<i2")])
+
+
+def frame(payload) -> bytes:
+    """ Returns payload with length prefix """
+
+    return LENGTH.pack(len(payload)) + payload
+
+
+def encode_input(tick, mouse_position, mouse_buttons, keys) -> bytes:
+    """ Packs input of one client frame """
+
+    buttons = sum(1 << i for i, pressed in enumerate(mouse_buttons) if pressed)
+    key_bits = sum(1 << i for i, key in enumerate(KEYS) if keys[key])
+    return frame(INPUT.pack(MESSAGE_INPUT, tick, int(mouse_position[0]), int(mouse_position[1]), buttons, key_bits))
+
+
+def decode_input(payload):
+    """ Returns tick, mouse position, mouse buttons and keys of input frame, raises struct.error on wrong size """
+
+    _, tick, x, y, buttons, key_bits = INPUT.unpack(payload)
+    keys = defaultdict(bool)
+    for i, key in enumerate(KEYS):
+        keys[key] = bool(key_bits >> i & 1)
+    return tick, [x, y], [bool(buttons >> i & 1) for i in range(3)], keys
+
+
+class NetworkIds:
+    """ Stable network ids of game objects, ids of removed objects are never reused """
+
+    def __init__(self):
+        # {id(object): (object, network id)}
+        self.ids = {}
+        self.next_id = 1
+
+    def update(self, objects):
+        """ Returns network ids of objects, stale entries are dropped """
+
+        ids = {}
+        result = []
+        for obj in objects:
+            entry = self.ids.get(id(obj))
+            if entry is None or entry[0] is not obj:
+                entry = (obj, self.next_id)
+                self.next_id += 1
+            ids[id(obj)] = entry
+            result.append(entry[1])
+        self.ids = ids
+        return result
+
+
+def quantize(objects, network_ids):
+    """ Returns quantized state of objects sorted by network id """
+
+    objects = [obj for obj in objects if type(obj).__name__ in ENTITY_TAGS]
+    state = np.zeros(len(objects), dtype=STATE_DTYPE)
+    if not objects:
+        return state
+    state["id"] = network_ids.update(objects)
+    state["type"] = [ENTITY_TAGS[type(obj).__name__] for obj in objects]
+    positions = np.array([obj.pos for obj in objects], dtype=np.float64)
+    state["x"] = np.round(positions[:, 0] * POSITION_SCALE)
+    state["y"] = np.round(positions[:, 1] * POSITION_SCALE)
+    angles = np.array([obj.angle for obj in objects], dtype=np.float64)
+    state["angle"] = np.round(angles % 360 * ANGLE_SCALE).astype(np.int64) % 65536
+    state["health"] = np.clip([getattr(obj, "health", 0) for obj in objects], -32768, 32767)
+    return np.sort(state, order="id")
+
+
+def section(ids, *columns) -> bytes:
+    """ Packs count, ids and columns of one section """
+
+    return COUNT.pack(len(ids)) + ids.astype("<u4").tobytes() + b"".join(column.tobytes() for column in columns)
+
+
+def encode_delta(tick, baseline_tick, old, new) -> bytes:
+    """
+    Packs state message with changes from old to new state.
+    Sections: spawned (ids, types), removed (ids), positions (ids, x, y), angles (ids, angle), health (ids, health).
+    Spawned entities get all their fields.
+    """
+
+    if old is None:
+        old = np.zeros(0, dtype=STATE_DTYPE)
+        baseline_tick = 0
+    index = np.minimum(np.searchsorted(old["id"], new["id"]), max(len(old) - 1, 0))
+    known = (old["id"][index] == new["id"]) if len(old) else np.zeros(len(new), dtype=bool)
+    alive = np.isin(old["id"], new["id"])
+    previous = old[index] if len(old) else new
+
+    spawned = new[~known]
+    position = ~known | (previous["x"] != new["x"]) | (previous["y"] != new["y"])
+    angle = ~known | (previous["angle"] != new["angle"])
+    health = ~known | (previous["health"] != new["health"])
+    return frame(STATE.pack(MESSAGE_STATE, tick, baseline_tick) +
+                 section(spawned["id"], spawned["type"]) +
+                 section(old["id"][~alive]) +
+                 section(new["id"][position], new["x"][position], new["y"][position]) +
+                 section(new["id"][angle], new["angle"][angle]) +
+                 section(new["id"][health], new["health"][health]))
+
+
+def decode_state(payload, entities):
+    """ Applies state message to dict {network id: [type, x, y, angle, health]}, returns tick and baseline tick """
+
+    _, tick, baseline_tick = STATE.unpack_from(payload)
+    offset = STATE.size
+
+    def read(*dtypes):
+        nonlocal offset
+        count, = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        arrays = []
+        for dtype in ("<u4",) + dtypes:
+            array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            arrays.append(array)
+        return arrays
+
+    if baseline_tick == 0:
+        entities.clear()
+    ids, types = read("u1")
+    for entity_id, entity_type in zip(ids.tolist(), types.tolist()):
+        entities[entity_id] = [entity_type, 0, 0, 0, 0]
+    ids, = read()
+    for entity_id in ids.tolist():
+        entities.pop(entity_id, None)
+    ids, xs, ys = read("<i4", "<i4")
+    for entity_id, x, y in zip(ids.tolist(), xs.tolist(), ys.tolist()):
+        entities[entity_id][1] = x / POSITION_SCALE
+        entities[entity_id][2] = y / POSITION_SCALE
+    ids, angles = read("<u2")
+    for entity_id, angle in zip(ids.tolist(), angles.tolist()):
+        entities[entity_id][3] = angle / ANGLE_SCALE
+    ids, healths = read("<i2")
+    for entity_id, health in zip(ids.tolist(), healths.tolist()):
+        entities[entity_id][4] = health
+    return tick, baseline_tick
+
+
+class Client:
+    """ Connected client of the server """
+
+    def __init__(self, number, writer):
+        self.number = number
+        self.writer = writer
+        self.baseline_tick = None  # the last tick sent to the client
+        self.input = None
+        self.inputs = 0
+        self.bytes_sent = 0
+
+
+class GameServer:
+    """
+    Authoritative game server.
+
+    The first connected client controls the player, the game has one player that moves the world,
+    inputs of other clients are received and counted but not applied.
+    Clients whose socket buffer is over max_buffer skip ticks and get a bigger delta later.
+    """
+
+    def __init__(self, game_class=None, host="127.0.0.1", port=7777, tick_rate=30, seed=None, history=32,
+                 max_buffer=256 * 1024):
+        if game_class is None:
+            game_class = Game
+        self.app = HeadlessApp(game_class, seed=seed)
+        self.game = self.app.game
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.history = history
+        self.max_buffer = max_buffer
+
+        self.clients = []
+        self.next_client = 1
+        self.network_ids = NetworkIds()
+        self.states = {}  # {tick: quantized state}
+        self.tick = 0
+        self.server = None
+
+        self.tick_time = 0
+        self.encode_time = 0
+        self.bytes_sent = 0
+        self.skipped = 0
+
+    async def start(self):
+        """ Starts listening """
+
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        """ Receives input frames of one client """
+
+        client = Client(self.next_client, writer)
+        self.next_client += 1
+        self.clients.append(client)
+        try:
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                if not 0 < length <= MAX_MESSAGE:
+                    break
+                payload = await reader.readexactly(length)
+                if payload[0] == MESSAGE_INPUT:
+                    if length != INPUT.size:
+                        break
+                    client.input = decode_input(payload)
+                    client.inputs += 1
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error, IndexError):
+            # malformed frame drops only this client
+            pass
+        finally:
+            self.clients.remove(client)
+            writer.close()
+
+    def simulate(self):
+        """ Runs one game tick with input of the controlling client """
+
+        if self.clients and self.clients[0].input is not None:
+            _, mouse_position, mouse_buttons, keys = self.clients[0].input
+        else:
+            mouse_position, mouse_buttons, keys = [self.app.H_WIDTH, self.app.H_HEIGHT], [False] * 3, defaultdict(bool)
+        self.game.update(mouse_buttons, list(mouse_position), [], keys)
+
+    def broadcast(self):
+        """ Sends state of the tick to all clients """
+
+        state = quantize(self.game.objects + self.game.bullets, self.network_ids)
+        self.states[self.tick] = state
+        self.states.pop(self.tick - self.history, None)
+
+        # clients with the same baseline get the same bytes
+        messages = {}
+        for client in list(self.clients):
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > self.max_buffer:
+                self.skipped += 1
+                continue
+            baseline = client.baseline_tick
+            if baseline not in self.states:
+                baseline = None
+            message = messages.get(baseline)
+            if message is None:
+                message = messages[baseline] = encode_delta(self.tick, baseline or 0, self.states.get(baseline),
+                                                            state)
+            client.writer.write(message)
+            client.baseline_tick = self.tick
+            client.bytes_sent += len(message)
+            self.bytes_sent += len(message)
+
+    async def serve(self, duration=None):
+        """ Runs fixed rate tick loop, forever or for duration in seconds """
+
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        start = loop.time()
+        next_tick = start
+        while duration is None or loop.time() - start < duration:
+            self.tick += 1
+            t = time.perf_counter()
+            self.simulate()
+            t1 = time.perf_counter()
+            self.broadcast()
+            self.tick_time += t1 - t
+            self.encode_time += time.perf_counter() - t1
+
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # running late, don't try to catch up with a burst of ticks
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+        return loop.time() - start
+
+    def stats(self, elapsed) -> dict:
+        """ Returns metrics of the run """
+
+        ticks = max(self.tick, 1)
+        return {
+            "ticks": self.tick,
+            "ticks_per_second": self.tick / elapsed,
+            "tick_ms": self.tick_time / ticks * 1000,
+            "encode_ms": self.encode_time / ticks * 1000,
+            "clients": len(self.clients),
+            "bytes_per_second": self.bytes_sent / elapsed,
+            "bytes_per_client_tick": self.bytes_sent / max(1, sum(1 for _ in self.clients)) / ticks,
+            "skipped_sends": self.skipped,
+        }
+
+
+async def bot(host, port, duration, tick_rate, stats, seed):
+    """ Bot client that sends random input every tick and decodes the state stream """
+
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    entities = {}
+
+    async def receive():
+        try:
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                payload = await reader.readexactly(length)
+                decode_state(payload, entities)
+                stats["bytes"] += length + LENGTH.size
+                stats["states"] += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    receiver = asyncio.ensure_future(receive())
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    tick = 0
+    keys = defaultdict(bool)
+    while loop.time() < end:
+        tick += 1
+        if tick % 15 == 0:
+            for key in KEYS:
+                keys[key] = rng.random() < 0.25
+        writer.write(encode_input(tick, [rng.randint(0, 1280), rng.randint(0, 720)],
+                                  [rng.random() < 0.02, False, False], keys))
+        await asyncio.sleep(1 / tick_rate)
+    writer.close()
+    receiver.cancel()
+    stats["entities"] = max(stats["entities"], len(entities))
+
+
+def run_bots(host, port, count, duration, tick_rate, results):
+    """ Runs bot clients in this process and puts received totals to results queue """
+
+    stats = {"bytes": 0, "states": 0, "entities": 0}
+
+    async def main():
+        await asyncio.gather(*[bot(host, port, duration, tick_rate, stats, i) for i in range(count)])
+
+    asyncio.run(main())
+    results.put(stats)
+
+
+async def benchmark(bots=100, duration=10, tick_rate=30, seed=1):
+    """ Runs server with bot clients in a separate process and returns metrics """
+
+    server = GameServer(tick_rate=tick_rate, port=0, seed=seed)
+    await server.start()
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_bots, args=(server.host, server.port, bots, duration + 1, tick_rate,
+                                                              results))
+    process.start()
+    # wait until bots connect
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 10
+    while len(server.clients) < bots and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    server.bytes_sent = 0
+    server.tick = 0
+    server.tick_time = server.encode_time = 0
+    elapsed = await server.serve(duration)
+    stats = server.stats(elapsed)
+    received = await loop.run_in_executor(None, results.get)
+    await loop.run_in_executor(None, process.join)
+    server.server.close()
+    stats["bot_bytes_received"] = received["bytes"]
+    stats["bot_states_received"] = received["states"]
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--tick-rate", type=int, default=30)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--bots", type=int, help="run load test with given number of bot clients")
+    args = parser.parse_args()
+
+    if args.bots:
+        result = asyncio.run(benchmark(args.bots, args.duration or 10, args.tick_rate, args.seed or 1))
+        for name, value in result.items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        async def main():
+            server = GameServer(host=args.host, port=args.port, tick_rate=args.tick_rate, seed=args.seed)
+            await server.start()
+            print(f"Serving on {server.host}:{server.port}")
+            await server.serve(args.duration)
+
+        asyncio.run(main())
@@ -0,0 +1,466 @@
+"""
+Origin Game Engine Library.
+This file contains world sharding: the world is split into vertical strips, every strip is simulated by its own
+worker process over entity records in shared memory, so large simulations use all cores.
+
+Every tick workers read records of the previous tick and write records of the next one (double buffering),
+so reads of other strips never race with writes. Entities within ghost_width of a border are visible
+to the neighbor strip as ghosts: bullet hits and explosion blasts are always applied by the owner of the
+target from the same previous tick records, so both sides of a border agree without messages.
+Entities that cross a border are moved through outboxes to the neighbor after the simulation phase.
+
+Simulation of a strip follows the game rules of enemies, explosives and bullets with vectorized NumPy.
+Explosions are the same as in objects.py: a blast pushes everything in range, damages enemies
+and ignites explosives that blast the next tick. The rest is simpler than the single process Game:
+- enemies chase the target when it is in their detect range, without vision angle, behavior states or flow field,
+- bullets fly and hit what they touch, while in the game the shot hits at once and the bullet is only drawn,
+- there are no player, rocks, collisions between bodies or pathfinding.
+So the sharded world measures how the game rules scale, it doesn't replay the same game tick by tick.
+
+python sharding.py benchmarks ticks per second with growing number of workers and entities.
+"""
+
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import snapshot
+from spatial import grid_pairs
+from steering import normalize, scatter_add
+
+ENEMY = snapshot.ENTITY_TYPES["Enemy"][0]
+EXPLOSIVE = snapshot.ENTITY_TYPES["Explosive"][0]
+BULLET = snapshot.ENTITY_TYPES["Bullet"][0]
+
+SHARD_DTYPE = np.dtype([
+    ("id", "i8"),
+    ("type", "u1"),
+    ("state", "u1"),  # 1 for exploding explosives and chasing enemies
+    ("counter", "i4"),  # explosion frames of explosives, frames left of bullets
+    ("pos", "f8", 2),
+    ("velocity", "f8", 2),  # push velocity, bullets fly with it
+    ("point", "f8", 2),  # anchor point of enemies
+    ("walk_point", "f8", 2),
+    ("health", "f8"),
+    ("size", "f8"),
+    ("speed", "f8"),
+    ("detect_range", "f8"),  # enemies chase the target closer than detect range
+    ("stop_range", "f8"),  # and stop closer than stop range
+])
+
+# game rules, values of objects.py, ranges of enemies are default values for records without their own
+DAMPING = 0.9
+ENEMY_DETECT_RANGE = 300
+ENEMY_STOP_RANGE = 100
+ENEMY_WALK_RANGE = 100
+BULLET_DAMAGE = 5
+EXPLOSION_RANGE = 200
+EXPLOSION_POWER = 100
+EXPLOSION_TIME = 30
+
+# control values
+TICK = 0
+STOP = 1
+TARGET_X = 2
+TARGET_Y = 3
+
+
+def shared_array(shape, dtype, name=None):
+    """ Returns shared memory and array over it, memory is created if name is None """
+
+    dtype = np.dtype(dtype)
+    if name is None:
+        memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    else:
+        # workers share resource tracker of the coordinator, so memory is unlinked only once
+        memory = shared_memory.SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def simulate(own, ghosts, target, rng):
+    """
+    Returns records of own entities after one tick.
+
+    own: records owned by the strip.
+    ghosts: records of neighbor strips near the borders, they are only read.
+    target: position enemies chase.
+    """
+
+    count = len(own)
+    records = np.concatenate([own, ghosts])
+    new = own.copy()
+    types = records["type"]
+    positions = records["pos"]
+    removed = np.zeros(count, dtype=bool)
+
+    # explosions that started before this tick go on and end
+    explosives = new["type"] == EXPLOSIVE
+    exploding = explosives & (new["state"] == 1)
+    new["counter"][exploding] += 1
+    removed |= exploding & (new["counter"] >= EXPLOSION_TIME)
+
+    # bullets hit enemies and explosives that are not exploding yet
+    bullets = np.flatnonzero(types == BULLET)
+    targets = np.flatnonzero((types == ENEMY) | (types == EXPLOSIVE) & (records["state"] == 0))
+    if len(bullets) and len(targets):
+        radius = records["size"][bullets].max() + records["size"][targets].max()
+        b, t = grid_pairs(positions[bullets], radius, positions[targets])
+        b, t = bullets[b], targets[t]
+        delta = positions[b] - positions[t]
+        hit = np.einsum("ij,ij->i", delta, delta) < (records["size"][b] + records["size"][t]) ** 2
+        b, t = b[hit], t[hit]
+        removed[b[b < count]] = True
+        damaged = t[t < count]
+        new["health"] -= np.bincount(damaged, minlength=count)[:count] * BULLET_DAMAGE
+
+    # explosives that ignited last tick blast everything around except bullets
+    blasts = np.flatnonzero((types == EXPLOSIVE) & (records["state"] == 1) & (records["counter"] == 0))
+    if len(blasts) and count:
+        i, k = grid_pairs(new["pos"], EXPLOSION_RANGE, positions[blasts])
+        k = blasts[k]
+        keep = (new["id"][i] != records["id"][k]) & (new["type"][i] != BULLET)
+        i, k = i[keep], k[keep]
+        directions, _ = normalize(new["pos"][i] - positions[k])
+        new["velocity"] += scatter_add(i, directions * EXPLOSION_POWER * (1 - DAMPING), count)
+        hits = np.bincount(i, minlength=count)
+        enemies = new["type"] == ENEMY
+        new["health"][enemies] -= hits[enemies] * (EXPLOSION_POWER // 10)
+        chained = (new["type"] == EXPLOSIVE) & (new["state"] == 0) & (hits > 0)
+        new["state"][chained] = 1
+        new["counter"][chained] = 0
+
+    # damaged explosives ignite and blast the next tick
+    ignited = explosives & (new["state"] == 0) & (new["health"] < 1)
+    new["state"][ignited] = 1
+    new["counter"][ignited] = 0
+
+    # enemies chase the target in detect range and walk around their anchor points otherwise
+    enemies = np.flatnonzero(new["type"] == ENEMY)
+    removed[enemies[new["health"][enemies] < 1]] = True
+    if len(enemies):
+        pos = new["pos"][enemies]
+        to_target = np.asarray(target, dtype=np.float64) - pos
+        target_distance = np.sqrt(np.einsum("ij,ij->i", to_target, to_target))
+        chase = target_distance < new["detect_range"][enemies]
+        walk_point = new["walk_point"][enemies]
+        to_walk_point = walk_point - pos
+        arrived = ~chase & (np.einsum("ij,ij->i", to_walk_point, to_walk_point) <= new["speed"][enemies] ** 2)
+        if arrived.any():
+            offsets = rng.uniform(-ENEMY_WALK_RANGE / 2, ENEMY_WALK_RANGE / 2, (arrived.sum(), 2))
+            walk_point[arrived] = new["point"][enemies[arrived]] + offsets
+            new["walk_point"][enemies] = walk_point
+        goals = np.where(chase[:, None], to_target, walk_point - pos)
+        directions, lengths = normalize(goals)
+        step = np.minimum(new["speed"][enemies], lengths)
+        step[chase & (target_distance < new["stop_range"][enemies])] = 0
+        new["pos"][enemies] = pos + directions * step[:, None]
+        new["state"][enemies] = chase
+
+    # bullets fly, everything else is pushed by its velocity that fades out
+    bullets = new["type"] == BULLET
+    new["pos"] += new["velocity"]
+    new["velocity"][~bullets] *= DAMPING
+    new["counter"][bullets] -= 1
+    removed |= bullets & (new["counter"] <= 0)
+    return new[~removed]
+
+
+def worker(region, regions, width, ghost_width, seed, names, barrier):
+    """ Simulates one strip until the coordinator stops the world """
+
+    memories = []
+
+    def attach(name, shape, dtype):
+        memory, array = shared_array(shape, dtype, name)
+        memories.append(memory)
+        return array
+
+    capacity, outbox_capacity = names["capacity"], names["outbox_capacity"]
+    records = attach(names["records"], (2, regions, capacity), SHARD_DTYPE)
+    counts = attach(names["counts"], (2, regions), np.int64)
+    outboxes = attach(names["outboxes"], (regions, 2, outbox_capacity), SHARD_DTYPE)
+    outbox_counts = attach(names["outbox_counts"], (regions, 2), np.int64)
+    control = attach(names["control"], (4,), np.float64)
+
+    strip = width / regions
+    left, right = region * strip, (region + 1) * strip
+    try:
+        while True:
+            barrier.wait()
+            if control[STOP]:
+                return
+            tick = int(control[TICK])
+            read, write = tick % 2, (tick + 1) % 2
+
+            own = records[read, region, :counts[read, region]]
+            ghosts = []
+            for neighbor in (region - 1, region + 1):
+                if 0 <= neighbor < regions:
+                    other = records[read, neighbor, :counts[read, neighbor]]
+                    x = other["pos"][:, 0]
+                    ghosts.append(other[(x >= left - ghost_width) & (x < right + ghost_width)])
+            ghosts = np.concatenate(ghosts) if ghosts else np.zeros(0, dtype=SHARD_DTYPE)
+            rng = np.random.default_rng((seed, region, tick))
+            new = simulate(own, ghosts, (control[TARGET_X], control[TARGET_Y]), rng)
+
+            # entities that left the strip go to outboxes of the neighbors, outer strips keep everything outside
+            x = new["pos"][:, 0]
+            leaving = [(x < left) & (region > 0), (x >= right) & (region < regions - 1)]
+            for side, mask in enumerate(leaving):
+                moving = new[mask]
+                if len(moving) > outbox_capacity:
+                    raise OverflowError(f"{len(moving)} entities leave strip {region}, outbox holds {outbox_capacity}")
+                outboxes[region, side, :len(moving)] = moving
+                outbox_counts[region, side] = len(moving)
+            new = new[~(leaving[0] | leaving[1])]
+            records[write, region, :len(new)] = new
+            counts[write, region] = len(new)
+            barrier.wait()
+
+            # entities from the left neighbor come through its right outbox and the other way around
+            count = counts[write, region]
+            for neighbor, side in ((region - 1, 1), (region + 1, 0)):
+                if 0 <= neighbor < regions:
+                    arriving = outboxes[neighbor, side, :outbox_counts[neighbor, side]]
+                    if count + len(arriving) > capacity:
+                        raise OverflowError(f"strip {region} is full, capacity is {capacity}")
+                    records[write, region, count:count + len(arriving)] = arriving
+                    count += len(arriving)
+            counts[write, region] = count
+            barrier.wait()
+    except Exception:
+        # coordinator gets BrokenBarrierError instead of waiting forever
+        barrier.abort()
+        raise
+    finally:
+        del records, counts, outboxes, outbox_counts, control
+        for memory in memories:
+            memory.close()
+
+
+class ShardedWorld:
+    """
+    World of entity records simulated by worker processes, one per vertical strip.
+
+    regions: number of strips and workers, count of CPUs by default.
+    capacity: maximum entities of one strip.
+    ghost_width: how far behind a border entities of the neighbor strip are visible, it must cover
+    the longest interaction (explosion range) plus the fastest step.
+    """
+
+    def __init__(self, width, regions=None, capacity=65536, ghost_width=EXPLOSION_RANGE + 50, seed=0):
+        self.width = width
+        self.regions = regions or multiprocessing.cpu_count()
+        self.capacity = capacity
+        self.ghost_width = ghost_width
+        self.seed = seed
+        if width / self.regions < ghost_width:
+            raise ValueError(f"strips of {self.regions} regions are narrower than ghost width {ghost_width}")
+
+        outbox_capacity = capacity // 4
+        self.memories = []
+        self.names = {"capacity": capacity, "outbox_capacity": outbox_capacity}
+        self.records = self.create("records", (2, self.regions, capacity), SHARD_DTYPE)
+        self.counts = self.create("counts", (2, self.regions), np.int64)
+        self.outboxes = self.create("outboxes", (self.regions, 2, outbox_capacity), SHARD_DTYPE)
+        self.outbox_counts = self.create("outbox_counts", (self.regions, 2), np.int64)
+        self.control = self.create("control", (4,), np.float64)
+        self.counts[...] = 0
+        self.control[...] = 0
+
+        self.tick = 0
+        self.next_id = 1
+        self.barrier = None
+        self.processes = []
+
+    def create(self, name, shape, dtype):
+        """ Creates shared array and remembers its name for workers """
+
+        memory, array = shared_array(shape, dtype)
+        self.memories.append(memory)
+        self.names[name] = memory.name
+        return array
+
+    def region(self, x):
+        """ Returns strips of x coordinates, entities outside of the world belong to the outer strips """
+
+        return np.clip((np.asarray(x) // (self.width / self.regions)).astype(np.int64), 0, self.regions - 1)
+
+    def spawn(self, records):
+        """ Adds records to strips of their positions, returns their ids """
+
+        records = np.array(records, dtype=SHARD_DTYPE)
+        records["id"] = np.arange(self.next_id, self.next_id + len(records))
+        self.next_id += len(records)
+        current = self.tick % 2
+        regions = self.region(records["pos"][:, 0])
+        for region in np.unique(regions).tolist():
+            group = records[regions == region]
+            count = self.counts[current, region]
+            if count + len(group) > self.capacity:
+                raise OverflowError(f"strip {region} is full, capacity is {self.capacity}")
+            self.records[current, region, count:count + len(group)] = group
+            self.counts[current, region] = count + len(group)
+        return records["id"]
+
+    def spawn_game(self, game):
+        """ Adds enemies, explosives and bullets of the game """
+
+        entities = snapshot.pack_game(game)
+        entities = entities[np.isin(entities["type"], (ENEMY, EXPLOSIVE, BULLET))]
+        records = np.zeros(len(entities), dtype=SHARD_DTYPE)
+        for field in ("type", "counter", "pos", "point", "walk_point", "health", "size", "speed", "detect_range",
+                      "stop_range"):
+            records[field] = entities[field]
+        enemies = records["type"] == ENEMY
+        records["state"][enemies] = 0
+        walk_point = records["walk_point"]
+        missing = np.isnan(walk_point).any(axis=1)
+        walk_point[missing] = records["pos"][missing]
+        records["walk_point"] = walk_point
+
+        explosives = records["type"] == EXPLOSIVE
+        # ignited explosives blast the next tick like explosives that ignited in the last tick here
+        records["state"][explosives] = (entities["flags"][explosives] &
+                                        (snapshot.FLAG_EXPLODING | snapshot.FLAG_IGNITED)) != 0
+        ignited = explosives & ((entities["flags"] & snapshot.FLAG_IGNITED) != 0)
+        records["counter"][ignited] = 0
+
+        bullets = records["type"] == BULLET
+        angles = np.radians(entities["angle"][bullets])
+        records["velocity"][bullets] = np.stack([np.cos(angles), np.sin(angles)], axis=1) * \
+            entities["speed"][bullets, None]
+        records["counter"][bullets] = entities["lifetime"][bullets] - entities["counter"][bullets]
+        return self.spawn(records)
+
+    def start(self):
+        """ Starts worker processes """
+
+        self.barrier = multiprocessing.Barrier(self.regions + 1)
+        self.processes = [multiprocessing.Process(target=worker, daemon=True,
+                                                  args=(region, self.regions, self.width, self.ghost_width,
+                                                        self.seed, self.names, self.barrier))
+                          for region in range(self.regions)]
+        for process in self.processes:
+            process.start()
+
+    def step(self, target=(0, 0)):
+        """ Simulates one tick, enemies chase the target """
+
+        self.control[TICK] = self.tick
+        self.control[TARGET_X], self.control[TARGET_Y] = target
+        # start, entities simulated and sent to outboxes, entities adopted
+        for _ in range(3):
+            self.barrier.wait()
+        self.tick += 1
+
+    def entities(self):
+        """ Returns records of all strips of the current tick """
+
+        current = self.tick % 2
+        return np.concatenate([self.records[current, region, :self.counts[current, region]]
+                               for region in range(self.regions)])
+
+    def render_state(self):
+        """ Returns merged entity records of snapshot.py, ready for drawing or saving """
+
+        records = self.entities()
+        state = np.zeros(len(records), dtype=snapshot.ENTITY_DTYPE)
+        for field in ("type", "state", "counter", "pos", "point", "walk_point", "health", "size", "speed",
+                      "detect_range", "stop_range"):
+            state[field] = records[field]
+        state["new_pos"] = records["pos"]
+        explosives = records["type"] == EXPLOSIVE
+        state["flags"][explosives] = records["state"][explosives] * snapshot.FLAG_EXPLODING
+        return state
+
+    def stop(self):
+        """ Stops workers and frees shared memory """
+
+        if self.processes:
+            self.control[STOP] = 1
+            if not self.barrier.broken:
+                self.barrier.wait()
+            for process in self.processes:
+                process.join()
+            self.processes = []
+        del self.records, self.counts, self.outboxes, self.outbox_counts, self.control
+        for memory in self.memories:
+            memory.close()
+            memory.unlink()
+        self.memories = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def random_world(count, width, height, rng, mix=(0.94, 0.01, 0.05), lifetime=60):
+    """ Returns records of enemies, explosives and bullets in parts of mix spread over the world """
+
+    records = np.zeros(count, dtype=SHARD_DTYPE)
+    records["type"] = rng.choice([ENEMY, EXPLOSIVE, BULLET], count, p=mix)
+    records["pos"] = rng.uniform((0, 0), (width, height), (count, 2))
+    records["point"] = records["pos"]
+    records["walk_point"] = records["pos"]
+    records["size"] = 20
+    records["speed"] = 5
+    records["detect_range"] = ENEMY_DETECT_RANGE
+    records["stop_range"] = ENEMY_STOP_RANGE
+    records["health"] = np.where(records["type"] == EXPLOSIVE, 10, 1)
+    bullets = records["type"] == BULLET
+    records["size"][bullets] = 1
+    angles = rng.uniform(0, 2 * np.pi, bullets.sum())
+    records["velocity"][bullets] = np.stack([np.cos(angles), np.sin(angles)], axis=1) * 20
+    records["counter"][bullets] = lifetime
+    return records
+
+
+def benchmark(workers=(1, 2, 4), entities_per_worker=20000, ticks=100, height=8000, seed=1):
+    """
+    Returns results of weak scaling: every worker gets the same amount of entities and world,
+    so with enough cores tick time stays flat while entity count grows with workers.
+    """
+
+    results = []
+    for count in workers:
+        width = 8000 * count
+        with ShardedWorld(width, count, capacity=entities_per_worker * 2, seed=seed) as world:
+            # bullets fly during the whole run, so load stays about the same
+            rng = np.random.default_rng(seed)
+            world.spawn(random_world(entities_per_worker * count, width, height, rng, lifetime=ticks * 2))
+            world.step((width / 2, height / 2))
+            start = time.perf_counter()
+            for _ in range(ticks):
+                world.step((width / 2, height / 2))
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            alive = len(world.render_state())
+            merge = time.perf_counter() - start
+        results.append({"workers": count, "entities": entities_per_worker * count, "alive": alive,
+                        "tick_ms": elapsed / ticks * 1000, "merge_ms": merge * 1000,
+                        "entity_ticks_per_second": entities_per_worker * count * ticks / elapsed})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of sharded world simulation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--entities", type=int, default=20000, help="entities per worker")
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+    print(f"{multiprocessing.cpu_count()} CPUs")
+    base = None
+    for result in benchmark(args.workers, args.entities, args.ticks):
+        base = base or result["entity_ticks_per_second"]
+        print(f"{result['workers']} workers, {result['entities']} entities: {result['tick_ms']:.1f} ms per tick, "
+              f"merge {result['merge_ms']:.1f} ms, "
+              f"throughput {result['entity_ticks_per_second'] / base:.2f}x of 1 worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Origin Game Engine Library.
+This file contains deterministic simulation tools: seeded random streams, state capture and rollback.
+State of a tick is entity records from snapshot.py plus state of game systems mapped to record order,
+records between keyframes are stored as deltas, so keeping the last K ticks is cheap.
+"""
+
+import copy
+import random
+from collections import defaultdict
+import numpy as np
+import snapshot
+from input_manager import KeyState
+
+STREAMS = ("world", "ai", "weapons")
+
+
+class RandomStreams:
+    """
+    Independent random generators of one world derived from one seed.
+    Code that uses one stream doesn't change numbers of the other streams.
+    """
+
+    def __init__(self, seed=None, names=STREAMS):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.streams = {name: random.Random(f"{seed}/{name}") for name in names}
+
+    def __getitem__(self, name):
+        if name not in self.streams:
+            self.streams[name] = random.Random(f"{self.seed}/{name}")
+        return self.streams[name]
+
+    def getstate(self) -> dict:
+        """ Returns states of all streams """
+
+        return {name: stream.getstate() for name, stream in self.streams.items()}
+
+    def setstate(self, state):
+        """ Restores states of all streams """
+
+        for name, stream_state in state.items():
+            self[name].setstate(stream_state)
+
+
+def entities(game):
+    """ Returns entities in record order of snapshot.pack_game """
+
+    return [obj for obj in game.objects + game.bullets if type(obj).__name__ in snapshot.ENTITY_TYPES]
+
+
+def capture(game) -> dict:
+    """ Returns state of the game that is enough to continue simulation exactly """
+
+    objects = entities(game)
+    physics = game.physics
+    indices = np.array([physics.index.get(id(obj), -1) for obj in objects], dtype=np.int64)
+    body = indices >= 0
+    velocities = np.zeros((len(objects), 2))
+    velocities[body] = physics.velocities[indices[body]]
+
+    scheduler = game.scheduler
+    previous = game.collisions.previous
+    grid = game.pathfinder.grid
+    covered = [grid.covered.get(id(obj)) for obj in objects]
+    next_flow_field = game.pathfinder.next_flow_field
+    if next_flow_field is not None:
+        # field in progress is the only mutable one, finished fields are shared
+        next_flow_field = copy.copy(next_flow_field)
+        next_flow_field.cost = next_flow_field.cost.copy()
+        next_flow_field.open = list(next_flow_field.open)
+
+    return {
+        "records": snapshot.pack_game(game),
+        "game": dict(snapshot.game_state(game), tick=game.tick),
+        "random": game.random.getstate(),
+        "physics": (body, velocities, physics.awake[indices] & body, physics.still_frames[indices]),
+        "scheduler": (scheduler.frame, scheduler.sequence,
+                      [scheduler.last_update.get(id(obj)) for obj in objects]),
+        "collisions": [previous[id(obj)][1] if id(obj) in previous and previous[id(obj)][0] is obj else None
+                       for obj in objects],
+        "tweens": [game.tweens.active.get(id(obj)) is obj for obj in objects],
+        "pathfinder": (grid.counts.copy(), covered, grid.version, tuple(game.pathfinder.scroll), game.pathfinder.origin,
+                       game.pathfinder.flow_field, next_flow_field),
+    }
+
+
+def restore(game, state, classes):
+    """ Replaces objects and system states of the game with captured state """
+
+    game.objects, game.bullets = snapshot.restore(game, state["records"], classes)
+    values = state["game"]
+    game.mode = values["mode"]
+    game.counter = values["counter"]
+    game.enemies_count = values["enemies_count"]
+    game.tick = values["tick"]
+    game.random.setstate(state["random"])
+    game.player = next(obj for obj in game.objects if type(obj) is classes["Player"])
+    objects = entities(game)
+
+    physics = game.physics
+    physics.clear()
+    body, velocities, awake, still_frames = state["physics"]
+    for obj, has_body in zip(objects, body.tolist()):
+        if has_body:
+            physics.add(obj)
+    indices = np.array([physics.index.get(id(obj), -1) for obj in objects], dtype=np.int64)
+    physics.velocities[indices[body]] = velocities[body]
+    physics.awake[indices[body]] = awake[body]
+    physics.still_frames[indices[body]] = still_frames[body]
+
+    scheduler = game.scheduler
+    scheduler.frame, scheduler.sequence, last_update = state["scheduler"]
+    scheduler.last_update = {id(obj): last for obj, last in zip(objects, last_update) if last is not None}
+    scheduler.tracked = {id(obj): obj for obj in objects if id(obj) in scheduler.last_update}
+
+    game.collisions.previous = {id(obj): (obj, list(pos)) for obj, pos in zip(objects, state["collisions"])
+                                if pos is not None}
+
+    tweens = game.tweens
+    tweens.clear()
+    for obj, active in zip(objects, state["tweens"]):
+        if hasattr(obj, "followed"):
+            tweens.add(obj)
+            if not active:
+                del tweens.active[id(obj)]
+
+    counts, covered, version, scroll, origin, flow_field, next_flow_field = state["pathfinder"]
+    game.pathfinder.scroll = list(scroll)
+    game.pathfinder.origin = origin
+    grid = game.pathfinder.grid
+    # grid is restored in place, flow fields keep references to it
+    grid.counts[...] = counts
+    grid.covered = {id(obj): cells for obj, cells in zip(objects, covered) if cells is not None}
+    grid.version = version
+    game.pathfinder.flow_field = flow_field
+    if next_flow_field is not None:
+        next_flow_field = copy.copy(next_flow_field)
+        next_flow_field.cost = next_flow_field.cost.copy()
+        next_flow_field.open = list(next_flow_field.open)
+    game.pathfinder.next_flow_field = next_flow_field
+
+
+def frozen_keys(keys):
+    """ Returns keys state that doesn't change with input, KeyState and dicts are copied """
+
+    if isinstance(keys, KeyState):
+        return KeyState(frozenset(keys.held))
+    if isinstance(keys, dict):
+        return defaultdict(bool, keys)
+    # pygame.key.get_pressed returns immutable snapshot
+    return keys
+
+
+class Rollback:
+    """
+    Input-driven simulation that keeps state of the last frames and can roll back and re-simulate them.
+
+    frames: how many ticks can be rolled back.
+    keyframe_interval: every Nth tick stores full records, others only records changed since the keyframe.
+    """
+
+    def __init__(self, game, classes, frames=8, keyframe_interval=4):
+        self.game = game
+        self.classes = classes
+        self.frames = frames
+        self.keyframe_interval = keyframe_interval
+
+        # [tick, state, inputs] of the last frames, state records are deltas if keyframe is not None
+        self.history = []
+        self.keyframe = None
+        self.keyframe_tick = None
+
+    def encode(self, state):
+        """ Replaces records of the state with delta from the current keyframe if it pays off """
+
+        records = state["records"]
+        tick = self.game.tick
+        if self.keyframe is None or tick - self.keyframe_tick >= self.keyframe_interval or \
+                len(self.keyframe) != len(records):
+            self.keyframe = records
+            self.keyframe_tick = tick
+            return state
+        changed = np.flatnonzero(records.view(np.void) != self.keyframe.view(np.void))
+        state["records"] = (self.keyframe, changed, records[changed])
+        return state
+
+    @staticmethod
+    def decode(state):
+        """ Returns state with full records """
+
+        if isinstance(state["records"], tuple):
+            keyframe, changed, rows = state["records"]
+            records = keyframe.copy()
+            records[changed] = rows
+            state = dict(state, records=records)
+        return state
+
+    def advance(self, mouse_buttons, mouse_position, keys, events=()):
+        """ Stores state and copy of input of the tick and simulates it """
+
+        state = self.encode(capture(self.game))
+        # input manager changes its buttons list and keys in place, rolled back ticks need input of their time
+        mouse_buttons, keys = tuple(mouse_buttons), frozen_keys(keys)
+        inputs = (mouse_buttons, list(mouse_position), keys, list(events))
+        self.history.append([self.game.tick, state, inputs])
+        if len(self.history) > self.frames:
+            self.history.pop(0)
+        self.game.update(mouse_buttons, list(mouse_position), list(events), keys)
+
+    def rollback(self, frames, inputs=None):
+        """
+        Restores state from frames ticks ago and simulates them again.
+        inputs: optional dict {index of rolled back tick: (mouse_buttons, mouse_position, keys, events)}
+        with corrected input, for example late input of a remote player.
+        """
+
+        if not 0 < frames <= len(self.history):
+            raise ValueError(f"can roll back 1 to {len(self.history)} frames, not {frames}")
+        replay = self.history[-frames:]
+        del self.history[-frames:]
+        # keyframe may be newer than the restored tick, next tick starts a new one
+        self.keyframe = None
+        restore(self.game, self.decode(replay[0][1]), self.classes)
+        for index, (_, _, recorded) in enumerate(replay):
+            mouse_buttons, mouse_position, keys, events = recorded if inputs is None else inputs.get(index, recorded)
+            self.advance(mouse_buttons, mouse_position, keys, events)
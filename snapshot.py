@@ -0,0 +1,211 @@
+"""
+Origin Game Engine Library.
+This file contains binary world snapshots.
+Every entity is one record of a NumPy structured array with a type tag and packed fields,
+file is a small header with game state followed by raw records, so it can be loaded with memory mapping.
+"""
+
+import gc
+import json
+import struct
+import numpy as np
+
+MAGIC = b"OGS1"
+VERSION = 1
+# magic, version, header size, count of records, length of game state JSON
+HEADER = struct.Struct("<4sHHQI")
+ALIGNMENT = 16
+
+FLAG_DAMAGED = 1
+FLAG_EXPLODING = 2
+FLAG_DEBUG = 4
+FLAG_IGNITED = 8
+
+ENTITY_DTYPE = np.dtype([
+    ("type", "u1"),
+    ("state", "u1"),
+    ("flags", "u1"),
+    ("color", "u1", 3),
+    ("pos", "f8", 2),
+    ("new_pos", "f8", 2),
+    ("point", "f8", 2),  # anchor point of enemies, end point of bullets
+    ("walk_point", "f8", 2),
+    ("angle", "f8"),
+    ("new_angle", "f8"),
+    ("size", "f8"),
+    ("speed", "f8"),
+    ("health", "f8"),
+    ("detect_range", "f8"),
+    ("vision_angle", "f8"),
+    ("stop_range", "f8"),
+    ("power", "f8"),
+    ("counter", "i4"),
+    ("lifetime", "i4"),
+])
+
+# saved attributes of every entity type, record field is the same as the attribute unless mapped
+ENTITY_TYPES = {
+    "Player": (1, ["pos", "new_pos", "angle", "new_angle", "size", "color", "speed", "detect_range", "vision_angle",
+                   ("counter", "recharge_counter")]),
+    "Enemy": (2, ["pos", "new_pos", "angle", "new_angle", "size", "color", "speed", "health", "detect_range",
+                  "vision_angle", "stop_range", ("point", "anchor_point"), "walk_point", "state", "damaged", "debug"]),
+    "Rock": (3, ["pos", "new_pos", "angle", "new_angle", "size", "color"]),
+    "Explosive": (4, ["pos", "new_pos", "angle", "new_angle", "size", "color", "health", ("power", "explosion_power"),
+                      "counter", "is_exploding", "ignited"]),
+    "Bullet": (5, ["pos", ("point", "end_pos"), "angle", "size", "color", "speed", "counter", "lifetime"]),
+}
+FLAGS = {"damaged": FLAG_DAMAGED, "is_exploding": FLAG_EXPLODING, "debug": FLAG_DEBUG, "ignited": FLAG_IGNITED}
+
+
+def fields(name):
+    """ Returns list of (record field, attribute) of the entity type """
+
+    return [item if isinstance(item, tuple) else (item, item) for item in ENTITY_TYPES[name][1]]
+
+
+def pack(objects):
+    """ Packs objects of one type to records """
+
+    name = type(objects[0]).__name__
+    records = np.zeros(len(objects), dtype=ENTITY_DTYPE)
+    records["type"] = ENTITY_TYPES[name][0]
+    flags = np.zeros(len(objects), dtype=np.uint8)
+    for field, attribute in fields(name):
+        values = [getattr(obj, attribute) for obj in objects]
+        if attribute in FLAGS:
+            flags |= np.array(values, dtype=bool) * np.uint8(FLAGS[attribute])
+        elif attribute == "walk_point":
+            records[field] = [(np.nan, np.nan) if value is None else value for value in values]
+        else:
+            records[field] = values
+    records["flags"] = flags
+    return records
+
+
+def pack_game(game):
+    """ Packs all objects and bullets of the game to one record array in their order """
+
+    groups = {}
+    for index, obj in enumerate(game.objects + game.bullets):
+        name = type(obj).__name__
+        if name in ENTITY_TYPES:
+            groups.setdefault(name, ([], []))
+            groups[name][0].append(index)
+            groups[name][1].append(obj)
+    count = sum(len(indices) for indices, _ in groups.values())
+    records = np.zeros(count, dtype=ENTITY_DTYPE)
+    # objects of unknown types are skipped, so indices are compacted
+    order = np.zeros(len(game.objects) + len(game.bullets), dtype=np.int64)
+    for indices, _ in groups.values():
+        order[indices] = 1
+    order = np.cumsum(order) - 1
+    for indices, group in groups.values():
+        records[order[indices]] = pack(group)
+    return records
+
+
+def game_state(game) -> dict:
+    """ Returns game variables that are not stored in entities """
+
+    return {"mode": game.mode, "counter": game.counter, "enemies_count": game.enemies_count}
+
+
+def save(path, records, state=None):
+    """ Writes records and game state to a snapshot file """
+
+    state = json.dumps(state or {}).encode()
+    header_size = -(-(HEADER.size + len(state)) // ALIGNMENT) * ALIGNMENT
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, header_size, len(records), len(state)))
+        file.write(state)
+        file.write(b"\0" * (header_size - HEADER.size - len(state)))
+        # records are streamed straight from the array buffer
+        records.tofile(file)
+
+
+def load(path, mmap=True):
+    """ Returns records and game state of a snapshot file, records are memory mapped by default """
+
+    with open(path, "rb") as file:
+        magic, version, header_size, count, state_length = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a snapshot of version {VERSION}")
+        state = json.loads(file.read(state_length) or b"{}")
+        if not mmap:
+            file.seek(header_size)
+            return np.fromfile(file, dtype=ENTITY_DTYPE, count=count), state
+    if count == 0:
+        return np.zeros(0, dtype=ENTITY_DTYPE), state
+    return np.memmap(path, dtype=ENTITY_DTYPE, mode="r", offset=header_size, shape=(count,)), state
+
+
+def unpack(records, cls, template):
+    """
+    Creates objects of one type from records.
+    Objects are copies of the template instance with saved attributes replaced.
+    """
+
+    name = cls.__name__
+    columns = {}
+    for field, attribute in fields(name):
+        if attribute in FLAGS:
+            columns[attribute] = ((records["flags"] & FLAGS[attribute]) != 0).tolist()
+        elif attribute == "walk_point":
+            columns[attribute] = [None if value[0] != value[0] else value for value in records[field].tolist()]
+        elif field == "color":
+            columns[attribute] = [tuple(value) for value in records[field].tolist()]
+        else:
+            # copy from memory map first, converting contiguous array is much faster
+            columns[attribute] = np.array(records[field]).tolist()
+    attributes = list(columns)
+
+    objects = []
+    base = template.__dict__
+    new = cls.__new__
+    for values in zip(*columns.values()):
+        obj = new(cls)
+        obj.__dict__ = {**base, **dict(zip(attributes, values))}
+        objects.append(obj)
+    return objects
+
+
+def restore(game, records, classes, templates=None):
+    """
+    Returns objects and bullets created from records in saved order.
+
+    classes: dict {type name: class}.
+    templates: dict {type name: instance}, instances of the game are created if not given.
+    """
+
+    tags = {tag: name for name, (tag, _) in ENTITY_TYPES.items()}
+    types = np.asarray(records["type"])
+    result = [None] * len(types)
+    # creating lots of objects triggers full collections that find nothing, so collector waits until the end
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        unpack_all(game, records, types, tags, classes, templates, result)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    bullet = (types == ENTITY_TYPES["Bullet"][0]).tolist()
+    objects = [obj for obj, is_bullet in zip(result, bullet) if not is_bullet]
+    bullets = [obj for obj, is_bullet in zip(result, bullet) if is_bullet]
+    return objects, bullets
+
+
+def unpack_all(game, records, types, tags, classes, templates, result):
+    """ Puts objects created from records to result list at their record indices """
+
+    for tag in np.unique(types).tolist():
+        name = tags[tag]
+        cls = classes[name]
+        if templates is not None and name in templates:
+            template = templates[name]
+        elif name == "Bullet":
+            template = cls(game, [0, 0], [1, 1])
+        else:
+            template = cls(game)
+        indices = np.flatnonzero(types == tag)
+        for index, obj in zip(indices.tolist(), unpack(records[indices], cls, template)):
+            result[index] = obj
@@ -0,0 +1,118 @@
+"""
+Origin Game Engine Library.
+This file contains neighborhood queries over uniform grids.
+grid_pairs finds all close pairs of points in one vectorized pass without O(N^2) loops,
+SpatialHash is a simple grid of game objects for per-object queries,
+expand_ranges turns ranges of sorted cell contents into flat indices and is shared with interest.py.
+"""
+
+import numpy as np
+
+NEIGHBOR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def expand_ranges(start, counts):
+    """ Returns concatenation of ranges [start, start + count) """
+
+    total = counts.sum()
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(start - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+def grid_pairs(positions, radius, others=None):
+    """
+    Returns index arrays i, j of point pairs closer than radius.
+
+    positions: array (N, 2).
+    others: array (M, 2). If None, unique pairs i < j inside positions are returned,
+    otherwise i indexes positions and j indexes others.
+    """
+
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    same = others is None
+    others = positions if same else np.asarray(others, dtype=np.float64).reshape(-1, 2)
+    if len(positions) == 0 or len(others) == 0 or radius <= 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    origin = np.minimum(positions.min(axis=0), others.min(axis=0))
+    cells = np.floor((positions - origin) / radius).astype(np.int64) + 1
+    other_cells = np.floor((others - origin) / radius).astype(np.int64) + 1
+    height = max(cells[:, 1].max(), other_cells[:, 1].max()) + 2
+
+    other_keys = other_cells[:, 0] * height + other_cells[:, 1]
+    order = np.argsort(other_keys, kind="stable")
+    sorted_keys = other_keys[order]
+    keys = cells[:, 0] * height + cells[:, 1]
+
+    i_list = []
+    j_list = []
+    indices = np.arange(len(positions))
+    for dx, dy in NEIGHBOR_CELLS:
+        neighbor_keys = keys + dx * height + dy
+        start = np.searchsorted(sorted_keys, neighbor_keys, "left")
+        counts = np.searchsorted(sorted_keys, neighbor_keys, "right") - start
+        i_list.append(np.repeat(indices, counts))
+        j_list.append(order[expand_ranges(start, counts)])
+    i = np.concatenate(i_list)
+    j = np.concatenate(j_list)
+
+    if same:
+        mask = i < j
+        i, j = i[mask], j[mask]
+    delta = positions[i] - others[j]
+    mask = np.einsum("ij,ij->i", delta, delta) < radius * radius
+    return i[mask], j[mask]
+
+
+class SpatialHash:
+    """ Uniform grid of objects for neighborhood queries """
+
+    def __init__(self, cell_size=100):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell(self, pos):
+        """ Returns grid cell of the position """
+
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def clear(self):
+        """ Removes all objects """
+
+        self.cells.clear()
+
+    def insert(self, obj, pos=None, radius=0):
+        """ Inserts object into every cell its bounding circle covers """
+
+        if pos is None:
+            pos = obj.pos
+        x1, y1 = self.cell((pos[0] - radius, pos[1] - radius))
+        x2, y2 = self.cell((pos[0] + radius, pos[1] + radius))
+        for cx in range(x1, x2 + 1):
+            for cy in range(y1, y2 + 1):
+                self.cells.setdefault((cx, cy), []).append(obj)
+
+    def build(self, objects, radius_attribute=None):
+        """ Rebuilds the grid from objects """
+
+        self.clear()
+        for obj in objects:
+            self.insert(obj, obj.pos, getattr(obj, radius_attribute, 0) if radius_attribute else 0)
+
+    def query(self, pos, radius):
+        """ Returns objects from cells that the circle covers, without duplicates """
+
+        x1, y1 = self.cell((pos[0] - radius, pos[1] - radius))
+        x2, y2 = self.cell((pos[0] + radius, pos[1] + radius))
+        result = []
+        seen = set()
+        for cx in range(x1, x2 + 1):
+            for cy in range(y1, y2 + 1):
+                for obj in self.cells.get((cx, cy), ()):
+                    if id(obj) not in seen:
+                        seen.add(id(obj))
+                        result.append(obj)
+        return result
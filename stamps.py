@@ -0,0 +1,59 @@
+"""
+Origin Game Engine Library.
+This file contains sprite stamps: shapes that are rendered once and then only blitted.
+Stamps are cached per (shape, size, color, width) and least recently used ones are evicted.
+"""
+
+import pygame
+from functools import lru_cache
+from functions import lerp
+
+
+def colorkey_for(color):
+    """ Returns colorkey that doesn't match given color """
+
+    return (0, 0, 0) if tuple(color[:3]) != (0, 0, 0) else (255, 255, 255)
+
+
+@lru_cache(maxsize=512)
+def circle_stamp(radius: int, color=(255, 255, 255), width=0, alpha=False):
+    """
+    Returns cached surface with circle drawn in its center.
+    Surface is (radius * 2 + 1) pixels wide, so it must be blitted at center - radius.
+    alpha: use per-pixel alpha instead of colorkey, needed for transparent colors.
+    """
+
+    size = (radius * 2 + 1, radius * 2 + 1)
+    if alpha:
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 0))
+    else:
+        colorkey = colorkey_for(color)
+        surface = pygame.Surface(size)
+        surface.fill(colorkey)
+        surface.set_colorkey(colorkey)
+    pygame.draw.circle(surface, color, (radius, radius), radius, width)
+    return surface
+
+
+@lru_cache(maxsize=32)
+def explosion_frames(size: int, power: int, color=(255, 255, 255), frames=30, width=2):
+    """
+    Returns cached list of (surface, radius) explosion animation frames.
+    Every frame is a ring growing from size to power and fading from color to black.
+    """
+
+    result = []
+    for i in range(1, frames + 1):
+        progress = i / frames
+        radius = int(lerp(size, power, progress))
+        fade_color = (int(color[0] * (1 - progress)), int(color[1] * (1 - progress)), int(color[2] * (1 - progress)))
+        result.append((circle_stamp(radius, fade_color, width), radius))
+    return result
+
+
+def clear_stamps():
+    """ Drops all cached stamps, e.g. after display mode change """
+
+    circle_stamp.cache_clear()
+    explosion_frames.cache_clear()
@@ -0,0 +1,140 @@
+"""
+Origin Game Engine Library.
+This file contains fast startup: lean pygame import and init with timing of every step.
+
+import_pygame imports pygame without pkg_resources, pygame only uses it to find its bundled files and
+falls back to plain paths, while importing pkg_resources takes about as long as the rest of pygame.
+init_pygame initializes only given subsystems instead of all of them like pygame.init,
+audio and joystick initialization can take long and most tools don't need them.
+
+python startup.py [module] prints import times of the module by top level packages and subsystem init times.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+DEFAULT_SUBSYSTEMS = ("display", "font")
+ALL_SUBSYSTEMS = ("display", "font", "mixer", "joystick")
+
+# milliseconds of startup steps of the process in order they happened, apps keep their own steps
+TIMES = {}
+
+
+def app_times() -> dict:
+    """ Returns new dict of startup times of an app, it starts with the process wide import times """
+
+    return {name: value for name, value in TIMES.items() if name.startswith("import ")}
+
+
+@contextmanager
+def measure(name, times=None):
+    """ Adds time of the block to times, TIMES by default """
+
+    times = TIMES if times is None else times
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[name] = times.get(name, 0) + (time.perf_counter() - start) * 1000
+
+
+def import_pygame():
+    """ Imports pygame without pkg_resources and returns it """
+
+    if "pygame" in sys.modules:
+        return sys.modules["pygame"]
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    blocked = "pkg_resources" not in sys.modules
+    if blocked:
+        # None in sys.modules makes import raise ImportError, pygame.pkgdata handles it
+        sys.modules["pkg_resources"] = None
+    try:
+        with measure("import pygame"):
+            import pygame
+    finally:
+        if blocked:
+            del sys.modules["pkg_resources"]
+    return pygame
+
+
+def init_pygame(subsystems=DEFAULT_SUBSYSTEMS, times=None) -> dict:
+    """
+    Initializes given pygame subsystems, returns dict {subsystem: error} of subsystems that failed.
+    Failed subsystems don't stop the others, like in pygame.init. Init times are added to times, TIMES by default.
+    """
+
+    pygame = import_pygame()
+    errors = {}
+    for name in subsystems:
+        module = getattr(pygame, name, None)
+        if module is None or not hasattr(module, "init"):
+            errors[name] = f"pygame has no {name} module"
+            continue
+        with measure(f"init {name}", times):
+            try:
+                module.init()
+            except (pygame.error, NotImplementedError) as error:
+                errors[name] = error
+    return errors
+
+
+def report(times=None) -> str:
+    """ Returns table of startup times """
+
+    times = TIMES if times is None else times
+    lines = [f"{name:<24}{value:8.1f} ms" for name, value in times.items()]
+    lines.append(f"{'total':<24}{sum(times.values()):8.1f} ms")
+    return "\n".join(lines)
+
+
+def import_times(module) -> dict:
+    """ Returns cumulative import milliseconds of the module and top level packages it imports, in a new process """
+
+    # only tools measure imports, so startup itself doesn't pay for subprocess
+    import subprocess
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                lines.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative) / 1000))
+    # modules are printed after everything they import, deeper indent means imported by the module above
+    names = [name for _, name, _ in lines]
+    if module not in names:
+        return {}
+    index = len(names) - 1 - names[::-1].index(module)
+    indent, _, total = lines[index]
+    times = {module: total}
+    for depth, name, value in reversed(lines[:index]):
+        if depth <= indent:
+            break
+        if "." not in name:
+            times.setdefault(name, value)
+    return times
+
+
+def main():
+    import subprocess
+
+    module = sys.argv[1] if len(sys.argv) > 1 else "base_app"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(f"cold start of {module}: {(time.perf_counter() - start) * 1000:.0f} ms")
+    for name, value in sorted(import_times(module).items(), key=lambda item: -item[1])[:15]:
+        print(f"{name:<24}{value:8.1f} ms")
+
+    print()
+    errors = init_pygame(ALL_SUBSYSTEMS)
+    print(report())
+    for name, error in errors.items():
+        print(f"{name} failed: {error}")
+
+
+if __name__ == "__main__":
+    main()
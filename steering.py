@@ -0,0 +1,153 @@
+"""
+Origin Game Engine Library.
+This file contains steering behaviors and flocking.
+Forces for all agents are computed in one vectorized pass, neighbors are found with spatial.grid_pairs.
+"""
+
+import numpy as np
+from spatial import grid_pairs
+
+
+def normalize(vectors):
+    """ Returns normalized vectors and their lengths, zero vectors stay zero """
+
+    lengths = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    safe = np.where(lengths > 0, lengths, 1)
+    return vectors / safe[:, None], lengths
+
+
+def scatter_add(index, values, size):
+    """ Sums rows of values into rows of (size, ...) array at given indices, much faster than np.add.at """
+
+    # bincount returns integers for empty input, so result is always cast to float
+    if values.ndim == 1:
+        return np.bincount(index, values, size).astype(np.float64)
+    return np.stack([np.bincount(index, values[:, k], size) for k in range(values.shape[1])], axis=1).astype(np.float64)
+
+
+def truncate(vectors, max_length):
+    """ Limits length of every vector """
+
+    normalized, lengths = normalize(vectors)
+    return np.where((lengths > max_length)[:, None], normalized * max_length, vectors)
+
+
+def seek(positions, velocities, targets, max_speed):
+    """ Steering towards targets at full speed """
+
+    desired, _ = normalize(targets - positions)
+    return desired * max_speed - velocities
+
+
+def arrive(positions, velocities, targets, max_speed, slow_radius):
+    """ Steering towards targets that slows down inside slow_radius """
+
+    direction, lengths = normalize(targets - positions)
+    speed = np.minimum(max_speed, max_speed * lengths / slow_radius)
+    return direction * speed[:, None] - velocities
+
+
+def separation(positions, radius, pairs=None):
+    """ Steering away from neighbors closer than radius, stronger for closer neighbors """
+
+    i, j = grid_pairs(positions, radius) if pairs is None else pairs
+    direction, lengths = normalize(positions[i] - positions[j])
+    # pairs may come from a bigger neighbor radius
+    close = lengths < radius
+    i, j = i[close], j[close]
+    push = direction[close] * (1 - lengths[close] / radius)[:, None]
+    n = len(positions)
+    return scatter_add(i, push, n) - scatter_add(j, push, n)
+
+
+def cohesion(positions, velocities, radius, max_speed, pairs=None):
+    """ Steering towards the center of neighbors closer than radius """
+
+    i, j = grid_pairs(positions, radius) if pairs is None else pairs
+    n = len(positions)
+    centers = scatter_add(i, positions[j], n) + scatter_add(j, positions[i], n)
+    counts = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    has_neighbors = counts > 0
+    force = np.zeros_like(positions)
+    if has_neighbors.any():
+        centers = centers[has_neighbors] / counts[has_neighbors, None]
+        force[has_neighbors] = seek(positions[has_neighbors], velocities[has_neighbors], centers, max_speed)
+    return force
+
+
+def alignment(velocities, pairs):
+    """ Steering towards average velocity of neighbors """
+
+    i, j = pairs
+    n = len(velocities)
+    average = scatter_add(i, velocities[j], n) + scatter_add(j, velocities[i], n)
+    counts = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    has_neighbors = counts > 0
+    force = np.zeros_like(velocities)
+    force[has_neighbors] = average[has_neighbors] / counts[has_neighbors, None] - velocities[has_neighbors]
+    return force
+
+
+def avoid_obstacles(positions, sizes, obstacles, obstacle_sizes, margin=10):
+    """ Steering out of circle obstacles, stronger for deeper penetration """
+
+    if len(obstacles) == 0:
+        return np.zeros_like(positions)
+    obstacles = np.asarray(obstacles, dtype=np.float64)
+    obstacle_sizes = np.asarray(obstacle_sizes, dtype=np.float64)
+    reach = sizes.max() + obstacle_sizes.max() + margin
+    i, j = grid_pairs(positions, reach, obstacles)
+    delta = positions[i] - obstacles[j]
+    direction, lengths = normalize(delta)
+    limit = sizes[i] + obstacle_sizes[j] + margin
+    inside = lengths < limit
+    push = direction[inside] * ((limit - lengths) / limit)[inside, None]
+    return scatter_add(i[inside], push, len(positions))
+
+
+class Flock:
+    """
+    Flocking for game enemies.
+    Enemy logic still decides where to go, flock adds separation, cohesion
+    and obstacle avoidance against rocks to enemy movement.
+    """
+
+    def __init__(self, game, neighbor_radius=50, separation_weight=4, cohesion_weight=0.02, avoidance_weight=6,
+                 max_force=5):
+        self.game = game
+        self.neighbor_radius = neighbor_radius
+        self.separation_weight = separation_weight
+        self.cohesion_weight = cohesion_weight
+        self.avoidance_weight = avoidance_weight
+        self.max_force = max_force
+
+    def forces(self, positions, sizes, velocities, obstacles=(), obstacle_sizes=()):
+        """ Returns flocking forces for all agents """
+
+        separation_radius = sizes.max() * 2 + 10
+        pairs = grid_pairs(positions, max(self.neighbor_radius, separation_radius))
+        force = separation(positions, separation_radius, pairs) * self.separation_weight
+        force += cohesion(positions, velocities, self.neighbor_radius, 1, pairs) * self.cohesion_weight
+        force += avoid_obstacles(positions, sizes, obstacles, obstacle_sizes) * self.avoidance_weight
+        return truncate(force, self.max_force)
+
+    def update(self, agents, obstacles=()):
+        """ Pushes agents apart from each other and out of obstacles, game selects both lists """
+
+        if not agents:
+            return
+
+        positions = np.array([agent.pos for agent in agents], dtype=np.float64)
+        sizes = np.array([agent.size for agent in agents], dtype=np.float64)
+        targets = np.array([agent.new_pos for agent in agents], dtype=np.float64)
+        obstacle_positions = np.array([obj.pos for obj in obstacles], dtype=np.float64).reshape(-1, 2)
+        obstacle_sizes = np.array([obj.size for obj in obstacles], dtype=np.float64)
+
+        force = self.forces(positions, sizes, targets - positions, obstacle_positions, obstacle_sizes)
+        tweens = getattr(self.game, "tweens", None)
+        for agent, (fx, fy) in zip(agents, force.tolist()):
+            if fx or fy:
+                agent.new_pos[0] += fx
+                agent.new_pos[1] += fy
+                if tweens is not None:
+                    tweens.wake(agent)
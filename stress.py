@@ -0,0 +1,327 @@
+"""
+Origin Game Engine Library.
+This file contains stress scenarios of the whole game loop.
+Every scenario builds a world of the untitled game headlessly with N objects and runs its frames with fixed input:
+chase - N enemies chase the player, explosives - N explosives close together are ignited and chain
+(and are put back when the chain burnt out),
+shotgun - the player fires 10 bullets every frame into N rocks.
+Frame times, GC pauses and per frame allocations (tracemalloc) are recorded for every N,
+and the scaling exponent between sizes shows where cost grows faster than N:
+about 1 is linear, about 2 is a pairwise path. Game systems are timed one by one as well.
+
+python stress.py [--scenarios chase] [--sizes 10 100 1000] [--json curves.json] runs the scenarios.
+"""
+
+import argparse
+import gc
+import json
+import math
+import time
+import tracemalloc
+from collections import defaultdict
+import numpy as np
+from base_app import HeadlessApp
+from untitled_game_update import Game
+from objects import Enemy, Rock, Explosive
+
+# (system attribute of the game, method) timed separately, the rest of the frame is "other"
+SYSTEMS = [
+    ("pathfinder", "update"),
+    ("scheduler", "update"),
+    ("tweens", "update"),
+    ("collisions", "update_bullets"),
+    ("particles", "update"),
+    ("flock", "update"),
+    ("physics", "step"),
+    ("collisions", "update"),
+    ("player", "update"),
+    ("render_queue", "flush"),
+    ("light_map", "update"),
+]
+
+
+def empty_world(game):
+    """ Removes everything but the player and recreates systems, like loading a save """
+
+    player = game.player
+    game.objects.clear()
+    game.bullets.clear()
+    game.create_systems()
+    add(game, player)
+    # spawning stops at 4 enemies, scenarios count only their own enemies
+    game.enemies_count = 4
+
+
+def add(game, obj):
+    """ Adds object to the game and to systems that hold objects """
+
+    game.objects.append(obj)
+    if hasattr(obj, "mass"):
+        game.physics.add(obj)
+    if hasattr(obj, "followed"):
+        game.tweens.add(obj)
+
+
+def around(game, count, radius, rng):
+    """ Returns count positions scattered around the player up to radius """
+
+    angles = rng.uniform(0, 2 * math.pi, count)
+    distances = radius * np.sqrt(rng.uniform(0.05, 1, count))
+    x, y = game.player.pos
+    return np.stack([x + np.cos(angles) * distances, y + np.sin(angles) * distances], axis=1).tolist()
+
+
+class Scenario:
+    """
+    Stress scenario.
+
+    build(game, n, rng): fills the empty world.
+    inputs(game, frame): returns mouse_buttons, mouse_position, keys of the frame.
+    """
+
+    def __init__(self, name, build, inputs=None):
+        self.name = name
+        self.build = build
+        self.inputs = inputs or idle
+
+
+def idle(game, frame):
+    """ Input of a player that does nothing """
+
+    return (0, 0, 0), [game.app.H_WIDTH + 200, game.app.H_HEIGHT], defaultdict(bool)
+
+
+def build_chase(game, n, rng):
+    """ Enemies that already noticed the player all around it """
+
+    for pos in around(game, n, 600, rng):
+        add(game, Enemy(game, pos=pos, size=20, anchor_point=pos, debug=False, vision_angle=360, detect_range=1200,
+                        color=(0, 255, 0), stop_range=50, damaged=True))
+
+
+def build_explosives(game, n, rng):
+    """ Explosives scattered closely enough that one ignition chains through the ones around it """
+
+    # chains use up the explosives, the same ones are put back when all of them are gone
+    game.stress_positions = around(game, n, 500, rng)
+    for pos in game.stress_positions:
+        add(game, Explosive(game, list(pos)))
+
+
+def explosives_inputs(game, frame):
+    """
+    Ignites the last explosive every 15 frames, explosives in its blast range blast the next frame and so on.
+    Explosives are put back when the last explosion ended.
+    """
+
+    explosives = [obj for obj in game.objects if type(obj) is Explosive]
+    if not explosives:
+        for pos in game.stress_positions:
+            add(game, Explosive(game, list(pos)))
+    elif frame % 15 == 0:
+        waiting = [obj for obj in explosives if not obj.is_exploding and not obj.ignited]
+        if waiting:
+            waiting[-1].damage(waiting[-1].health)
+    return idle(game, frame)
+
+
+def build_shotgun(game, n, rng):
+    """ Rocks around the player, rocks take hits and never die """
+
+    for pos in around(game, n, 900, rng):
+        add(game, Rock(game, pos))
+
+
+def shotgun_inputs(game, frame):
+    """ Holds fire while sweeping the aim around the player """
+
+    angle = frame * 0.1
+    x, y = game.player.pos
+    return (1, 0, 0), [x + math.cos(angle) * 300, y + math.sin(angle) * 300], defaultdict(bool)
+
+
+SCENARIOS = {
+    "chase": Scenario("chase", build_chase),
+    "explosives": Scenario("explosives", build_explosives, explosives_inputs),
+    "shotgun": Scenario("shotgun", build_shotgun, shotgun_inputs),
+}
+
+
+class GCTimer:
+    """ Records durations of garbage collections through gc.callbacks """
+
+    def __init__(self):
+        self.pauses = []
+        self.start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.start = time.perf_counter()
+        elif self.start is not None:
+            self.pauses.append((info["generation"], (time.perf_counter() - self.start) * 1000))
+            self.start = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def instrument(game) -> dict:
+    """ Wraps update methods of game systems with timers, returns {system: milliseconds} filled as they run """
+
+    times = defaultdict(float)
+    for attribute, method in SYSTEMS:
+        system = getattr(game, attribute, None)
+        if system is None or not hasattr(system, method):
+            continue
+        name = f"{attribute}.{method}"
+        function = getattr(system, method)
+
+        def timed(*args, _function=function, _name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _function(*args, **kwargs)
+            finally:
+                times[_name] += (time.perf_counter() - start) * 1000
+
+        # instance attribute shadows the method only for this game
+        setattr(system, method, timed)
+    return times
+
+
+def step(app, scenario, frame):
+    """ Runs one game frame of the scenario """
+
+    mouse_buttons, mouse_position, keys = scenario.inputs(app.game, frame)
+    app.game.update(mouse_buttons, mouse_position, [], keys)
+
+
+def run(scenario, n, frames=60, warmup=10, memory_frames=20, render=False, seed=1) -> dict:
+    """
+    Returns measurements of the scenario with n objects.
+    Frames are timed without tracemalloc, allocations are traced on the following memory_frames frames,
+    because tracing slows Python code down several times.
+    """
+
+    app = HeadlessApp(Game, render=render, seed=seed)
+    game = app.game
+    empty_world(game)
+    scenario.build(game, n, np.random.default_rng(seed))
+    frame = 0
+    for frame in range(warmup):
+        step(app, scenario, frame)
+
+    systems = instrument(game)
+    systems.clear()
+    times = []
+    gc.collect()
+    with GCTimer() as collector:
+        for frame in range(frame + 1, frame + 1 + frames):
+            start = time.perf_counter()
+            step(app, scenario, frame)
+            times.append((time.perf_counter() - start) * 1000)
+    system_ms = {name: value / frames for name, value in systems.items()}
+    system_ms["other"] = max(0.0, float(np.mean(times)) - sum(system_ms.values()))
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        before, _ = tracemalloc.get_traced_memory()
+        for frame in range(frame + 1, frame + 1 + memory_frames):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step(app, scenario, frame)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = np.array(times)
+    pauses = [pause for _, pause in collector.pauses]
+    return {
+        "scenario": scenario.name,
+        "n": n,
+        "objects": len(game.objects) + len(game.bullets),
+        "frame_ms": float(times.mean()),
+        "frame_ms_p95": float(np.percentile(times, 95)),
+        "frame_ms_max": float(times.max()),
+        "gc_collections": len(pauses),
+        "gc_ms": float(sum(pauses)),
+        "gc_ms_max": float(max(pauses, default=0.0)),
+        "gc_full_collections": sum(generation == 2 for generation, _ in collector.pauses),
+        "frame_alloc_kb": float(np.mean(peaks)) / 1024 if peaks else 0.0,
+        "memory_growth_kb": (after - before) / 1024,
+        "systems_ms": system_ms,
+    }
+
+
+def exponents(points) -> list:
+    """ Returns slopes of log(cost) over log(n) between consecutive (n, cost) points """
+
+    result = []
+    for (n1, cost1), (n2, cost2) in zip(points, points[1:]):
+        if cost1 > 0 and cost2 > 0 and n2 != n1:
+            result.append(math.log(cost2 / cost1) / math.log(n2 / n1))
+        else:
+            result.append(float("nan"))
+    return result
+
+
+def sweep(scenario, sizes, **kwargs) -> dict:
+    """ Returns scaling curve of the scenario: measurements of every size and exponents between them """
+
+    results = [run(scenario, n, **kwargs) for n in sizes]
+    frame_points = [(result["n"], result["frame_ms"]) for result in results]
+    systems = {name: exponents([(result["n"], result["systems_ms"].get(name, 0)) for result in results])
+               for name in results[-1]["systems_ms"]}
+    return {"scenario": scenario.name, "results": results, "exponents": exponents(frame_points),
+            "system_exponents": systems}
+
+
+def report(curve, superlinear=1.5) -> str:
+    """ Returns table of a scaling curve, systems growing faster than n ** superlinear are marked """
+
+    results = curve["results"]
+    lines = [f"{curve['scenario']}",
+             f"{'n':>7}{'objects':>9}{'frame ms':>10}{'p95':>8}{'max':>8}{'gc':>5}{'gc ms':>8}{'gc max':>8}"
+             f"{'alloc KB':>10}{'growth KB':>11}{'exponent':>10}"]
+    for result, exponent in zip(results, [float("nan")] + curve["exponents"]):
+        lines.append(f"{result['n']:>7}{result['objects']:>9}{result['frame_ms']:>10.2f}{result['frame_ms_p95']:>8.2f}"
+                     f"{result['frame_ms_max']:>8.2f}{result['gc_collections']:>5}{result['gc_ms']:>8.2f}"
+                     f"{result['gc_ms_max']:>8.2f}{result['frame_alloc_kb']:>10.1f}{result['memory_growth_kb']:>11.1f}"
+                     f"{'' if math.isnan(exponent) else f'{exponent:.2f}':>10}")
+    lines.append(f"  systems at n={results[-1]['n']}, ms per frame and exponent of the last step:")
+    for name, value in sorted(results[-1]["systems_ms"].items(), key=lambda item: -item[1]):
+        exponent = curve["system_exponents"][name][-1] if curve["system_exponents"][name] else float("nan")
+        mark = "  <- superlinear" if exponent > superlinear and value > 0.1 else ""
+        lines.append(f"  {name:<28}{value:>9.2f}{'' if math.isnan(exponent) else f'{exponent:.2f}':>8}{mark}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress scenarios of the game loop")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--memory-frames", type=int, default=20)
+    parser.add_argument("--render", action="store_true", help="draw frames into the headless display")
+    parser.add_argument("--json", help="write scaling curves to this file")
+    args = parser.parse_args()
+
+    curves = []
+    for name in args.scenarios:
+        curve = sweep(SCENARIOS[name], args.sizes, frames=args.frames, memory_frames=args.memory_frames,
+                      render=args.render)
+        curves.append(curve)
+        print(report(curve))
+        print()
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(curves, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Origin Game Engine Library.
+This file contains tests of asset loading.
+"""
+
+import warnings
+import pygame
+from assets import AssetManager
+
+
+def test_sound_initializes_mixer_or_reports_why_it_cant():
+    pygame.mixer.quit()
+    assets = AssetManager()
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            handle = assets.sound("missing.wav")
+        if pygame.mixer.get_init():
+            assert not caught
+        else:
+            assert handle.ready and handle.error is not None
+            assert "mixer failed" in str(caught[0].message)
+    finally:
+        assets.shutdown()
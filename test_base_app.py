@@ -0,0 +1,58 @@
+"""
+Origin Game Engine Library.
+This file contains tests of headless apps.
+"""
+
+from collections import defaultdict
+from base_app import HeadlessApp
+from objects import Player, Enemy, Rock, Explosive, Bullet
+import update
+import untitled_game_update
+import snapshot
+import simulation
+import startup
+
+CLASSES = {"Player": Player, "Enemy": Enemy, "Rock": Rock, "Explosive": Explosive, "Bullet": Bullet}
+
+
+def test_seeded_headless_app_with_default_game():
+    app = HeadlessApp(seed=3)
+    app.run(2)
+    assert isinstance(app.game, update.Game)
+
+
+def test_seeded_headless_app_is_deterministic():
+    states = []
+    for _ in range(2):
+        app = HeadlessApp(untitled_game_update.Game, seed=3)
+        app.run(30)
+        states.append(snapshot.pack_game(app.game).tobytes())
+    assert states[0] == states[1]
+
+
+def test_rollback_replays_recorded_input():
+    results = []
+    for reuse in (True, False):
+        app = HeadlessApp(untitled_game_update.Game, seed=3, render=False)
+        rollback = simulation.Rollback(app.game, CLASSES)
+        held = [False, False, False]
+        keys = defaultdict(bool)
+        for tick in range(6):
+            if not reuse:
+                held = [False, False, False]
+            # input manager changes the same list in place
+            held[0] = tick in (2, 3)
+            rollback.advance(held, [app.H_WIDTH + 200, app.H_HEIGHT], keys)
+        rollback.rollback(6)
+        results.append((len(app.game.bullets), snapshot.pack_game(app.game).tobytes()))
+    assert results[0][0] > 0
+    assert results[0] == results[1]
+
+
+def test_every_app_has_own_startup_times():
+    first = HeadlessApp(seed=3)
+    created = first.STARTUP["create game"]
+    second = HeadlessApp(seed=3)
+    assert first.STARTUP["create game"] == created
+    assert second.STARTUP is not first.STARTUP
+    assert "create game" not in startup.TIMES
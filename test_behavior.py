@@ -0,0 +1,34 @@
+"""
+Origin Game Engine Library.
+This file contains tests of agent behavior.
+"""
+
+from behavior import Perception, Predicate
+
+
+class Agent:
+    def __init__(self, value):
+        self.value = value
+
+
+def test_batch_cache_is_not_shared_by_lists_with_reused_id():
+    positive = Predicate("positive", lambda agent: agent.value > 0)
+    perception = Perception()
+    perception.begin()
+    assert perception.batch(positive, [Agent(1), Agent(2)]).tolist() == [True, True]
+    # the first list is freed, the new one often gets its id
+    assert perception.batch(positive, [Agent(-1), Agent(-2)]).tolist() == [False, False]
+
+
+def test_batch_cache_is_reused_for_the_same_agents():
+    calls = []
+    positive = Predicate("positive", lambda agent: calls.append(agent) or agent.value > 0)
+    agents = [Agent(1), Agent(-1)]
+    perception = Perception()
+    perception.begin()
+    perception.batch(positive, agents)
+    assert perception.batch(positive, list(agents)).tolist() == [True, False]
+    assert len(calls) == 2
+    perception.begin()
+    perception.batch(positive, agents)
+    assert len(calls) == 4
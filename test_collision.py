@@ -0,0 +1,59 @@
+"""
+Origin Game Engine Library.
+This file contains tests of continuous collision detection.
+"""
+
+import numpy as np
+from base_app import HeadlessApp
+from objects import Enemy, Rock, Bullet
+from functions import swept_circle_intersection, segment_circle_hit
+from collision import CollisionResolver, sweep_circles
+import untitled_game_update
+
+
+def test_fast_circle_does_not_tunnel():
+    # both ends of the movement are outside the obstacle
+    assert swept_circle_intersection([0, 0], [200, 0], 10, [100, 0], 20) == 0.35
+    assert swept_circle_intersection([0, 0], [200, 0], 10, [100, 40], 20) is None
+    assert swept_circle_intersection([200, 0], [0, 0], 10, [300, 0], 20) is None
+    assert segment_circle_hit([0, 0], [200, 0], [100, 0], 20) == [80, 0]
+
+
+def test_batch_sweep_matches_single_sweep():
+    rng = np.random.default_rng(1)
+    starts = rng.uniform(0, 500, (200, 2))
+    ends = starts + rng.uniform(-100, 100, (200, 2))
+    radii = rng.uniform(1, 10, 200)
+    centers = rng.uniform(0, 500, (30, 2))
+    sizes = rng.uniform(5, 30, 30)
+    fractions, hits = sweep_circles(starts, ends, radii, centers, sizes)
+    for start, end, radius, fraction, hit in zip(starts, ends, radii, fractions, hits):
+        contacts = [swept_circle_intersection(start, end, radius, center, size) for center, size in zip(centers, sizes)]
+        contacts = [t for t in contacts if t is not None and t <= 1]
+        if contacts:
+            assert np.isclose(fraction, min(contacts))
+            assert np.isclose(swept_circle_intersection(start, end, radius, centers[hit], sizes[hit]), fraction)
+        else:
+            assert fraction == 1 and hit == -1
+
+
+def test_mover_stops_at_rock_it_jumps_over():
+    game = HeadlessApp(untitled_game_update.Game, seed=3, render=False).game
+    rock = Rock(game, [100, 0], 20)
+    enemy = Enemy(game, [0, 0], 10)
+    resolver = CollisionResolver(game)
+    resolver.update([enemy], [rock])
+
+    enemy.pos[0] = enemy.new_pos[0] = 200
+    resolver.update([enemy], [rock])
+    assert resolver.hits == 1
+    assert enemy.pos[0] < 100 - 30
+    assert enemy.new_pos[0] == 200
+
+
+def test_bullet_path_ends_at_rock():
+    game = HeadlessApp(untitled_game_update.Game, seed=3, render=False).game
+    rock = Rock(game, [50, 0], 10)
+    bullet = Bullet(game, [0, 0], [300, 0], angle=0, speed=100)
+    CollisionResolver(game).update_bullets([bullet], [rock])
+    assert np.allclose(bullet.end_pos, [40 - bullet.size, 0])
@@ -0,0 +1,58 @@
+"""
+Origin Game Engine Library.
+This file contains tests of area of interest management.
+"""
+
+import numpy as np
+from interest import InterestManager, Observer
+
+
+def test_entities_enter_and_leave():
+    events = []
+    manager = InterestManager(cell_size=64)
+    manager.add(Observer(center=[0, 0], radius=100, margin=20,
+                         on_enter=lambda observer, ids: events.append(("enter", ids.tolist())),
+                         on_leave=lambda observer, ids: events.append(("leave", ids.tolist()))))
+    ids = [7, 3, 5]
+    positions = np.array([[50, 0], [300, 0], [0, -90]], dtype=np.float64)
+
+    assert manager.update(positions, ids) == 2
+    assert events == [("enter", [5, 7])]
+    assert manager.update(positions, ids) == 0
+
+    positions[1] = [0, 80]
+    positions[0] = [400, 400]
+    assert manager.update(positions, ids) == 2
+    assert events[1:] == [("enter", [3]), ("leave", [7])]
+    assert manager.observers[0].visible.tolist() == [3, 5]
+
+
+def test_visible_entities_leave_past_margin():
+    manager = InterestManager(cell_size=64)
+    observer = manager.add(Observer([0, 0, 100, 100], margin=20))
+    positions = np.array([[110, 50]], dtype=np.float64)
+    manager.update(positions)
+    # outside of the rect, but not visible yet
+    assert len(observer.visible) == 0
+
+    positions[0] = [90, 50]
+    manager.update(positions)
+    assert observer.entered.tolist() == [0]
+    positions[0] = [110, 50]
+    manager.update(positions)
+    assert observer.visible.tolist() == [0] and len(observer.left) == 0
+    positions[0] = [130, 50]
+    manager.update(positions)
+    assert observer.left.tolist() == [0]
+
+
+def test_visible_sets_match_brute_force():
+    rng = np.random.default_rng(1)
+    manager = InterestManager(cell_size=100)
+    for x, y in rng.uniform(-500, 500, (8, 2)).tolist():
+        manager.add(Observer([x, y, 300, 200], [x + 150, y + 100], 250, margin=0))
+    positions = rng.uniform(-1000, 1000, (2000, 2))
+    ids = rng.permutation(10000)[:2000]
+    manager.update(positions, ids)
+    for observer in manager.observers:
+        assert observer.visible.tolist() == np.sort(ids[observer.contains(positions)]).tolist()
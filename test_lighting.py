@@ -0,0 +1,37 @@
+"""
+Origin Game Engine Library.
+This file contains tests of lighting.
+"""
+
+import math
+from collections import defaultdict
+import pygame
+from base_app import HeadlessApp
+from lighting import visibility_polygon
+import untitled_game_update
+
+
+def test_visibility_polygon_ignores_degenerate_occluders():
+    polygon = visibility_polygon((100, 100), 200, segments=[((150, 150), (150, 150))], rects=[((150, 150), (0, 0))])
+    assert all(math.isclose(math.hypot(x - 100, y - 100), 200) for x, y in polygon)
+
+
+def test_visibility_polygon_is_cut_by_segment():
+    polygon = visibility_polygon((0, 0), 200, segments=[((50, -20), (50, 20))])
+    right = [x for x, y in polygon if abs(y) < 1 and x > 0]
+    assert right and max(right) <= 50 + 1e-6
+
+
+def test_flashes_move_with_scrolling_world():
+    app = HeadlessApp(untitled_game_update.Game, seed=1)
+    game = app.game
+    game.light_map.enabled = True
+    game.light_map.flash([100, 100], 50)
+    player = game.player
+    angle = math.radians(player.angle)
+    keys = defaultdict(bool)
+    keys[pygame.K_w] = True
+    player.update(keys, [app.H_WIDTH + 100, app.H_HEIGHT], [False, False, False])
+    x, y = game.light_map.flashes[0][0]
+    assert math.isclose(x, 100 - math.cos(angle) * player.speed, abs_tol=1e-9)
+    assert math.isclose(y, 100 - math.sin(angle) * player.speed, abs_tol=1e-9)
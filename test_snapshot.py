@@ -0,0 +1,52 @@
+"""
+Origin Game Engine Library.
+This file contains tests of world snapshots.
+"""
+
+import numpy as np
+import pytest
+from base_app import HeadlessApp
+from untitled_game_update import Game
+import snapshot
+
+
+def run_game(seed=2, frames=40):
+    app = HeadlessApp(Game, seed=seed)
+    app.run(frames, mouse_buttons=(1, 0, 0), mouse_position=[app.H_WIDTH + 200, app.H_HEIGHT])
+    return app.game
+
+
+def test_snapshot_round_trip(tmp_path):
+    game = run_game()
+    path = tmp_path / "world.ogs"
+    game.save(path)
+
+    loaded = HeadlessApp(Game, seed=5).game
+    loaded.load(path)
+    assert snapshot.pack_game(loaded).tobytes() == snapshot.pack_game(game).tobytes()
+    assert [type(obj) for obj in loaded.objects] == [type(obj) for obj in game.objects]
+    assert len(loaded.bullets) == len(game.bullets)
+    assert loaded.player is loaded.objects[[type(obj).__name__ for obj in loaded.objects].index("Player")]
+    assert (loaded.counter, loaded.enemies_count) == (game.counter, game.enemies_count)
+
+
+def test_snapshot_memory_mapped_and_read_records_are_equal(tmp_path):
+    game = run_game()
+    path = tmp_path / "world.ogs"
+    snapshot.save(path, snapshot.pack_game(game), snapshot.game_state(game))
+    mapped, state = snapshot.load(path)
+    read, _ = snapshot.load(path, mmap=False)
+    # walk points of enemies without one are NaN, so bytes are compared
+    assert np.asarray(mapped).tobytes() == read.tobytes()
+    assert state == snapshot.game_state(game)
+
+
+def test_load_without_player_raises_value_error(tmp_path):
+    game = run_game(frames=1)
+    records = snapshot.pack_game(game)
+    path = tmp_path / "empty.ogs"
+    snapshot.save(path, records[records["type"] != snapshot.ENTITY_TYPES["Player"][0]])
+    objects = list(game.objects)
+    with pytest.raises(ValueError):
+        game.load(path)
+    assert game.objects == objects
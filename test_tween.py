@@ -0,0 +1,85 @@
+"""
+Origin Game Engine Library.
+This file contains tests of tweens and followers.
+"""
+
+from base_app import HeadlessApp
+from objects import Player, Enemy, Rock, Explosive, Bullet
+from tween import TweenManager, Follower, shortest_arc, lerp_angle
+import untitled_game_update
+import simulation
+
+CLASSES = {"Player": Player, "Enemy": Enemy, "Rock": Rock, "Explosive": Explosive, "Bullet": Bullet}
+
+
+def test_shortest_arc_crosses_zero():
+    assert shortest_arc(350, 10) == 20
+    assert shortest_arc(10, 350) == -20
+    assert shortest_arc(0, 180) == -180
+    assert lerp_angle(350, 10, 0.5) == 0
+
+
+def test_followed_angle_turns_the_short_way():
+    tweens = TweenManager()
+    obj = Follower((0, 0), angle=350)
+    obj.new_angle = 10
+    tweens.add(obj)
+    for _ in range(600):
+        tweens.update()
+        # angle never goes through 180 on the long way round
+        assert obj.angle >= 350 or obj.angle <= 10
+    assert obj.angle == 10
+
+
+def test_follower_is_parked_and_woken():
+    tweens = TweenManager()
+    obj = Follower((0, 0))
+    obj.new_pos = [100, 50]
+    tweens.add(obj)
+    for _ in range(600):
+        tweens.update()
+    assert obj.pos == [100, 50]
+    assert not tweens.active
+    assert tweens.follows(obj)
+
+    obj.new_pos[0] = 200
+    tweens.update()
+    assert obj.pos == [100, 50]
+    tweens.wake(obj)
+    tweens.update()
+    assert 100 < obj.pos[0] < 200
+
+    for _ in range(600):
+        tweens.update()
+    assert not tweens.active
+    obj.new_pos[1] = 0
+    tweens.wake_all()
+    tweens.update()
+    assert 0 < obj.pos[1] < 50
+
+
+def test_followed_override_of_one_object():
+    tweens = TweenManager()
+    slow, fast = Follower((0, 0)), Follower((0, 0))
+    fast.followed = (("pos", "new_pos", 0.5, False),)
+    for obj in (slow, fast):
+        obj.new_pos = [100, 0]
+        tweens.add(obj)
+    tweens.update()
+    assert abs(slow.pos[0] - 20) < 1e-9
+    assert abs(fast.pos[0] - 50) < 1e-9
+
+
+def test_restore_keeps_parked_followers_parked():
+    app = HeadlessApp(untitled_game_update.Game, seed=3, render=False)
+    app.run(120)
+    game = app.game
+    state = simulation.capture(game)
+    active = [game.tweens.active.get(id(obj)) is obj for obj in simulation.entities(game)]
+    assert any(active) and not all(active)
+
+    game.tweens.wake_all()
+    simulation.restore(game, state, CLASSES)
+    objects = simulation.entities(game)
+    assert [game.tweens.active.get(id(obj)) is obj for obj in objects] == active
+    assert all(game.tweens.follows(obj) for obj in objects if hasattr(obj, "followed"))
@@ -0,0 +1,339 @@
+"""
+Origin Game Engine Library.
+This file contains tweening: timed tweens with easing curves and smoothed following of target values.
+Timed tweens move an attribute from its value to an end value in given seconds along an easing curve,
+they are kept in NumPy arrays and evaluated in one batch per frame.
+Followers are the smoothing of entities: attribute approaches a target attribute (pos to new_pos)
+by the same part of the distance every 1 / 60 s, so it doesn't depend on the frame rate.
+Angles take the shortest way around the circle.
+Finished tweens are removed and still followers are parked, so neither costs anything,
+parked objects are woken by the code that moves their targets.
+
+python tween.py benchmarks timed tweens and followers.
+"""
+
+import time
+from itertools import chain, compress
+from operator import attrgetter
+import numpy as np
+from functions import lerp
+
+# factors of followers are parts of the distance passed in one frame of this length
+FRAME = 1 / 60
+
+EASINGS = {
+    "linear": lambda t: t,
+    "in_quad": lambda t: t * t,
+    "out_quad": lambda t: t * (2 - t),
+    "in_out_quad": lambda t: np.where(t < 0.5, 2 * t * t, 1 - 2 * (1 - t) ** 2),
+    "in_cubic": lambda t: t ** 3,
+    "out_cubic": lambda t: 1 - (1 - t) ** 3,
+    "in_out_cubic": lambda t: np.where(t < 0.5, 4 * t ** 3, 1 - 4 * (1 - t) ** 3),
+    "in_sine": lambda t: 1 - np.cos(t * np.pi / 2),
+    "out_sine": lambda t: np.sin(t * np.pi / 2),
+    "in_out_sine": lambda t: (1 - np.cos(t * np.pi)) / 2,
+    "out_expo": lambda t: np.where(t < 1, 1 - 2.0 ** (-10 * t), 1),
+    "out_back": lambda t: 1 + 2.70158 * (t - 1) ** 3 + 1.70158 * (t - 1) ** 2,
+}
+EASING_NAMES = list(EASINGS)
+EASING_FUNCTIONS = list(EASINGS.values())
+
+
+def shortest_arc(start, end):
+    """ Returns signed angle in degrees from start to end the shortest way, from -180 to 180 """
+
+    return (end - start + 180) % 360 - 180
+
+
+def lerp_angle(start, end, t):
+    """ Interpolates angle in degrees the shortest way, result is from 0 to 360 """
+
+    return (start + shortest_arc(start, end) * t) % 360
+
+
+def frame_factor(factor, dt):
+    """ Returns part of the distance passed in dt seconds, factor is the part passed in one 1 / 60 s frame """
+
+    return 1 - (1 - factor) ** (dt / FRAME)
+
+
+def follow_targets(obj):
+    """
+    Moves followed attributes of the object one frame towards their targets,
+    for objects that the tween manager of their game doesn't follow.
+    """
+
+    tweens = getattr(obj.game, "tweens", None)
+    if tweens is not None and tweens.follows(obj):
+        return
+    for attribute, target, factor, angle in getattr(obj, "followed", ()):
+        if angle:
+            setattr(obj, attribute, lerp_angle(getattr(obj, attribute), getattr(obj, target), factor))
+        else:
+            value = getattr(obj, attribute)
+            end = getattr(obj, target)
+            value[0] = lerp(value[0], end[0], factor)
+            value[1] = lerp(value[1], end[1], factor)
+
+
+class TweenManager:
+    """
+    Timed tweens and followers of a game.
+
+    dt: seconds of one update, game logic runs in fixed steps, so it's fixed too and replays stay exact.
+    epsilon: followers closer to their targets are snapped to them and parked.
+    """
+
+    def __init__(self, dt=FRAME, capacity=64, epsilon=0.01):
+        self.dt = dt
+        self.epsilon = epsilon
+
+        # timed tweens, arrays are used up to count, targets are [obj, attribute, size, on_done]
+        self.start = np.zeros((capacity, 2))
+        self.end = np.zeros((capacity, 2))
+        self.elapsed = np.zeros(capacity)
+        self.duration = np.ones(capacity)
+        self.easing = np.zeros(capacity, dtype=np.int8)
+        self.angle = np.zeros(capacity, dtype=bool)
+        self.targets = []
+        self.count = 0
+
+        # followers, {id(obj): obj} of all followed objects and of ones that are still moving
+        self.objects = {}
+        self.active = {}
+        self.factors = {}  # {(factor, dt): part of the distance passed in one update}
+        self.moved = []  # objects changed by the last update
+
+    def to(self, obj, attribute, end, duration, easing="in_out_quad", angle=False, on_done=None):
+        """
+        Tweens number or [x, y] attribute of the object to end value in duration seconds.
+        Tween of the same attribute is replaced. on_done(obj) is called when the tween is finished.
+        """
+
+        self.cancel(obj, attribute)
+        if self.count == len(self.elapsed):
+            self.grow()
+        value = getattr(obj, attribute)
+        size = 1 if np.isscalar(value) else 2
+        start = np.broadcast_to(np.asarray(value, dtype=np.float64).reshape(-1)[:size], 2)
+        end = np.broadcast_to(np.asarray(end, dtype=np.float64).reshape(-1)[:size], 2)
+        if angle:
+            end = start + shortest_arc(start, end)
+
+        index = self.count
+        self.start[index] = start
+        self.end[index] = end
+        self.elapsed[index] = 0
+        self.duration[index] = duration
+        self.easing[index] = EASING_NAMES.index(easing)
+        self.angle[index] = angle
+        self.targets.append([obj, attribute, size, on_done])
+        self.count += 1
+
+    def rotate(self, obj, attribute, end, duration, easing="in_out_quad", on_done=None):
+        """ Tweens angle attribute in degrees the shortest way """
+
+        self.to(obj, attribute, end, duration, easing, True, on_done)
+
+    def cancel(self, obj, attribute=None):
+        """ Stops tweens of the object, only of the attribute if it's given, values stay where they are """
+
+        keep = [index for index, (target, name, _, _) in enumerate(self.targets)
+                if target is not obj or (attribute is not None and name != attribute)]
+        if len(keep) < self.count:
+            self.compact(keep)
+
+    def grow(self):
+        """ Doubles capacity of tween arrays """
+
+        for name in ("start", "end", "elapsed", "duration", "easing", "angle"):
+            array = getattr(self, name)
+            bigger = np.ones((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+            bigger[:len(array)] = array
+            setattr(self, name, bigger)
+
+    def compact(self, keep):
+        """ Keeps only tweens with given indices, packed at the start of the arrays """
+
+        for array in (self.start, self.end, self.elapsed, self.duration, self.easing, self.angle):
+            array[:len(keep)] = array[keep]
+        self.targets = [self.targets[index] for index in keep]
+        self.count = len(keep)
+
+    def add(self, obj):
+        """ Starts following attributes listed in followed of the object """
+
+        self.objects[id(obj)] = obj
+        self.active[id(obj)] = obj
+
+    def remove(self, obj):
+        """ Stops following the object and its tweens """
+
+        self.objects.pop(id(obj), None)
+        self.active.pop(id(obj), None)
+        self.cancel(obj)
+
+    def follows(self, obj) -> bool:
+        """ Checks if the object is followed """
+
+        return self.objects.get(id(obj)) is obj
+
+    def wake(self, obj):
+        """ Resumes following of a parked object, called when its targets are moved """
+
+        if self.objects.get(id(obj)) is obj:
+            self.active[id(obj)] = obj
+
+    def wake_all(self):
+        """ Resumes following of all objects, for example when the whole world scrolls """
+
+        self.active = dict(self.objects)
+
+    def clear(self):
+        """ Removes all tweens and followers """
+
+        self.compact([])
+        self.objects.clear()
+        self.active.clear()
+
+    def update(self, dt=None):
+        """ Advances tweens and followers by dt seconds """
+
+        dt = self.dt if dt is None else dt
+        self.moved = [target[0] for target in self.targets] + list(self.active.values())
+        if self.count:
+            self.update_tweens(dt)
+        if self.active:
+            self.update_followers(dt)
+
+    def update_tweens(self, dt):
+        """ Evaluates all timed tweens at once and writes values to their objects """
+
+        count = self.count
+        elapsed = self.elapsed[:count]
+        elapsed += dt
+        duration = self.duration[:count]
+        t = np.minimum(np.divide(elapsed, duration, out=np.ones(count), where=duration > 0), 1)
+        easing = self.easing[:count]
+        eased = np.empty(count)
+        for code in np.unique(easing).tolist():
+            mask = easing == code
+            eased[mask] = EASING_FUNCTIONS[code](t[mask])
+
+        start = self.start[:count]
+        values = start + (self.end[:count] - start) * eased[:, None]
+        finished = t >= 1
+        # finished tweens end exactly at their end values
+        values[finished] = self.end[:count][finished]
+        values[self.angle[:count]] %= 360
+
+        for (obj, attribute, size, _), value in zip(self.targets, values.tolist()):
+            if size == 1:
+                setattr(obj, attribute, value[0])
+            else:
+                getattr(obj, attribute)[:] = value
+
+        if finished.any():
+            done = [self.targets[index] for index in np.flatnonzero(finished).tolist()]
+            self.compact(np.flatnonzero(~finished).tolist())
+            # callbacks run after tweens are packed, so they can start new ones
+            for obj, _, _, on_done in done:
+                if on_done is not None:
+                    on_done(obj)
+
+    def update_followers(self, dt):
+        """ Moves followed attributes of active objects towards their targets and parks objects that reached them """
+
+        # objects with the same followed attributes, usually objects of one class, are evaluated together
+        groups = {}
+        for obj in self.active.values():
+            objects = groups.get(obj.followed)
+            if objects is None:
+                objects = groups[obj.followed] = []
+            objects.append(obj)
+
+        for followed, objects in groups.items():
+            still = True
+            for attribute, target, factor, angle in followed:
+                part = self.frame_factor(factor, dt)
+                get = attrgetter(attribute)
+                if angle:
+                    values = np.fromiter(map(get, objects), dtype=np.float64, count=len(objects))
+                    ends = np.fromiter(map(attrgetter(target), objects), dtype=np.float64, count=len(objects)) % 360
+                    values = (values + shortest_arc(values, ends) * part) % 360
+                    arrived = np.abs(shortest_arc(values, ends)) < self.epsilon
+                    values[arrived] = ends[arrived]
+                    for obj, value in zip(objects, values.tolist()):
+                        setattr(obj, attribute, value)
+                else:
+                    values = np.fromiter(chain.from_iterable(map(get, objects)), dtype=np.float64,
+                                         count=len(objects) * 2).reshape(-1, 2)
+                    ends = np.fromiter(chain.from_iterable(map(attrgetter(target), objects)), dtype=np.float64,
+                                       count=len(objects) * 2).reshape(-1, 2)
+                    values += (ends - values) * part
+                    arrived = (np.abs(ends - values) < self.epsilon).all(axis=1)
+                    values[arrived] = ends[arrived]
+                    # lists are changed in place, other code keeps references to positions
+                    for value, new in zip(map(get, objects), values.tolist()):
+                        value[:] = new
+                still = still & arrived
+            for obj in compress(objects, np.broadcast_to(still, len(objects)).tolist()):
+                del self.active[id(obj)]
+
+    def frame_factor(self, factor, dt):
+        """ Returns cached part of the distance passed in dt seconds """
+
+        part = self.factors.get((factor, dt))
+        if part is None:
+            part = self.factors[factor, dt] = frame_factor(factor, dt)
+        return part
+
+
+class Follower:
+    """ Object with smoothed position, like entities of the game """
+
+    followed = (("pos", "new_pos", 0.2, False), ("angle", "new_angle", 0.05, True))
+
+    def __init__(self, pos, angle=0):
+        self.pos = list(pos)
+        self.new_pos = list(pos)
+        self.angle = angle
+        self.new_angle = angle
+
+
+def benchmark(tweens=10000, followers=1000, moving=0.1, frames=300, seed=1):
+    """
+    Returns average milliseconds per frame of timed tweens and of followers,
+    moving part of followers get new targets every frame, the rest reach their targets and get parked.
+    """
+
+    rng = np.random.default_rng(seed)
+    manager = TweenManager()
+    objects = [Follower(position) for position in rng.uniform(0, 1000, (tweens, 2)).tolist()]
+    for obj, end in zip(objects, rng.uniform(0, 1000, (tweens, 2)).tolist()):
+        manager.to(obj, "pos", end, frames * FRAME, EASING_NAMES[len(manager.targets) % len(EASING_NAMES)])
+    start = time.perf_counter()
+    for _ in range(frames):
+        manager.update()
+    tween_ms = (time.perf_counter() - start) / frames * 1000
+
+    manager = TweenManager()
+    objects = [Follower(position) for position in rng.uniform(0, 1000, (followers, 2)).tolist()]
+    for obj in objects:
+        obj.new_pos = rng.uniform(0, 1000, 2).tolist()
+        obj.new_angle = float(rng.uniform(-360, 360))
+        manager.add(obj)
+    movers = objects[:int(followers * moving)]
+    start = time.perf_counter()
+    for _ in range(frames):
+        for obj in movers:
+            obj.new_pos[0] += 1
+            manager.wake(obj)
+        manager.update()
+    follower_ms = (time.perf_counter() - start) / frames * 1000
+    return {"tweens_ms": tween_ms, "followers_ms": follower_ms, "active_followers": len(manager.active)}
+
+
+if __name__ == "__main__":
+    for name, value in benchmark().items():
+        print(f"{name}: {value:.2f}")
@@ -0,0 +1,222 @@
+"""
+Origin Game Engine Library.
+This file contains retained UI tree for Label, Button, Text and other widgets from objects.py.
+Layout is applied only when screen size or widget size changes, static widgets are rendered once
+into a cached surface and clicks are dispatched through hit-test grid instead of polling every widget.
+Changes of dynamic widgets never rebuild the cache, they are only placed and put in the hit-test grid again.
+"""
+
+import pygame
+from functions import *
+from render import draw_blit, LAYER_UI
+from objects import OptionButton
+
+
+def widget_rect(widget):
+    """ Returns screen rectangle covered by the widget """
+
+    rects = [pygame.Rect(pos, surface.get_size()) for surface, pos in widget.blits()]
+    if not rects:
+        return pygame.Rect(widget.pos, (0, 0))
+    return rects[0].unionall(rects[1:])
+
+
+def drawn(widget):
+    """ Returns what the widget draws now, surfaces and their positions """
+
+    return [(surface, (pos[0], pos[1])) for surface, pos in widget.blits()]
+
+
+def same_drawn(old, new) -> bool:
+    """ Checks if widget draws the same surfaces at the same positions, update_text creates new surface """
+
+    return old is not None and len(old) == len(new) and all(
+        old_surface is surface and old_pos == pos for (old_surface, old_pos), (surface, pos) in zip(old, new))
+
+
+class UI:
+    """ Retained UI tree """
+
+    def __init__(self, game, cell_size=64):
+        self.game = game
+        self.cell_size = cell_size
+
+        # nodes are [widget, layout, on_click, static, layout key, drawn surfaces and positions, hit-test cells]
+        self.nodes = []
+        self.grid = {}
+        self.order = {}
+        self.screen_size = None
+
+        self.cache = None
+        self.cache_pos = [0, 0]
+        self.dirty = True
+
+        self.pressed = False
+
+    def add(self, widget, layout=None, on_click=None, static=True):
+        """
+        Adds widget to the UI.
+
+        layout: tuple of widget placing method name and its arguments, e.g. ("percent", 50, 20) or ("center",).
+        on_click: function called with widget when it is clicked.
+        static: static widgets are rendered into cached surface, others are drawn every frame.
+        """
+
+        self.nodes.append([widget, layout, on_click, static, None, None, []])
+        self.dirty = True
+        return widget
+
+    def remove(self, widget):
+        """ Removes widget from the UI """
+
+        self.nodes = [node for node in self.nodes if node[0] is not widget]
+        self.dirty = True
+
+    def invalidate(self):
+        """ Forces layout, hit-test grid and cached surface to be rebuilt """
+
+        self.screen_size = None
+        self.dirty = True
+
+    def check(self):
+        """ Marks UI dirty if screen size changed or any static widget was re-rendered or moved since last frame """
+
+        screen_size = (self.game.app.WIDTH, self.game.app.HEIGHT)
+        if screen_size != self.screen_size:
+            self.screen_size = screen_size
+            self.dirty = True
+            return
+        if self.dirty:
+            return
+        for node in self.nodes:
+            if node[3] and not same_drawn(node[5], drawn(node[0])):
+                self.dirty = True
+                return
+
+    def place(self, node):
+        """ Applies layout of the node if its inputs changed and remembers what the widget draws """
+
+        widget, layout = node[0], node[1]
+        key = (self.screen_size, tuple(widget.size))
+        if layout is not None and node[4] != key:
+            getattr(widget, layout[0])(*layout[1:])
+            node[4] = key
+        node[5] = drawn(widget)
+
+    @staticmethod
+    def clickable(node) -> bool:
+        """ Checks if node takes clicks """
+
+        return node[2] is not None or isinstance(node[0], OptionButton)
+
+    def index(self, node):
+        """ Adds clickable node to hit-test grid cells under it, cells keep order of nodes """
+
+        rect = widget_rect(node[0])
+        node[6] = [(cx, cy) for cx in range(rect.left // self.cell_size, rect.right // self.cell_size + 1)
+                   for cy in range(rect.top // self.cell_size, rect.bottom // self.cell_size + 1)]
+        for cell in node[6]:
+            nodes = self.grid.setdefault(cell, [])
+            nodes.append(node)
+            nodes.sort(key=lambda other: self.order[id(other)])
+
+    def unindex(self, node):
+        """ Removes node from hit-test grid """
+
+        for cell in node[6]:
+            nodes = self.grid[cell]
+            nodes.remove(node)
+            if not nodes:
+                del self.grid[cell]
+        node[6] = []
+
+    def layout(self):
+        """ Applies layouts whose inputs changed and rebuilds hit-test grid """
+
+        self.order = {id(node): i for i, node in enumerate(self.nodes)}
+        for node in self.nodes:
+            self.place(node)
+
+        self.grid = {}
+        for node in self.nodes:
+            node[6] = []
+            if self.clickable(node):
+                self.index(node)
+
+    def refresh(self):
+        """ Places dynamic widgets that were re-rendered or moved again, static cache stays as it is """
+
+        for node in self.nodes:
+            if node[3] or same_drawn(node[5], drawn(node[0])):
+                continue
+            self.place(node)
+            if self.clickable(node):
+                self.unindex(node)
+                self.index(node)
+
+    def render_cache(self):
+        """ Renders all static widgets into one cached surface """
+
+        blits = []
+        for node in self.nodes:
+            if node[3]:
+                blits.extend(node[5])
+        if not blits:
+            self.cache = None
+            return
+        rect = pygame.Rect(blits[0][1], blits[0][0].get_size()).unionall(
+            [pygame.Rect(pos, surface.get_size()) for surface, pos in blits[1:]])
+        self.cache = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self.cache.fill((0, 0, 0, 0))
+        self.cache.blits([(surface, (pos[0] - rect.x, pos[1] - rect.y)) for surface, pos in blits], False)
+        self.cache_pos = [rect.x, rect.y]
+
+    def hit_test(self, pos):
+        """ Returns top clickable widget under the position or None """
+
+        cell = (int(pos[0] // self.cell_size), int(pos[1] // self.cell_size))
+        for node in reversed(self.grid.get(cell, [])):
+            if widget_rect(node[0]).collidepoint(pos):
+                return node
+        return None
+
+    def click(self, pos):
+        """ Dispatches click at the position to the widget under it """
+
+        node = self.hit_test(pos)
+        if node is None:
+            return None
+        widget, on_click = node[0], node[2]
+        if on_click is not None:
+            on_click(widget)
+        else:
+            widget.next_option()
+        return widget
+
+    def update(self, mouse_buttons=None, mouse_position=None):
+        """ Brings layout up to date, dispatches click on mouse press edge and draws the UI """
+
+        self.check()
+        if self.dirty:
+            self.layout()
+            self.render_cache()
+            self.dirty = False
+        else:
+            self.refresh()
+
+        if mouse_buttons is not None:
+            # widget changed by the click is picked up by the next check
+            if mouse_buttons[0] and not self.pressed:
+                self.click(mouse_position)
+            self.pressed = bool(mouse_buttons[0])
+
+        self.draw()
+
+    def draw(self):
+        """ Draws cached static widgets and dynamic widgets """
+
+        if self.cache is not None:
+            draw_blit(self.game, self.cache, self.cache_pos, LAYER_UI)
+        for node in self.nodes:
+            if not node[3]:
+                node[0].update()
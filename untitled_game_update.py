@@ -6,6 +6,18 @@ Update method of this class is called every 0.02 seconds (60 FPS (Depends on wha
 
 import pygame
 from objects import *
+from lighting import LightMap
+from render import RenderQueue
+from steering import Flock
+from pathfinding import PathService
+from scheduler import LODScheduler
+from behavior import Perception
+from collision import CollisionResolver
+from physics import PhysicsWorld
+import snapshot
+from simulation import RandomStreams
+from particles import ParticleSystem
+from tween import TweenManager
 
 
 class Game:
@@ -13,8 +25,8 @@ class Game:
     Root Wars game class
     """
 
-    def __init__(self, app):
-        """ Game initialisation """
+    def __init__(self, app, seed=None):
+        """ Game initialisation, the same seed and input give the same game """
 
         # app variables
         self.app = app
@@ -24,7 +36,11 @@ class Game:
         self.objects = []
         self.bullets = []
 
+        self.render_queue = RenderQueue(self, enabled=getattr(self.app, "RENDER", True))
+
         self.counter = 0
+        self.tick = 0  # never wraps, unlike counter
+        self.random = RandomStreams(seed)
 
         self.create_game_objects()
 
@@ -40,6 +56,11 @@ class Game:
             self.objects.clear()
             self.bullets.clear()
 
+        # assets of the new mode load in background, objects show placeholders until they are ready
+        assets = getattr(self.app, "ASSETS", None)
+        if assets is not None:
+            assets.preload(mode)
+
         if mode == "game":
             self.mode = mode
             clear()
@@ -49,46 +70,119 @@ class Game:
         """ Spawns enemy """
 
         self.enemies_count += 1
-        pos = [random.randint(0, self.app.WIDTH), random.randint(0, self.app.HEIGHT)]
-        self.objects.append(Enemy(self, pos=pos, size=20, anchor_point=pos, debug=False, vision_angle=360, detect_range=1200,
-                                  color=(0, 255, 0), stop_range=50, damaged=True))
+        rng = self.random["world"]
+        pos = [rng.randint(0, self.app.WIDTH), rng.randint(0, self.app.HEIGHT)]
+        enemy = Enemy(self, pos=pos, size=20, anchor_point=pos, debug=False, vision_angle=360, detect_range=1200,
+                      color=(0, 255, 0), stop_range=50, damaged=True)
+        self.objects.append(enemy)
+        self.physics.add(enemy)
+        self.tweens.add(enemy)
+
+    def create_systems(self):
+        """ Creates systems that work with game objects """
+
+        self.camera = Camera(self, self.app.WIDTH, self.app.HEIGHT)
+        self.light_map = LightMap(self, ambient=(120, 120, 120), enabled=self.render_queue.enabled)
+        self.flock = Flock(self)
+        self.pathfinder = PathService(self)
+        self.scheduler = LODScheduler(self)
+        self.perception = Perception()
+        self.collisions = CollisionResolver(self)
+        self.physics = PhysicsWorld(self)
+        self.particles = ParticleSystem(self, enabled=self.render_queue.enabled)
+        # one game update is one fixed step
+        self.tweens = TweenManager(1 / self.app.MAX_FPS)
 
     def create_game_objects(self):
         """ Creates game objects """
 
-        self.camera = Camera(self, self.app.WIDTH, self.app.HEIGHT)
+        self.create_systems()
         self.enemies_count = 0
         for i in range(4):
             self.spawn_enemy()
         self.player = Player(self, pos=[self.app.WIDTH // 2, self.app.HEIGHT // 2], size=20, color=(0, 0, 255))
         self.objects.append(self.player)
-        [self.objects.append(Rock(self, [random.randint(0, self.app.WIDTH),
-                                         random.randint(0, self.app.HEIGHT)])) for _ in range(5)]
-        [self.objects.append(Explosive(self, [random.randint(0, self.app.WIDTH),
-                                         random.randint(0, self.app.HEIGHT)])) for _ in range(20)]
+        rng = self.random["world"]
+        [self.objects.append(Rock(self, [rng.randint(0, self.app.WIDTH),
+                                         rng.randint(0, self.app.HEIGHT)])) for _ in range(5)]
+        [self.objects.append(Explosive(self, [rng.randint(0, self.app.WIDTH),
+                                         rng.randint(0, self.app.HEIGHT)])) for _ in range(20)]
         # self.objects.append(Bullet(self, pos=[500, 500], end_pos=[1000, 600]))
+        for obj in self.objects:
+            if hasattr(obj, "mass"):
+                self.physics.add(obj)
+            if hasattr(obj, "followed"):
+                self.tweens.add(obj)
+
+    def save(self, path):
+        """ Saves all objects to snapshot file """
+
+        snapshot.save(path, snapshot.pack_game(self), snapshot.game_state(self))
+
+    def load(self, path):
+        """ Replaces all objects with objects from snapshot file, raises ValueError if the snapshot has no player """
+
+        records, state = snapshot.load(path)
+        if not (records["type"] == snapshot.ENTITY_TYPES["Player"][0]).any():
+            raise ValueError(f"snapshot {path} has no player")
+        self.objects.clear()
+        self.bullets.clear()
+        self.create_systems()
+        classes = {"Player": Player, "Enemy": Enemy, "Rock": Rock, "Explosive": Explosive, "Bullet": Bullet}
+        self.objects, self.bullets = snapshot.restore(self, records, classes)
+        self.mode = state.get("mode", self.mode)
+        self.counter = state.get("counter", 0)
+        self.enemies_count = state.get("enemies_count", 0)
+        self.player = next(obj for obj in self.objects if isinstance(obj, Player))
+        for obj in self.objects:
+            if hasattr(obj, "mass"):
+                self.physics.add(obj)
+            if hasattr(obj, "followed"):
+                self.tweens.add(obj)
 
     def update(self, mouse_buttons, mouse_position, events, keys):
         """ Main game logic """
 
         if self.mode == "game":
-            self.app.DISPLAY.fill((0, 0, 0))
-
             self.mouse_position = mouse_position
             self.mouse_buttons = mouse_buttons
 
             if self.enemies_count < 4:
                 self.spawn_enemy()
 
-            for obj in self.objects:
-                # obj.pos = self.camera.apply(obj.pos)
-                obj.update()
-                # obj.pos = mouse_position
-            for bullet in self.bullets:
+            rocks = [obj for obj in self.objects if type(obj) is Rock]
+            self.pathfinder.update(rocks)
+
+            # enemy transitions for the whole tick in one pass, updates only run state actions
+            self.perception.begin()
+            ENEMY_BEHAVIOR.transition_batch([obj for obj in self.objects if type(obj) is Enemy], self.perception)
+
+            self.scheduler.update(self.objects)
+            self.tweens.update()
+            # smoothing moves bodies too, physics reads only their positions
+            self.physics.moved(self.tweens.moved)
+            self.collisions.update_bullets()
+            for bullet in list(self.bullets):
                 bullet.update()
 
+            self.particles.update()
+            self.flock.update([obj for obj in self.objects if type(obj) is Enemy], rocks)
+            self.physics.step()
+            self.collisions.update()
+
             self.player.update(keys, mouse_position, mouse_buttons)
 
+            if self.render_queue.enabled:
+                self.app.DISPLAY.fill((0, 0, 0))
+                self.render_queue.flush()
+                self.light_map.add(self.player.pos, self.player.detect_range, (135, 135, 135), "smooth")
+                self.light_map.update()
+                # particles glow, so they are drawn over the light map
+                self.particles.draw()
+            else:
+                self.render_queue.clear()
+
+            self.tick += 1
             self.counter += 1
             if self.counter > 1000:
                 self.counter = 0
@@ -6,6 +6,7 @@ Update method of this class is called every 0.02 seconds (60 FPS (Depends on wha
 
 import pygame
 from objects import *
+from lighting import Light
 
 
 class Game:
@@ -13,8 +14,8 @@ class Game:
     Game class
     """
 
-    def __init__(self, app):
-        """ Game initialisation """
+    def __init__(self, app, seed=None):
+        """ Game initialisation, seed is taken like in other games, but this game has nothing random """
 
         # app variables
         self.app = app
@@ -39,6 +40,11 @@ class Game:
 
             self.objects.clear()
 
+        # assets of the new mode load in background, objects show placeholders until they are ready
+        assets = getattr(self.app, "ASSETS", None)
+        if assets is not None:
+            assets.preload(mode)
+
         if mode == "game":
             self.mode = mode
             clear()
@@ -50,32 +56,11 @@ class Game:
         self.line = Line(self, [-200, 0], [200, 0])
         self.circle = Circle(self, [self.app.WIDTH // 2, self.app.HEIGHT // 2], 100)
 
+        self.light = Light(self, self.cords, radius=212)
+
         self.objects.append(self.line)
         self.objects.append(self.circle)
 
-    def raycast_light(self, origin, circle_center, circle_radius, ray_count=360, max_length=500):
-        for angle in range(0, ray_count):
-            rad = math.radians(angle)
-            x, y = origin
-            for i in range(max_length):
-                x += math.cos(rad)
-                y += math.sin(rad)
-
-                dx = x - circle_center[0]
-                dy = y - circle_center[1]
-                dist_to_circle = math.sqrt(dx * dx + dy * dy)
-
-                # Проверяем, внутри ли окружности
-                if dist_to_circle <= circle_radius:
-                    # Затухание по расстоянию от мыши
-                    dist_from_origin = math.sqrt((x - origin[0]) ** 2 + (y - origin[1]) ** 2)
-                    intensity = max(0, 255 - int(dist_from_origin * 1.2))  # коэффициент 1.2 можно менять
-                    color = (intensity, intensity, intensity)
-                    self.app.DISPLAY.set_at((int(x), int(y)), color)
-                else:
-                    if i > circle_radius:
-                        break
-
     def update(self, mouse_buttons, mouse_position, events, keys):
         """ Main game logic """
 
@@ -93,7 +78,11 @@ class Game:
             # self.circle.center = Pos.sub_pos(mouse_position, self.cords)
 
             pygame.draw.circle(self.app.DISPLAY, (255, 0, 0), self.circle.center, self.circle.radius, 2)
-            self.raycast_light(self.mouse_position, self.circle.center, self.circle.radius)
+            self.line.update()
+
+            self.light.pos = self.mouse_position
+            self.light.update(segments=[(Pos.add_pos(self.line.pos1, self.cords), Pos.add_pos(self.line.pos2, self.cords))],
+                              circles=[(self.circle.center, self.circle.radius)])
 
             self.counter += 1
             if self.counter > 1000: